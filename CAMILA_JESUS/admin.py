@@ -1,6 +1,11 @@
 # CAMILA_JESUS/admin.py
-from django.contrib import admin
-from .models import Reserva, Laboratorio
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR
+from django.core.exceptions import ValidationError
+from .models import Notificacion, Reserva, ReservaArchivada, Laboratorio
+from .busqueda import buscar
+from .estadisticas import cambiar_estado_masivo
+from .services import cambiar_estado_lote, guardar_reserva
 
 @admin.register(Laboratorio)
 class LaboratorioAdmin(admin.ModelAdmin):
@@ -8,17 +13,25 @@ class LaboratorioAdmin(admin.ModelAdmin):
     search_fields = ('nombre',)
     ordering = ('nombre',)
 
+def aplicar_lote(modeladmin, request, queryset, accion):
+    """Aprueba/rechaza con las mismas validaciones que el panel de administración"""
+    actualizadas, errores = cambiar_estado_lote(queryset.values_list('pk', flat=True), accion)
+    if actualizadas:
+        modeladmin.message_user(request, f"{len(actualizadas)} reservas actualizadas.", messages.SUCCESS)
+    for pk, motivo in sorted(errores.items()):
+        modeladmin.message_user(request, f"Reserva #{pk}: {motivo}", messages.WARNING)
+
 @admin.action(description='Marcar como Aprobada')
 def marcar_aprobada(modeladmin, request, queryset):
-    queryset.update(estado='Aprobada')
+    aplicar_lote(modeladmin, request, queryset, 'aprobar')
 
 @admin.action(description='Marcar como Rechazada')
 def marcar_rechazada(modeladmin, request, queryset):
-    queryset.update(estado='Rechazada')
+    aplicar_lote(modeladmin, request, queryset, 'rechazar')
 
 @admin.action(description='Marcar como Cancelada')
 def marcar_cancelada(modeladmin, request, queryset):
-    queryset.update(estado='Cancelada')
+    cambiar_estado_masivo(queryset, 'Cancelada')
 
 @admin.register(Reserva)
 class ReservaAdmin(admin.ModelAdmin):
@@ -40,11 +53,49 @@ class ReservaAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        """Búsqueda por el índice de texto completo en lugar de LIKE sobre search_fields"""
+        if not search_term.strip():
+            return queryset, False
+        resultados = buscar(queryset, search_term)
+        # Los más relevantes primero, salvo que se haya ordenado por una columna
+        if ORDER_VAR in request.GET:
+            resultados = resultados.order_by(*queryset.query.order_by)
+        return resultados, False
+
     def save_model(self, request, obj, form, change):
-        """Valida antes de guardar"""
+        """Valida bajo el bloqueo de la agenda y reintenta como las vistas del panel"""
         try:
-            obj.full_clean()
-            super().save_model(request, obj, form, change)
-        except Exception as e:
-            from django.contrib import messages
-            messages.error(request, f"Error al guardar: {e}")
+            guardar_reserva(obj)
+        except ValidationError as e:
+            messages.error(request, f"Error al guardar: {'; '.join(e.messages)}")
+
+@admin.register(ReservaArchivada)
+class ReservaArchivadaAdmin(admin.ModelAdmin):
+    """Solo lectura: las reservas archivadas no se editan"""
+    list_display = ('id', 'docente', 'laboratorio', 'fecha', 'hora_inicio', 'hora_fin', 'estado', 'fecha_archivo')
+    list_filter = ('estado', 'laboratorio')
+    list_select_related = ('docente', 'laboratorio')
+    date_hierarchy = 'fecha'
+    search_fields = ('docente__username', 'laboratorio__nombre', 'motivo')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(Notificacion)
+class NotificacionAdmin(admin.ModelAdmin):
+    """Bandeja de salida de correos: se consulta, no se edita"""
+    list_display = ('id', 'docente', 'reserva_id', 'evento', 'estado', 'intentos', 'proximo_intento', 'fecha_envio')
+    list_filter = ('estado', 'evento')
+    list_select_related = ('docente',)
+    search_fields = ('docente__username', 'docente__email')
+    readonly_fields = [f.name for f in Notificacion._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,160 @@
+# CAMILA_JESUS/api.py
+"""
+API JSON de reservas para kioscos y scripts (vistas Api* en views.py).
+
+Las listas no instancian modelos: se leen con values_list solo los campos
+pedidos (`campos`), y las tablas relacionadas se unen solo si se pide un
+campo suyo. Se paginan por cursor (ver paginacion.py) en orden (-fecha,
+-hora_inicio, -id): el `siguiente` de una respuesta es el `despues` de
+la próxima.
+
+Las creaciones y los cambios de estado por lotes pasan por services.py,
+con las mismas reglas de solapamiento que Reserva.clean().
+"""
+import datetime
+import json
+
+from . import caches, paginacion, services
+from .models import Reserva
+
+# Nombre en el JSON -> campo de values_list
+CAMPOS = {
+    'id': 'pk',
+    'docente_id': 'docente_id',
+    'docente': 'docente__username',
+    'laboratorio_id': 'laboratorio_id',
+    'laboratorio': 'laboratorio__nombre',
+    'fecha': 'fecha',
+    'hora_inicio': 'hora_inicio',
+    'hora_fin': 'hora_fin',
+    'estado': 'estado',
+    'motivo': 'motivo',
+    'fecha_creacion': 'fecha_creacion',
+    'fecha_modificacion': 'fecha_modificacion',
+}
+CAMPOS_POR_DEFECTO = ('id', 'laboratorio_id', 'fecha', 'hora_inicio', 'hora_fin', 'estado')
+
+LIMITE_POR_DEFECTO = 100
+MAX_LIMITE = 1000
+# Máximo de reservas por petición de creación o de cambio de estado
+MAX_LOTE = 500
+
+
+def leer_campos(texto):
+    """Campos de 'id,fecha,...' (por defecto CAMPOS_POR_DEFECTO); lanza ValueError"""
+    campos = list(dict.fromkeys(c.strip() for c in (texto or '').split(',') if c.strip()))
+    if not campos:
+        return list(CAMPOS_POR_DEFECTO)
+    desconocidos = [c for c in campos if c not in CAMPOS]
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}. Disponibles: {', '.join(CAMPOS)}.")
+    return campos
+
+
+def leer_limite(texto):
+    if not texto:
+        return LIMITE_POR_DEFECTO
+    if not texto.isdigit() or not 1 <= int(texto) <= MAX_LIMITE:
+        raise ValueError(f"El límite debe ser un número entre 1 y {MAX_LIMITE}.")
+    return int(texto)
+
+
+def pagina(qs, campos, limite=LIMITE_POR_DEFECTO, despues=None):
+    """
+    {'resultados': [dict], 'siguiente': cursor | None} con hasta `limite`
+    filas de `qs`. Lanza ValueError si el cursor no es válido.
+    """
+    if despues:
+        filtro = paginacion.posteriores(despues)
+        if filtro is None:
+            raise ValueError('Cursor inválido.')
+        qs = qs.filter(filtro)
+    # La clave del cursor va al final de cada fila, pedida o no
+    filas = list(
+        qs.order_by('-fecha', '-hora_inicio', '-pk')
+        .values_list(*(CAMPOS[c] for c in campos), 'fecha', 'hora_inicio', 'pk')[:limite + 1]
+    )
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+    return {
+        # zip se detiene en el último campo pedido
+        'resultados': [dict(zip(campos, fila)) for fila in filas],
+        'siguiente': paginacion.codificar_clave(*filas[-1][len(campos):]) if hay_mas else None,
+    }
+
+
+def leer_json(cuerpo):
+    """Objeto JSON del cuerpo de una petición; lanza ValueError"""
+    try:
+        datos = json.loads(cuerpo)
+    except ValueError:
+        raise ValueError('El cuerpo debe ser JSON válido.')
+    if not isinstance(datos, dict):
+        raise ValueError('El cuerpo debe ser un objeto JSON.')
+    return datos
+
+
+def leer_lote(datos, clave):
+    """Lista no vacía de hasta MAX_LOTE elementos en datos[clave]; lanza ValueError"""
+    lote = datos.get(clave)
+    if not isinstance(lote, list) or not lote:
+        raise ValueError(f"Falta la lista '{clave}'.")
+    if len(lote) > MAX_LOTE:
+        raise ValueError(f"Como máximo {MAX_LOTE} elementos por petición.")
+    return lote
+
+
+def leer_ids(lote):
+    if not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in lote):
+        raise ValueError('Los ids de las reservas deben ser números enteros.')
+    return lote
+
+
+def leer_reserva(dato, laboratorios):
+    """Reserva sin guardar a partir de un objeto JSON; lanza ValueError con el motivo"""
+    if not isinstance(dato, dict):
+        raise ValueError('Cada reserva debe ser un objeto.')
+    try:
+        laboratorio = laboratorios.get(int(dato.get('laboratorio')))
+    except (TypeError, ValueError):
+        laboratorio = None
+    if laboratorio is None:
+        raise ValueError('El laboratorio no existe.')
+    try:
+        fecha = datetime.date.fromisoformat(str(dato.get('fecha')))
+        inicio = datetime.time.fromisoformat(str(dato.get('hora_inicio')))
+        fin = datetime.time.fromisoformat(str(dato.get('hora_fin')))
+    except ValueError:
+        raise ValueError('Fecha u hora inválida (use AAAA-MM-DD y HH:MM).')
+    motivo = dato.get('motivo')
+    if not isinstance(motivo, str) or not motivo.strip():
+        raise ValueError('Falta el motivo.')
+    return Reserva(laboratorio=laboratorio, fecha=fecha, hora_inicio=inicio, hora_fin=fin, motivo=motivo.strip())
+
+
+def crear(docente, lote):
+    """
+    Crea las reservas Pendientes del docente de una lista de objetos JSON
+    (ver services.crear_reservas). Devuelve (creadas, errores) como listas
+    de {'indice', 'id'} y {'indice', 'error'} según la posición en `lote`.
+    """
+    laboratorios = {lab.pk: lab for lab in caches.laboratorios()}
+    errores, indices, reservas = [], [], []
+    for i, dato in enumerate(lote):
+        try:
+            reservas.append(leer_reserva(dato, laboratorios))
+        except ValueError as e:
+            errores.append({'indice': i, 'error': str(e)})
+            continue
+        indices.append(i)
+
+    _, conflictos = services.crear_reservas(docente, reservas)
+    creadas = []
+    for j, reserva in enumerate(reservas):
+        if j in conflictos:
+            errores.append({'indice': indices[j], 'error': conflictos[j]})
+        else:
+            # bulk_create asigna el id a la misma instancia
+            creadas.append({'indice': indices[j], 'id': reserva.pk})
+    errores.sort(key=lambda e: e['indice'])
+    return creadas, errores
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CamilaJesusConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'CAMILA_JESUS'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,110 @@
+# CAMILA_JESUS/archivo.py
+"""
+Archivo de reservas antiguas.
+
+archivar() mueve a ReservaArchivada, por lotes y cada lote en su propia
+transacción corta, las reservas con fecha anterior al corte: las
+consultas frecuentes (solapamientos, listas, dashboards) solo recorren
+así las reservas vigentes.
+
+Las filas se borran de Reserva con un DELETE directo, sin señales ni
+cascadas, a propósito: el resumen diario (EstadisticaDiaria) las sigue
+contando, de modo que las estadísticas no cambian al archivar. Lo que sí
+dependía de ellas se mantiene a mano en el mismo lote: su IndiceBusqueda
+(la única tabla con clave foránea a Reserva; Notificacion guarda solo el
+id) se borra antes, y VERSION_RESERVAS, las cachés y el estado de los
+feeds se actualizan por lote. Las lecturas que necesitan la historia
+completa (exportaciones, estadisticas.reconstruir) leen ambas tablas con
+con_historial().
+
+Cada lote bloquea las agendas de sus reservas (como services.py) y las
+vuelve a leer bajo el bloqueo, con select_for_update en PostgreSQL: un
+cambio de estado o una edición concurrente termina antes de la copia o
+espera a que el lote termine, y no se pierde.
+"""
+import datetime
+import time
+
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import calendario, caches
+from .models import VERSION_RESERVAS, IndiceBusqueda, Reserva, ReservaArchivada, VersionDatos, bloquear_agenda
+
+TAMANO_LOTE = 1000
+
+CAMPOS = (
+    'id', 'docente_id', 'laboratorio_id', 'fecha', 'hora_inicio', 'hora_fin',
+    'motivo', 'estado', 'fecha_creacion', 'fecha_modificacion',
+)
+
+
+def corte_por_meses(meses, hoy=None):
+    """Primer día del mes de hace `meses` meses: se archiva por meses completos"""
+    hoy = hoy or timezone.localdate()
+    total = hoy.year * 12 + hoy.month - 1 - meses
+    return datetime.date(total // 12, total % 12 + 1, 1)
+
+
+def _borrar(pks):
+    """DELETE de Reserva sin cargar instancias ni enviar post_delete (ver arriba)"""
+    connection = connections[router.db_for_write(Reserva)]
+    tabla = connection.ops.quote_name(Reserva._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {tabla} WHERE id IN ({', '.join(['%s'] * len(pks))})", pks)
+
+
+def _mover_lote(corte, lote):
+    """Filas movidas del siguiente lote, o None si ya no queda nada que archivar"""
+    with transaction.atomic():
+        candidatas = list(
+            Reserva.objects.filter(fecha__lt=corte)
+            .order_by('fecha', 'hora_inicio', 'id').values_list('id', 'laboratorio_id', 'fecha')[:lote]
+        )
+        if not candidatas:
+            return None
+        # Orden fijo de bloqueo, como services.py
+        for laboratorio_id, fecha in sorted({c[1:] for c in candidatas}):
+            bloquear_agenda(laboratorio_id, fecha)
+        # Bajo bloqueo: las que siguen antes del corte, con sus datos vigentes
+        filas = list(
+            Reserva.objects.select_for_update().filter(pk__in=[c[0] for c in candidatas], fecha__lt=corte)
+            .order_by().values(*CAMPOS)
+        )
+        if filas:
+            pks = [f['id'] for f in filas]
+            ReservaArchivada.objects.bulk_create([ReservaArchivada(**f) for f in filas])
+            IndiceBusqueda.objects.filter(reserva_id__in=pks).delete()
+            _borrar(pks)
+            VersionDatos.incrementar(VERSION_RESERVAS)
+    return filas
+
+
+def archivar(corte, lote=TAMANO_LOTE, pausa=0.0):
+    """
+    Mueve las reservas con fecha anterior a `corte` a ReservaArchivada.
+    `pausa` (segundos) entre lotes deja pasar a otros escritores.
+    Devuelve la cantidad de reservas movidas.
+    """
+    movidas = 0
+    while True:
+        filas = _mover_lote(corte, lote)
+        if filas is None:
+            break
+        movidas += len(filas)
+        docentes = {f['docente_id'] for f in filas}
+        laboratorios = {f['laboratorio_id'] for f in filas}
+        caches.invalidar_reservas(docentes, laboratorios)
+        # La consulta incremental de los feeds no ve filas borradas
+        for pk in laboratorios:
+            calendario.olvidar(laboratorio_id=pk)
+        for pk in docentes:
+            calendario.olvidar(docente_id=pk)
+        if pausa:
+            time.sleep(pausa)
+    return movidas
+
+
+def con_historial(filtrar):
+    """[vigentes, archivadas], ambas con `filtrar(queryset)` aplicado"""
+    return [filtrar(Reserva.objects.all()), filtrar(ReservaArchivada.objects.all())]
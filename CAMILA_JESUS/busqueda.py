@@ -0,0 +1,120 @@
+# CAMILA_JESUS/busqueda.py
+"""
+Búsqueda de texto completo sobre reservas (motivo, docente y laboratorio).
+
+El texto de cada reserva se guarda desnormalizado en IndiceBusqueda y se
+indexa según el motor:
+
+- PostgreSQL: índice GIN sobre to_tsvector('spanish', documento); las
+  consultas usan SearchVector/SearchQuery y se ordenan con SearchRank.
+- SQLite: tabla FTS5 de contenido externo (mantenida por triggers) con
+  orden por bm25.
+- Otros: LIKE sobre la columna desnormalizada, sin orden por relevancia.
+
+Las señales reindexan al crear o editar una reserva y al renombrar un
+docente o un laboratorio; las inserciones masivas llaman a indexar_reservas().
+"""
+import operator
+import re
+from functools import reduce
+
+from django.db import connections, transaction
+from django.db.models import F, FloatField, Q, Value
+
+from .models import IndiceBusqueda, Reserva
+
+# Configuración de texto de PostgreSQL (debe coincidir con el índice GIN)
+CONFIG_PG = 'spanish'
+
+# Resultados que muestra la lista de administración al buscar
+MAX_RESULTADOS = 100
+
+TAMANO_LOTE = 2000
+
+CAMPOS_TEXTO = ('motivo', 'docente__first_name', 'docente__last_name', 'docente__username', 'laboratorio__nombre')
+
+
+def documento(*textos):
+    return ' '.join(t for t in textos if t)
+
+
+def _guardar(indices):
+    IndiceBusqueda.objects.bulk_create(
+        indices, batch_size=TAMANO_LOTE,
+        update_conflicts=True, unique_fields=['reserva'], update_fields=['documento'],
+    )
+
+
+def indexar_reservas(reservas):
+    """Indexa instancias de Reserva; usa el docente y laboratorio ya cargados si los hay"""
+    _guardar([
+        IndiceBusqueda(reserva_id=r.pk, documento=documento(
+            r.motivo, r.docente.first_name, r.docente.last_name, r.docente.username, r.laboratorio.nombre,
+        ))
+        for r in reservas
+    ])
+
+
+def indexar(queryset):
+    """Reindexa las reservas de un queryset, por lotes y sin cargar instancias"""
+    lote = []
+    for pk, *textos in queryset.order_by().values_list('pk', *CAMPOS_TEXTO).iterator(chunk_size=TAMANO_LOTE):
+        lote.append(IndiceBusqueda(reserva_id=pk, documento=documento(*textos)))
+        if len(lote) >= TAMANO_LOTE:
+            _guardar(lote)
+            lote = []
+    if lote:
+        _guardar(lote)
+
+
+def reconstruir():
+    """Regenera todo el índice. Devuelve la cantidad de reservas indexadas."""
+    with transaction.atomic():
+        IndiceBusqueda.objects.all().delete()
+        indexar(Reserva.objects.all())
+        return IndiceBusqueda.objects.count()
+
+
+def consulta_fts(texto):
+    """Cada palabra como prefijo entre comillas, unidas por AND: 'quím orgá' -> '"quím"* "orgá"*'"""
+    return ' '.join(f'"{palabra}"*' for palabra in re.findall(r'\w+', texto.lower()))
+
+
+def buscar(qs, texto):
+    """
+    Filtra un queryset de Reserva por `texto` y lo ordena por relevancia
+    (anotación `rango`, mayor es mejor).
+    """
+    vendor = connections[qs.db].vendor
+
+    if qs.model is not Reserva:
+        # Reservas archivadas: no se indexan, LIKE por palabra y por campo
+        for palabra in texto.split():
+            qs = qs.filter(reduce(operator.or_, (Q(**{f'{campo}__icontains': palabra}) for campo in CAMPOS_TEXTO)))
+        return qs.annotate(rango=Value(0.0, output_field=FloatField())).order_by('-fecha', '-pk')
+
+    if vendor == 'postgresql':
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        consulta = SearchQuery(texto, config=CONFIG_PG, search_type='websearch')
+        vector = SearchVector('indice__documento', config=CONFIG_PG)
+        return (
+            qs.annotate(vector_busqueda=vector).filter(vector_busqueda=consulta)
+            .annotate(rango=SearchRank(vector, consulta)).order_by('-rango', '-fecha', '-pk')
+        )
+
+    if vendor == 'sqlite':
+        consulta = consulta_fts(texto)
+        if not consulta:
+            return qs.none()
+        # JOIN por rowid con la tabla FTS5: el MATCH y bm25 se evalúan una
+        # sola vez, no por fila como en una subconsulta correlacionada
+        return (
+            qs.filter(fts__tabla__coincide=consulta)
+            .annotate(rango=-F('fts__rank')).order_by('-rango', '-fecha', '-pk')
+        )
+
+    return (
+        qs.filter(indice__documento__icontains=texto)
+        .annotate(rango=Value(0.0, output_field=FloatField())).order_by('-fecha', '-pk')
+    )
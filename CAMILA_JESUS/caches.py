@@ -0,0 +1,143 @@
+# CAMILA_JESUS/caches.py
+"""
+Caché de lecturas frecuentes con claves versionadas.
+
+Cada grupo de datos (lista de laboratorios, dashboard de cada docente,
+dashboard de administración) tiene un contador de versión en la caché.
+Las escrituras incrementan el contador y las claves antiguas simplemente
+dejan de leerse; no hace falta borrar nada. Funciona con cualquier backend
+de Django compartido por los procesos (archivos, memcached, redis...); con
+locmem cada worker tiene sus contadores y no ve las escrituras de los otros.
+
+Cada consulta emite la señal `consulta_cache` (nombre, acierto) para
+quien quiera medir el efecto; además se llevan contadores por proceso.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import Signal
+
+from . import replicas
+from .models import Laboratorio, Reserva
+
+PREFIJO = 'camila'
+
+# Se emite en cada lectura: sender=None, nombre=str, acierto=bool
+consulta_cache = Signal()
+
+_metricas = Counter()
+
+
+def metricas():
+    """Aciertos y fallos por nombre de caché en este proceso: {(nombre, 'hit'|'miss'): n}"""
+    return dict(_metricas)
+
+
+def _clave_version(grupo):
+    return f"{PREFIJO}:v:{grupo}"
+
+
+def version(grupo):
+    valor = cache.get(_clave_version(grupo))
+    if valor is None:
+        # Arranca en un valor distinto cada vez por si la clave fue desalojada
+        cache.add(_clave_version(grupo), int(time.time() * 1000), None)
+        valor = cache.get(_clave_version(grupo))
+    return valor
+
+
+def _clave_reciente(grupo):
+    return f"{PREFIJO}:reciente:{grupo}"
+
+
+def _incrementar(grupos):
+    for grupo in grupos:
+        try:
+            cache.incr(_clave_version(grupo))
+        except ValueError:
+            cache.add(_clave_version(grupo), int(time.time() * 1000), None)
+    if replicas.activas():
+        # Mientras exista, las réplicas pueden no tener la escritura
+        cache.set_many({_clave_reciente(g): 1 for g in grupos}, settings.DATABASE_REPLICA_RETRASO)
+
+
+def reciente(grupo):
+    """True si `grupo` cambió hace menos de DATABASE_REPLICA_RETRASO segundos (solo con réplicas)"""
+    return replicas.activas() and cache.get(_clave_reciente(grupo)) is not None
+
+
+def invalidar(*grupos):
+    """
+    Invalida ya y, si hay una transacción abierta, otra vez al confirmarla:
+    así no queda en caché lo que otro proceso leyó antes del commit.
+    """
+    _incrementar(grupos)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _incrementar(grupos))
+
+
+def obtener(nombre, grupo, calcular):
+    """Valor cacheado bajo la versión actual de `grupo`; si no está, lo calcula"""
+    clave = f"{PREFIJO}:{nombre}:{version(grupo)}"
+    valor = cache.get(clave)
+    acierto = valor is not None
+    if not acierto:
+        # Recién invalidado: del primario, para no guardar datos de una réplica atrasada
+        with replicas.primario(reciente(grupo)):
+            valor = calcular()
+        cache.set(clave, valor)
+    _metricas[(nombre, 'hit' if acierto else 'miss')] += 1
+    consulta_cache.send(sender=None, nombre=nombre, acierto=acierto)
+    return valor
+
+
+# ==================== GRUPOS ====================
+
+GRUPO_LABORATORIOS = 'laboratorios'
+GRUPO_ADMIN = 'dashboard:admin'
+
+
+def grupo_docente(docente_id):
+    return f"dashboard:docente:{docente_id}"
+
+
+def grupo_calendario(tipo, pk):
+    """Feed iCalendar de un laboratorio o de un docente (tipo 'laboratorio' | 'docente')"""
+    return f"calendario:{tipo}:{pk}"
+
+
+def invalidar_reservas(docente_ids, laboratorio_ids=()):
+    """Tras escribir reservas de estos docentes (en estos laboratorios)"""
+    docente_ids = set(docente_ids)
+    invalidar(
+        GRUPO_ADMIN,
+        *(grupo_docente(pk) for pk in docente_ids),
+        *(grupo_calendario('docente', pk) for pk in docente_ids),
+        *(grupo_calendario('laboratorio', pk) for pk in set(laboratorio_ids)),
+    )
+
+
+# ==================== LECTURAS ====================
+
+def laboratorios():
+    """Todos los laboratorios ordenados por nombre"""
+    return obtener('laboratorios', GRUPO_LABORATORIOS, lambda: list(Laboratorio.objects.order_by('nombre')))
+
+
+def opciones_laboratorio():
+    """Opciones para los <select> de laboratorio en los formularios"""
+    return [('', '---------')] + [(lab.pk, lab.nombre) for lab in laboratorios()]
+
+
+def estadisticas_docente(docente_id):
+    return obtener(
+        f"dashboard:docente:{docente_id}", grupo_docente(docente_id),
+        lambda: Reserva.objects.filter(docente_id=docente_id).estadisticas(),
+    )
+
+
+def estadisticas_admin():
+    return obtener('dashboard:admin', GRUPO_ADMIN, lambda: Reserva.objects.estadisticas())
@@ -0,0 +1,233 @@
+# CAMILA_JESUS/calendario.py
+"""
+Feeds iCalendar (.ics) con las reservas aprobadas y pendientes de un
+laboratorio o de un docente, para suscribirse desde aplicaciones de
+calendario.
+
+Los clientes consultan cada pocos minutos, así que el feed tiene que salir
+barato:
+
+- La respuesta completa (cuerpo, ETag y Last-Modified) se cachea bajo el
+  grupo versionado del feed (caches.grupo_calendario), que solo invalidan
+  las escrituras de reservas de ese laboratorio o docente. Sin cambios se
+  responde sin tocar la base ni volver a renderizar, o con 304.
+- Tras una escritura, el feed no se regenera entero: se guarda en caché el
+  VEVENT ya renderizado de cada reserva junto con una marca de agua (la
+  mayor fecha_modificacion vista) y solo se consultan y renderizan las
+  reservas modificadas desde entonces.
+- Si una reserva se borra o cambia de laboratorio o docente, la consulta
+  incremental del feed anterior ya no la vería: olvidar() descarta ese
+  estado y la siguiente petición lo reconstruye completo. La versión del
+  estado se guarda en la base (VersionDatos) para que el olvido llegue a
+  todos los procesos, también con una caché local de cada worker.
+
+Las URLs llevan un token firmado por feed porque los clientes de calendario
+no envían la sesión.
+"""
+import datetime
+import hashlib
+
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+
+from . import caches
+from .models import VERSION_RESERVAS, Laboratorio, Reserva, VersionDatos
+
+TIPOS = ('laboratorio', 'docente')
+ESTADOS_PUBLICADOS = ('Aprobada', 'Pendiente')
+
+# Días hacia atrás que se publican; el resto del feed es futuro
+DIAS_HISTORIAL = 90
+
+# Margen para la marca de agua: una transacción puede confirmarse después de
+# que otra más reciente ya haya sido leída. Repasar estas filas es idempotente.
+MARGEN = datetime.timedelta(minutes=5)
+
+ESTADO_TTL = 60 * 60 * 24
+
+CAMPOS = (
+    'pk', 'fecha', 'hora_inicio', 'hora_fin', 'motivo', 'estado', 'fecha_modificacion',
+    'laboratorio__nombre', 'docente__first_name', 'docente__last_name', 'docente__username',
+)
+
+_firmador = signing.Signer(salt='camila.calendario')
+
+
+# ==================== URLS FIRMADAS ====================
+
+def token(tipo, pk):
+    return _firmador.signature(f"{tipo}:{pk}")
+
+
+def token_valido(tipo, pk, valor):
+    return constant_time_compare(token(tipo, pk), valor)
+
+
+def url(tipo, pk):
+    return reverse(f'camila:calendario_{tipo}', kwargs={'pk': pk, 'token': token(tipo, pk)})
+
+
+# ==================== RENDER ====================
+
+def _escapar(texto):
+    return (
+        texto.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def _plegar(linea):
+    """Corta líneas de más de 75 octetos (RFC 5545 §3.1) sin partir caracteres UTF-8"""
+    if len(linea.encode()) <= 75:
+        return linea
+    partes, actual, octetos = [], '', 0
+    for caracter in linea:
+        n = len(caracter.encode())
+        if octetos + n > 75:
+            partes.append(actual)
+            # La continuación empieza con un espacio, que también cuenta
+            actual, octetos = ' ', 1
+        actual += caracter
+        octetos += n
+    partes.append(actual)
+    return '\r\n'.join(partes)
+
+
+def _utc(valor):
+    return valor.astimezone(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _local(fecha, hora):
+    return _utc(timezone.make_aware(datetime.datetime.combine(fecha, hora)))
+
+
+def evento(fila):
+    """VEVENT de una fila de values(*CAMPOS)"""
+    docente = f"{fila['docente__first_name']} {fila['docente__last_name']}".strip() or fila['docente__username']
+    pendiente = fila['estado'] == 'Pendiente'
+    resumen = f"{'(Pendiente) ' if pendiente else ''}{fila['laboratorio__nombre']}: {fila['motivo']}"
+    descripcion = f"Docente: {docente}\nEstado: {fila['estado']}"
+    lineas = [
+        'BEGIN:VEVENT',
+        f"UID:reserva-{fila['pk']}@camila",
+        f"DTSTAMP:{_utc(fila['fecha_modificacion'])}",
+        f"LAST-MODIFIED:{_utc(fila['fecha_modificacion'])}",
+        f"DTSTART:{_local(fila['fecha'], fila['hora_inicio'])}",
+        f"DTEND:{_local(fila['fecha'], fila['hora_fin'])}",
+        f"SUMMARY:{_escapar(resumen)}",
+        f"LOCATION:{_escapar(fila['laboratorio__nombre'])}",
+        f"DESCRIPTION:{_escapar(descripcion)}",
+        f"STATUS:{'TENTATIVE' if pendiente else 'CONFIRMED'}",
+        'END:VEVENT',
+    ]
+    return '\r\n'.join(_plegar(linea) for linea in lineas)
+
+
+def _titulo(tipo, pk):
+    if tipo == 'laboratorio':
+        nombre = Laboratorio.objects.filter(pk=pk).values_list('nombre', flat=True).first()
+    else:
+        usuario = User.objects.filter(pk=pk).only('username', 'first_name', 'last_name').first()
+        nombre = usuario and (usuario.get_full_name() or usuario.username)
+    return f"Reservas - {nombre or pk}"
+
+
+def _cuerpo(titulo, eventos, desde):
+    vigentes = sorted((orden, texto) for orden, texto in eventos.values() if orden[0] >= desde)
+    lineas = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//CAMILA JESUS//Reservas de laboratorios//ES',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        _plegar(f"X-WR-CALNAME:{_escapar(titulo)}"),
+        *(texto for _, texto in vigentes),
+        'END:VCALENDAR',
+    ]
+    return ('\r\n'.join(lineas) + '\r\n').encode()
+
+
+# ==================== ESTADO INCREMENTAL ====================
+
+def _version_base(tipo, pk):
+    """Nombre en VersionDatos de la versión del estado incremental de un feed"""
+    return f"calendario:{tipo}:{pk}"
+
+
+def _clave_estado(tipo, pk):
+    # La versión cambia con olvidar() en cualquier proceso: un cálculo en
+    # curso que escriba después guarda bajo una clave que ya nadie lee
+    return f"{caches.PREFIJO}:ical:estado:{tipo}:{pk}:{VersionDatos.actual(_version_base(tipo, pk))}"
+
+
+def _actualizar(tipo, pk, hoy):
+    """Aplica al estado en caché las reservas modificadas desde la marca de agua"""
+    clave = _clave_estado(tipo, pk)
+    estado = cache.get(clave)
+    desde = hoy - datetime.timedelta(days=DIAS_HISTORIAL)
+
+    qs = Reserva.objects.filter(**{f'{tipo}_id': pk}, fecha__gte=desde).order_by()
+    if estado is None:
+        estado = {'titulo': _titulo(tipo, pk), 'marca': None, 'eventos': {}, 'etag': None, 'modificado': None}
+        qs = qs.filter(estado__in=ESTADOS_PUBLICADOS)
+    else:
+        # Incluye las que dejaron de publicarse (canceladas, rechazadas) para quitarlas
+        qs = qs.filter(fecha_modificacion__gte=estado['marca'] - MARGEN)
+
+    eventos = estado['eventos']
+    for fila in qs.values(*CAMPOS).iterator(chunk_size=2000):
+        if fila['estado'] in ESTADOS_PUBLICADOS:
+            orden = (fila['fecha'], fila['hora_inicio'], fila['pk'])
+            eventos[fila['pk']] = (orden, evento(fila))
+        else:
+            eventos.pop(fila['pk'], None)
+        if estado['marca'] is None or fila['fecha_modificacion'] > estado['marca']:
+            estado['marca'] = fila['fecha_modificacion']
+    if estado['marca'] is None:
+        estado['marca'] = timezone.now()
+
+    cuerpo = _cuerpo(estado['titulo'], eventos, desde)
+    etag = hashlib.md5(cuerpo).hexdigest()
+    if etag != estado['etag']:
+        estado['etag'], estado['modificado'] = etag, timezone.now().replace(microsecond=0)
+    cache.set(clave, estado, ESTADO_TTL)
+    return {'cuerpo': cuerpo, 'etag': f'"{etag}"', 'modificado': estado['modificado']}
+
+
+def feed(tipo, pk):
+    """
+    {'cuerpo': bytes, 'etag': str, 'modificado': datetime} del feed; sale de
+    la caché mientras no se escriban reservas de ese laboratorio o docente.
+    """
+    hoy = timezone.localdate()
+    return caches.obtener(
+        f"ical:{tipo}:{pk}:{hoy.isoformat()}", caches.grupo_calendario(tipo, pk),
+        lambda: _actualizar(tipo, pk, hoy),
+    )
+
+
+def olvidar(laboratorio_id=None, docente_id=None):
+    """Descarta el estado incremental de estos feeds (reserva borrada o movida)"""
+    grupos = []
+    for tipo, pk in (('laboratorio', laboratorio_id), ('docente', docente_id)):
+        if pk is not None:
+            VersionDatos.incrementar(_version_base(tipo, pk))
+            grupos.append(caches.grupo_calendario(tipo, pk))
+    caches.invalidar(*grupos)
+
+
+def tocar(queryset):
+    """
+    Marca como modificadas las reservas del queryset para que los feeds las
+    vuelvan a renderizar (p. ej. al renombrar su laboratorio o su docente).
+    """
+    pares = set(queryset.order_by().values_list('docente_id', 'laboratorio_id').distinct())
+    queryset.update(fecha_modificacion=timezone.now())
+    if pares:
+        # Cambian los nombres que muestran las listas y la API
+        VersionDatos.incrementar(VERSION_RESERVAS)
+    caches.invalidar_reservas((d for d, _ in pares), (l for _, l in pares))
@@ -0,0 +1,145 @@
+# CAMILA_JESUS/disponibilidad.py
+"""
+Disponibilidad de laboratorios: intervalos libres y ocupados por día.
+
+Se cargan todas las reservas activas del rango en una sola consulta
+(ordenadas por laboratorio, fecha y hora) y se recorren una vez,
+fusionando intervalos solapados y calculando los huecos de la jornada.
+"""
+import datetime
+from itertools import groupby
+
+from .models import Laboratorio, Reserva
+
+# Jornada en la que se pueden reservar los laboratorios
+HORA_APERTURA = datetime.time(7, 0)
+HORA_CIERRE = datetime.time(21, 0)
+
+# Máximo de días por consulta
+MAX_DIAS = 31
+
+
+def _libres(ocupados, apertura=HORA_APERTURA, cierre=HORA_CIERRE):
+    """Huecos de la jornada dados intervalos ocupados ordenados por inicio"""
+    libres = []
+    cursor = apertura
+    for inicio, fin in ocupados:
+        if inicio > cursor:
+            libres.append((cursor, min(inicio, cierre)))
+        cursor = max(cursor, fin)
+        if cursor >= cierre:
+            break
+    if cursor < cierre:
+        libres.append((cursor, cierre))
+    return [(i, f) for i, f in libres if i < f]
+
+
+def _fusionar(intervalos):
+    """Une intervalos solapados o contiguos (entrada ordenada por inicio)"""
+    fusionados = []
+    for inicio, fin in intervalos:
+        if fusionados and inicio <= fusionados[-1][1]:
+            if fin > fusionados[-1][1]:
+                fusionados[-1] = (fusionados[-1][0], fin)
+        else:
+            fusionados.append((inicio, fin))
+    return fusionados
+
+
+def _consulta(ids, desde, hasta):
+    return (
+        Reserva.objects.filter(laboratorio_id__in=ids, fecha__range=(desde, hasta))
+        .exclude(estado='Cancelada')
+        .order_by('laboratorio_id', 'fecha', 'hora_inicio')
+        .values_list('laboratorio_id', 'fecha', 'hora_inicio', 'hora_fin', 'estado')
+    )
+
+
+def _por_dia(filas, ids, desde, hasta):
+    reservas = {}
+    for (lab_id, fecha), grupo in groupby(filas, key=lambda f: (f[0], f[1])):
+        reservas[(lab_id, fecha)] = [(ini, fin, estado) for _, _, ini, fin, estado in grupo]
+
+    dias = [desde + datetime.timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    resultado = {}
+    for lab_id in ids:
+        por_dia = {}
+        for fecha in dias:
+            ocupado = reservas.get((lab_id, fecha), [])
+            por_dia[fecha] = {
+                'ocupado': ocupado,
+                'libre': _libres(_fusionar((ini, fin) for ini, fin, _ in ocupado)),
+            }
+        resultado[lab_id] = por_dia
+    return resultado
+
+
+def calcular(laboratorios, desde, hasta):
+    """
+    Devuelve {laboratorio_id: {fecha: {'ocupado': [...], 'libre': [...]}}}
+    para cada laboratorio y cada día del rango (ambos inclusive).
+    `ocupado` contiene (inicio, fin, estado); `libre`, (inicio, fin).
+    """
+    ids = [lab.pk for lab in laboratorios]
+    return _por_dia(_consulta(ids, desde, hasta), ids, desde, hasta)
+
+
+async def acalcular(laboratorios, desde, hasta):
+    """Como calcular(), con el ORM async"""
+    ids = [lab.pk for lab in laboratorios]
+    filas = [fila async for fila in _consulta(ids, desde, hasta)]
+    return _por_dia(filas, ids, desde, hasta)
+
+
+def _hora(t):
+    return t.strftime('%H:%M')
+
+
+def _json(laboratorios, desde, hasta, datos):
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'apertura': _hora(HORA_APERTURA),
+        'cierre': _hora(HORA_CIERRE),
+        'laboratorios': [
+            {
+                'id': lab.pk,
+                'nombre': lab.nombre,
+                'dias': [
+                    {
+                        'fecha': fecha.isoformat(),
+                        'ocupado': [[_hora(i), _hora(f), estado] for i, f, estado in dia['ocupado']],
+                        'libre': [[_hora(i), _hora(f)] for i, f in dia['libre']],
+                    }
+                    for fecha, dia in datos[lab.pk].items()
+                ],
+            }
+            for lab in laboratorios
+        ],
+    }
+
+
+def serializar(laboratorios, desde, hasta):
+    """Estructura JSON de la disponibilidad"""
+    return _json(laboratorios, desde, hasta, calcular(laboratorios, desde, hasta))
+
+
+async def aserializar(laboratorios, desde, hasta):
+    return _json(laboratorios, desde, hasta, await acalcular(laboratorios, desde, hasta))
+
+
+def _laboratorios(ids):
+    qs = Laboratorio.objects.order_by('nombre')
+    ids = [i for i in ids if i.isdigit()]
+    if ids:
+        qs = qs.filter(pk__in=ids)
+    return qs
+
+
+def laboratorios_solicitados(ids):
+    """Laboratorios por id (todos si no se indica ninguno), ordenados por nombre"""
+    return list(_laboratorios(ids))
+
+
+async def alaboratorios_solicitados(ids):
+    return [lab async for lab in _laboratorios(ids)]
@@ -0,0 +1,152 @@
+# CAMILA_JESUS/estadisticas.py
+"""
+Mantenimiento del resumen diario EstadisticaDiaria.
+
+Las altas, cambios y bajas individuales de Reserva llegan por señales
+(signals.py); las operaciones masivas que usan queryset.update() deben
+pasar por cambiar_estado_masivo() para no desincronizar el resumen. Las
+reservas archivadas (archivo.py) se siguen contando.
+"""
+import heapq
+from collections import Counter
+from itertools import groupby
+from operator import itemgetter
+
+from django.db import IntegrityError, connections, router, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from . import caches
+from .models import VERSION_RESERVAS, EstadisticaDiaria, Reserva, ReservaArchivada, VersionDatos
+
+TAMANO_LOTE = 1000
+
+
+def ajustar(clave, delta):
+    """Suma `delta` al contador de la clave (fecha, laboratorio_id, docente_id, estado)"""
+    ajustar_varios({clave: delta})
+
+
+def ajustar_varios(deltas):
+    """
+    Aplica {clave: delta} al resumen. Los incrementos van juntos en un solo
+    INSERT ... ON CONFLICT DO UPDATE (SQLite y PostgreSQL); los decrementos,
+    cuya fila ya existe, con un UPDATE cada uno.
+    """
+    positivos = {}
+    for clave, delta in deltas.items():
+        if delta > 0:
+            positivos[clave] = delta
+        elif delta < 0:
+            fecha, laboratorio_id, docente_id, estado = clave
+            EstadisticaDiaria.objects.filter(
+                fecha=fecha, laboratorio_id=laboratorio_id, docente_id=docente_id, estado=estado,
+            ).update(total=F('total') + delta)
+    if positivos:
+        _sumar(positivos)
+
+
+def _sumar(deltas):
+    connection = connections[router.db_for_write(EstadisticaDiaria)]
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        for (fecha, laboratorio_id, docente_id, estado), delta in deltas.items():
+            filtro = {'fecha': fecha, 'laboratorio_id': laboratorio_id, 'docente_id': docente_id, 'estado': estado}
+            if EstadisticaDiaria.objects.filter(**filtro).update(total=F('total') + delta):
+                continue
+            try:
+                with transaction.atomic():
+                    EstadisticaDiaria.objects.create(total=delta, **filtro)
+            except IntegrityError:
+                # Otro proceso creó la fila entre el UPDATE y el INSERT
+                EstadisticaDiaria.objects.filter(**filtro).update(total=F('total') + delta)
+        return
+
+    tabla = connection.ops.quote_name(EstadisticaDiaria._meta.db_table)
+    valores = ', '.join(['(%s, %s, %s, %s, %s)'] * len(deltas))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {tabla} (fecha, laboratorio_id, docente_id, estado, total) VALUES {valores} "
+            f"ON CONFLICT (fecha, laboratorio_id, docente_id, estado) DO UPDATE SET total = {tabla}.total + excluded.total",
+            [valor for clave, delta in deltas.items() for valor in (*clave, delta)],
+        )
+
+
+def cambiar_estado_masivo(queryset, estado):
+    """
+    Equivalente a queryset.update(estado=estado) que mantiene el resumen
+    diario. Devuelve la cantidad de reservas actualizadas.
+    """
+    with transaction.atomic():
+        filas = list(
+            queryset.exclude(estado=estado).order_by()
+            .values_list('pk', 'fecha', 'laboratorio_id', 'docente_id', 'estado')
+        )
+        return cambiar_estado_filas(filas, estado)
+
+
+def cambiar_estado_filas(filas, estado):
+    """
+    Como cambiar_estado_masivo() con las reservas ya leídas, sin volver a
+    consultarlas: `filas` son tuplas (pk, fecha, laboratorio_id, docente_id,
+    estado) vigentes, p. ej. leídas bajo el bloqueo de su agenda. Debe
+    llamarse dentro de transaction.atomic().
+    """
+    filas = [fila for fila in filas if fila[4] != estado]
+    if not filas:
+        return 0
+    actualizadas = Reserva.objects.filter(pk__in=[fila[0] for fila in filas]).update(
+        estado=estado, fecha_modificacion=timezone.now(),
+    )
+    deltas = Counter()
+    for _, fecha, laboratorio_id, docente_id, anterior in filas:
+        deltas[(fecha, laboratorio_id, docente_id, anterior)] -= 1
+        deltas[(fecha, laboratorio_id, docente_id, estado)] += 1
+    ajustar_varios(deltas)
+    VersionDatos.incrementar(VERSION_RESERVAS)
+    caches.invalidar_reservas({fila[3] for fila in filas}, {fila[2] for fila in filas})
+    return actualizadas
+
+
+def registrar_creadas(reservas):
+    """Suma al resumen reservas insertadas con bulk_create (no disparan señales)"""
+    conteo = Counter(r.clave_estadistica() for r in reservas)
+    ajustar_varios(conteo)
+    if conteo:
+        VersionDatos.incrementar(VERSION_RESERVAS)
+        caches.invalidar_reservas((clave[2] for clave in conteo), (clave[1] for clave in conteo))
+
+
+def _grupos_ordenados(modelo):
+    return (
+        ((g['fecha'], g['laboratorio'], g['docente'], g['estado']), g['n'])
+        for g in modelo.objects.order_by('fecha', 'laboratorio_id', 'docente_id', 'estado')
+        .values('fecha', 'laboratorio', 'docente', 'estado').annotate(n=Count('id')).iterator(chunk_size=TAMANO_LOTE)
+    )
+
+
+def reconstruir():
+    """
+    Recalcula todo el resumen desde Reserva y ReservaArchivada. Devuelve la
+    cantidad de filas creadas.
+    """
+    # Los dos conteos llegan ordenados por clave: se mezclan sin cargarlos en memoria
+    conteos = heapq.merge(_grupos_ordenados(Reserva), _grupos_ordenados(ReservaArchivada), key=itemgetter(0))
+    with transaction.atomic():
+        EstadisticaDiaria.objects.all().delete()
+        filas = (
+            EstadisticaDiaria(
+                fecha=fecha, laboratorio_id=laboratorio_id, docente_id=docente_id, estado=estado,
+                total=sum(n for _, n in grupo),
+            )
+            for (fecha, laboratorio_id, docente_id, estado), grupo in groupby(conteos, key=itemgetter(0))
+        )
+        creadas = 0
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= TAMANO_LOTE:
+                creadas += len(EstadisticaDiaria.objects.bulk_create(lote))
+                lote = []
+        if lote:
+            creadas += len(EstadisticaDiaria.objects.bulk_create(lote))
+    return creadas
@@ -0,0 +1,137 @@
+# CAMILA_JESUS/exportaciones.py
+"""
+Exportaciones CSV en segundo plano.
+
+El administrador solicita una exportación (solicitar), un worker local
+(`manage.py procesar_exportaciones`) la toma de la base de datos y escribe
+un CSV comprimido en EXPORTACIONES_DIR. Una solicitud con los mismos
+filtros reutiliza el archivo mientras no haya escrituras nuevas en Reserva.
+
+El worker renueva fecha_inicio mientras escribe; una exportación En proceso
+sin renovar durante DURACION_RECLAMO (worker caído o reiniciado en un
+despliegue) se vuelve a tomar, así la solicitud reutilizada no queda
+colgada.
+"""
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import replicas
+from .archivo import con_historial
+from .models import VERSION_RESERVAS, Exportacion, VersionDatos
+
+FILTROS_VALIDOS = ('fecha', 'laboratorio', 'estado', 'docente', 'q')
+
+# Segundos sin renovar tras los que una exportación En proceso se da por abandonada
+DURACION_RECLAMO = 600
+
+
+def normalizar_filtros(params):
+    """Solo los filtros conocidos y con valor, para que filtros iguales den la misma clave"""
+    return {k: params.get(k) for k in FILTROS_VALIDOS if params.get(k)}
+
+
+def clave_filtros(filtros):
+    return hashlib.sha1(json.dumps(filtros, sort_keys=True).encode()).hexdigest()
+
+
+def solicitar(usuario, params):
+    """
+    Devuelve (exportacion, reutilizada). Reutiliza una exportación vigente
+    con los mismos filtros; si no hay, encola una nueva.
+    """
+    filtros = normalizar_filtros(params)
+    clave = clave_filtros(filtros)
+    version = VersionDatos.actual(VERSION_RESERVAS)
+
+    vigente = Exportacion.objects.filter(
+        clave=clave, version_datos=version, estado__in=['Pendiente', 'En proceso', 'Completada'],
+    ).first()
+    if vigente:
+        return vigente, True
+
+    exportacion = Exportacion.objects.create(
+        solicitada_por=usuario, filtros=filtros, clave=clave, version_datos=version,
+    )
+    return exportacion, False
+
+
+def _disponibles(ahora):
+    """Pendientes y En proceso abandonadas"""
+    limite = ahora - datetime.timedelta(seconds=DURACION_RECLAMO)
+    return Q(estado='Pendiente') | Q(estado='En proceso', fecha_inicio__lt=limite)
+
+
+def tomar_siguiente():
+    """Reclama atómicamente la exportación disponible más antigua (o None)"""
+    ahora = timezone.now()
+    for pk in Exportacion.objects.filter(_disponibles(ahora)).order_by('fecha_creacion').values_list('pk', flat=True)[:10]:
+        # El mismo filtro en el UPDATE: si otro worker la tomó primero no cambia nada
+        reclamada = Exportacion.objects.filter(_disponibles(ahora), pk=pk).update(
+            estado='En proceso', fecha_inicio=ahora,
+        )
+        if reclamada:
+            with replicas.primario():
+                return Exportacion.objects.get(pk=pk)
+    return None
+
+
+def ruta_archivo(exportacion):
+    return os.path.join(settings.EXPORTACIONES_DIR, f"exportacion_{exportacion.pk}.csv.gz")
+
+
+def procesar(exportacion):
+    """Genera el CSV comprimido de una exportación ya reclamada"""
+    # Import diferido: views importa este módulo
+    from .views import filas_csv, filtrar_reservas_admin
+
+    os.makedirs(settings.EXPORTACIONES_DIR, exist_ok=True)
+    destino = ruta_archivo(exportacion)
+    temporal = f"{destino}.tmp"
+
+    try:
+        # La versión vigente al empezar es la que representa el archivo
+        exportacion.version_datos = VersionDatos.actual(VERSION_RESERVAS)
+        querysets = con_historial(lambda qs: filtrar_reservas_admin(qs, exportacion.filtros))
+        filas = -1  # encabezado
+        renovada = time.monotonic()
+        with gzip.open(temporal, 'wt', encoding='utf-8', newline='') as f:
+            for linea in filas_csv(*querysets):
+                f.write(linea)
+                filas += 1
+                if time.monotonic() - renovada > DURACION_RECLAMO / 3:
+                    # Sigue viva: que otro worker no la tome
+                    Exportacion.objects.filter(pk=exportacion.pk).update(fecha_inicio=timezone.now())
+                    renovada = time.monotonic()
+        os.replace(temporal, destino)
+    except Exception as e:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        exportacion.estado = 'Fallida'
+        exportacion.error = str(e)
+        exportacion.fecha_fin = timezone.now()
+        exportacion.save(update_fields=['estado', 'error', 'fecha_fin'])
+        return exportacion
+
+    with transaction.atomic():
+        exportacion.estado = 'Completada'
+        exportacion.archivo = destino
+        exportacion.filas = filas
+        exportacion.fecha_fin = timezone.now()
+        exportacion.save(update_fields=['estado', 'archivo', 'filas', 'version_datos', 'fecha_fin'])
+        # Los archivos anteriores con los mismos filtros ya no se reutilizarán
+        for anterior in Exportacion.objects.filter(clave=exportacion.clave, estado='Completada').exclude(pk=exportacion.pk):
+            if anterior.archivo and os.path.exists(anterior.archivo):
+                os.remove(anterior.archivo)
+        Exportacion.objects.filter(clave=exportacion.clave, estado='Completada').exclude(pk=exportacion.pk).update(
+            estado='Vencida', archivo='',
+        )
+    return exportacion
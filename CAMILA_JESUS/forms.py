@@ -1,6 +1,8 @@
 # CAMILA_JESUS/forms.py
 from django import forms
-from .models import Reserva
+from .models import Reserva, Laboratorio
+from .services import MAX_OCURRENCIAS, generar_fechas
+from . import caches
 
 class ReservaForm(forms.ModelForm):
     class Meta:
@@ -21,3 +23,77 @@ class ReservaForm(forms.ModelForm):
             'motivo': 'Motivo de la reserva',
         }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Opciones desde la caché: no consulta la tabla en cada render
+        self.fields['laboratorio'].choices = caches.opciones_laboratorio()
+
+
+
+FRECUENCIAS = [
+    (1, 'Semanal'),
+    (2, 'Quincenal'),
+]
+
+
+class ReservaRecurrenteForm(forms.Form):
+    """Reserva que se repite cada semana o cada dos semanas dentro de un rango de fechas"""
+    laboratorio = forms.ModelChoiceField(
+        queryset=Laboratorio.objects.all(),
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Laboratorio',
+    )
+    fecha_inicio = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Primera fecha',
+    )
+    fecha_fin = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        label='Repetir hasta',
+    )
+    frecuencia = forms.TypedChoiceField(
+        choices=FRECUENCIAS, coerce=int,
+        widget=forms.Select(attrs={'class': 'form-control'}),
+        label='Frecuencia',
+    )
+    hora_inicio = forms.TimeField(
+        widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
+        label='Hora de inicio',
+    )
+    hora_fin = forms.TimeField(
+        widget=forms.TimeInput(attrs={'type': 'time', 'class': 'form-control'}),
+        label='Hora de fin',
+    )
+    motivo = forms.CharField(
+        widget=forms.Textarea(attrs={'rows': 3, 'class': 'form-control', 'placeholder': 'Describe el motivo de la reserva'}),
+        label='Motivo de la reserva',
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['laboratorio'].choices = caches.opciones_laboratorio()
+
+    def clean(self):
+        cleaned = super().clean()
+        inicio, fin = cleaned.get('hora_inicio'), cleaned.get('hora_fin')
+        if inicio and fin and inicio >= fin:
+            raise forms.ValidationError("La hora de inicio debe ser anterior a la hora de fin.")
+
+        desde, hasta = cleaned.get('fecha_inicio'), cleaned.get('fecha_fin')
+        if desde and hasta:
+            if hasta < desde:
+                raise forms.ValidationError("La fecha final debe ser posterior a la primera fecha.")
+            if len(generar_fechas(desde, hasta, cleaned.get('frecuencia') or 1)) > MAX_OCURRENCIAS:
+                raise forms.ValidationError(f"Una reserva recurrente admite como máximo {MAX_OCURRENCIAS} fechas.")
+        return cleaned
+
+
+class ImportarCSVForm(forms.Form):
+    """CSV con el formato de la exportación de reservas"""
+    archivo = forms.FileField(
+        label='Archivo CSV',
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv,text/csv', 'class': 'form-control'}),
+    )
+    simular = forms.BooleanField(
+        required=False, label='Solo validar (no guardar nada)',
+    )
@@ -0,0 +1,191 @@
+# CAMILA_JESUS/importaciones.py
+"""
+Importación masiva de reservas (y de los laboratorios que falten) desde un
+CSV con el mismo formato que la exportación de la administración, de modo
+que un archivo exportado se puede volver a importar tal cual. Las columnas
+ID y Fecha Creación se ignoran.
+
+El archivo se lee dos veces sin cargarlo entero en memoria:
+
+1. Se recogen los nombres de usuario y de laboratorio distintos, que se
+   resuelven con una consulta cada uno (los laboratorios que no existen se
+   crean con bulk_create).
+2. Se validan las filas por lotes. Por cada lote se bloquean sus agendas
+   (laboratorio, día) en orden, se cargan las reservas activas de esas
+   agendas con una consulta y el solapamiento se verifica en memoria; las
+   filas válidas se insertan con bulk_create en la misma transacción.
+
+Las filas inválidas no detienen la importación: se devuelven como
+(línea, mensaje).
+"""
+import csv
+import datetime
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from . import busqueda, caches, estadisticas
+from .models import ESTADOS, VERSION_LABORATORIOS, Laboratorio, Reserva, VersionDatos, bloquear_agenda
+from .services import se_solapa
+
+TAMANO_LOTE = 1000
+# Errores que se conservan para el informe (el total se cuenta siempre)
+MAX_ERRORES = 1000
+
+COLUMNAS_REQUERIDAS = ('Docente', 'Laboratorio', 'Fecha', 'Hora Inicio', 'Hora Fin', 'Motivo')
+ESTADO_POR_DEFECTO = 'Aprobada'
+ESTADOS_VALIDOS = {valor for valor, _ in ESTADOS}
+
+
+class ArchivoInvalido(Exception):
+    """El CSV no tiene el formato esperado (no es un error de una fila)"""
+
+
+class Resultado:
+    def __init__(self):
+        self.creadas = 0
+        self.laboratorios_creados = 0
+        self.total_errores = 0
+        self.errores = []
+
+    def error(self, linea, mensaje):
+        self.total_errores += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append((linea, mensaje))
+
+
+def _lector(archivo):
+    archivo.seek(0)
+    lector = csv.DictReader(archivo)
+    faltantes = [c for c in COLUMNAS_REQUERIDAS if c not in (lector.fieldnames or ())]
+    if faltantes:
+        raise ArchivoInvalido(f"Faltan columnas: {', '.join(faltantes)}.")
+    return lector
+
+
+def _nombres(archivo):
+    usuarios, laboratorios = set(), set()
+    for fila in _lector(archivo):
+        usuarios.add((fila['Docente'] or '').strip())
+        laboratorios.add((fila['Laboratorio'] or '').strip())
+    usuarios.discard('')
+    laboratorios.discard('')
+    return usuarios, laboratorios
+
+
+def _resolver_laboratorios(nombres, simular, resultado):
+    laboratorios = {lab.nombre: lab for lab in Laboratorio.objects.filter(nombre__in=nombres)}
+    nuevos = [Laboratorio(nombre=nombre) for nombre in sorted(nombres - laboratorios.keys())]
+    if nuevos and not simular:
+        # ignore_conflicts: otro proceso pudo crearlos entre la consulta y el INSERT
+        Laboratorio.objects.bulk_create(nuevos, ignore_conflicts=True)
+        laboratorios.update(
+            (lab.nombre, lab) for lab in Laboratorio.objects.filter(nombre__in=[n.nombre for n in nuevos])
+        )
+        # bulk_create no dispara señales: selector, API y disponibilidad los deben ver
+        VersionDatos.incrementar(VERSION_LABORATORIOS)
+        caches.invalidar(caches.GRUPO_LABORATORIOS)
+    elif nuevos:
+        # Al simular no se crean: ids negativos, sin reservas previas
+        laboratorios.update((lab.nombre, Laboratorio(pk=-i, nombre=lab.nombre)) for i, lab in enumerate(nuevos, 1))
+    resultado.laboratorios_creados = len(nuevos)
+    return laboratorios
+
+
+def _parsear(fila, usuarios, laboratorios):
+    """Reserva sin guardar a partir de una fila; lanza ValueError con el motivo"""
+    nombre_usuario = (fila['Docente'] or '').strip()
+    docente = usuarios.get(nombre_usuario)
+    if docente is None:
+        raise ValueError(f"El docente '{nombre_usuario}' no existe.")
+    laboratorio = laboratorios.get((fila['Laboratorio'] or '').strip())
+    if laboratorio is None:
+        raise ValueError("Falta el laboratorio.")
+    try:
+        fecha = datetime.date.fromisoformat((fila['Fecha'] or '').strip())
+        inicio = datetime.time.fromisoformat((fila['Hora Inicio'] or '').strip())
+        fin = datetime.time.fromisoformat((fila['Hora Fin'] or '').strip())
+    except ValueError:
+        raise ValueError("Fecha u hora inválida (use AAAA-MM-DD y HH:MM).")
+    if inicio >= fin:
+        raise ValueError("La hora de inicio debe ser anterior a la hora de fin.")
+    estado = (fila.get('Estado') or '').strip() or ESTADO_POR_DEFECTO
+    if estado not in ESTADOS_VALIDOS:
+        raise ValueError(f"Estado desconocido: '{estado}'.")
+    motivo = (fila['Motivo'] or '').strip()
+    if not motivo:
+        raise ValueError("Falta el motivo.")
+    return Reserva(
+        docente=docente, laboratorio=laboratorio, fecha=fecha,
+        hora_inicio=inicio, hora_fin=fin, motivo=motivo, estado=estado,
+    )
+
+
+def _procesar_lote(lote, simular, aceptadas, resultado):
+    """lote: [(línea, Reserva)]. `aceptadas` guarda lo aceptado al simular."""
+    agendas = sorted({(r.laboratorio_id, r.fecha) for _, r in lote})
+    with transaction.atomic():
+        if not simular:
+            # Orden fijo de bloqueo para no provocar interbloqueos
+            for laboratorio_id, fecha in agendas:
+                bloquear_agenda(laboratorio_id, fecha)
+
+        ocupados = {agenda: list(aceptadas.get(agenda, ())) for agenda in agendas}
+        for lab_id, fecha, inicio, fin in (
+            Reserva.objects.filter(
+                laboratorio_id__in={lab for lab, _ in agendas}, fecha__in={fecha for _, fecha in agendas},
+            ).exclude(estado='Cancelada').values_list('laboratorio_id', 'fecha', 'hora_inicio', 'hora_fin')
+        ):
+            if (lab_id, fecha) in ocupados:
+                ocupados[(lab_id, fecha)].append((inicio, fin))
+
+        nuevas = []
+        for linea, reserva in lote:
+            agenda = (reserva.laboratorio_id, reserva.fecha)
+            if reserva.estado != 'Cancelada':
+                if se_solapa(reserva.hora_inicio, reserva.hora_fin, ocupados[agenda]):
+                    resultado.error(
+                        linea, f"Se solapa con otra reserva en {reserva.laboratorio.nombre} el {reserva.fecha}.",
+                    )
+                    continue
+                ocupados[agenda].append((reserva.hora_inicio, reserva.hora_fin))
+                if simular:
+                    aceptadas.setdefault(agenda, []).append((reserva.hora_inicio, reserva.hora_fin))
+            nuevas.append(reserva)
+
+        if not simular:
+            creadas = Reserva.objects.bulk_create(nuevas)
+            # bulk_create no dispara señales
+            estadisticas.registrar_creadas(creadas)
+            busqueda.indexar_reservas(creadas)
+        resultado.creadas += len(nuevas)
+
+
+def importar(archivo, lote=TAMANO_LOTE, simular=False):
+    """
+    Importa reservas desde un archivo de texto CSV ya abierto (y que admita
+    seek). Con `simular` valida todo sin escribir. Devuelve un Resultado;
+    lanza ArchivoInvalido si faltan columnas.
+    """
+    resultado = Resultado()
+    nombres_usuario, nombres_laboratorio = _nombres(archivo)
+    usuarios = {u.username: u for u in User.objects.filter(username__in=nombres_usuario)}
+    laboratorios = _resolver_laboratorios(nombres_laboratorio, simular, resultado)
+
+    aceptadas = {}
+    pendientes = []
+    lector = _lector(archivo)
+    for fila in lector:
+        try:
+            pendientes.append((lector.line_num, _parsear(fila, usuarios, laboratorios)))
+        except ValueError as e:
+            resultado.error(lector.line_num, str(e))
+            continue
+        if len(pendientes) >= lote:
+            _procesar_lote(pendientes, simular, aceptadas, resultado)
+            pendientes = []
+    if pendientes:
+        _procesar_lote(pendientes, simular, aceptadas, resultado)
+    # Los solapamientos se detectan al cerrar cada lote, después de otros errores
+    resultado.errores.sort()
+    return resultado
@@ -0,0 +1,185 @@
+# Utilidades compartidas por los comandos de benchmark
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
+
+
+@contextmanager
+def base_temporal(alias='default'):
+    """
+    Crea una base de datos desechable (como las de los tests) para que los
+    benchmarks nunca escriban en la base real. En SQLite se usa un archivo
+    en disco para que varios hilos compartan los mismos datos. La caché
+    también pasa a un directorio temporal: sus versiones y valores saldrían
+    de la base desechable.
+    """
+    connection = connections[alias]
+    directorio = tempfile.mkdtemp(prefix='camila_bench_')
+    if connection.vendor == 'sqlite':
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directorio, 'bench.sqlite3')
+    cache_temporal = override_settings(CACHES={'default': {
+        **settings.CACHES['default'],
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(directorio, 'cache'),
+    }})
+
+    nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        with cache_temporal:
+            yield connection
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def poblar_reservas(total, laboratorios=10, docentes=50, desde=None, dias=365, semilla=42, lote=5000):
+    """
+    Inserta `total` reservas sintéticas con bulk_create (sin señales).
+    Devuelve (laboratorios, docentes) creados.
+    """
+    import datetime
+    import random
+
+    from django.contrib.auth.models import User
+
+    from CAMILA_JESUS.models import ESTADOS, Laboratorio, Reserva
+
+    rng = random.Random(semilla)
+    desde = desde or datetime.date(2024, 1, 15)
+    labs = Laboratorio.objects.bulk_create(
+        [Laboratorio(nombre=f'Laboratorio {i:03d}') for i in range(laboratorios)]
+    )
+    users = User.objects.bulk_create(
+        [User(username=f'docente{i:04d}', first_name=f'Nombre{i}', last_name=f'Apellido{i}') for i in range(docentes)]
+    )
+    if not users[0].pk:
+        # Backends sin RETURNING en bulk_create
+        users = list(User.objects.filter(username__startswith='docente').order_by('pk'))
+    estados = [e for e, _ in ESTADOS]
+
+    pendientes = []
+    for _ in range(total):
+        hora = rng.randrange(7, 20)
+        pendientes.append(Reserva(
+            docente=rng.choice(users),
+            laboratorio=rng.choice(labs),
+            fecha=desde + datetime.timedelta(days=rng.randrange(dias)),
+            hora_inicio=datetime.time(hora, 0),
+            hora_fin=datetime.time(hora + 1, 0),
+            motivo='Práctica de laboratorio programada',
+            estado=rng.choices(estados, weights=(2, 6, 1, 1))[0],
+        ))
+        if len(pendientes) >= lote:
+            Reserva.objects.bulk_create(pendientes)
+            pendientes = []
+    if pendientes:
+        Reserva.objects.bulk_create(pendientes)
+    return labs, users
+
+
+# Probabilidad de que un laboratorio esté ocupado a cada hora de la jornada
+OCUPACION_POR_HORA = {
+    7: 0.35, 8: 0.7, 9: 0.8, 10: 0.8, 11: 0.7, 12: 0.3, 13: 0.35,
+    14: 0.7, 15: 0.75, 16: 0.7, 17: 0.5, 18: 0.45, 19: 0.3, 20: 0.15,
+}
+# Duraciones en medias horas (1 h, 1 h 30, 2 h, 3 h) y su peso
+DURACIONES = ((2, 3, 4, 6), (45, 15, 30, 10))
+# Promedio resultante por laboratorio y día del calendario (medido)
+RESERVAS_POR_LAB_DIA = 4.2
+
+NOMBRES = ('Ana', 'Luis', 'María', 'Carlos', 'Lucía', 'Jorge', 'Sofía', 'Andrés', 'Paula', 'Diego',
+           'Valentina', 'Camilo', 'Laura', 'Julián', 'Natalia', 'Felipe')
+APELLIDOS = ('Martínez', 'Pérez', 'Gómez', 'Rodríguez', 'López', 'García', 'Hernández', 'Díaz', 'Ramírez',
+             'Torres', 'Vargas', 'Castro', 'Rojas', 'Moreno', 'Jiménez', 'Muñoz', 'Ortiz', 'Suárez')
+ACTIVIDADES = ('Práctica de', 'Laboratorio de', 'Taller de', 'Evaluación práctica de', 'Repaso de', 'Proyecto de')
+ASIGNATURAS = ('química orgánica', 'química analítica', 'titulación ácido-base', 'física mecánica', 'óptica',
+               'electromagnetismo', 'microbiología', 'cultivos celulares', 'bioquímica', 'electrónica digital',
+               'circuitos', 'espectrofotometría', 'cromatografía', 'genética', 'termodinámica', 'redes')
+
+
+def _factor_calendario(fecha):
+    """Menos demanda los sábados y en vacaciones; nada los domingos"""
+    if fecha.weekday() == 6:
+        return 0.0
+    factor = 0.4 if fecha.weekday() == 5 else 1.0
+    if (fecha.month, fecha.day) >= (12, 15) or (fecha.month, fecha.day) < (1, 20) or fecha.month == 7:
+        factor *= 0.15
+    return factor
+
+
+def generar_agenda(total, laboratorios=20, docentes=200, desde=None, hoy=None, semilla=42, lote=5000):
+    """
+    Inserta `total` reservas sin solapamientos y con distribución realista:
+    más demanda en horas de clase y entre semana, duraciones de 1 a 3 horas,
+    pocos docentes con muchas reservas y estados según la fecha (las pasadas
+    casi todas resueltas; las futuras, en su mayoría pendientes).
+    Se recorren los días desde `desde` hasta completar `total`.
+    Devuelve (laboratorios, docentes) creados.
+    """
+    import datetime
+    import random
+
+    from django.contrib.auth.models import User
+
+    from CAMILA_JESUS.models import Laboratorio, Reserva
+
+    rng = random.Random(semilla)
+    desde = desde or datetime.date(2022, 1, 17)
+    labs = Laboratorio.objects.bulk_create(
+        [Laboratorio(nombre=f'Laboratorio {i:03d}') for i in range(laboratorios)]
+    )
+    users = User.objects.bulk_create([
+        User(
+            username=f'docente{i:04d}', first_name=NOMBRES[i % len(NOMBRES)],
+            last_name=f'{APELLIDOS[i % len(APELLIDOS)]} {APELLIDOS[(i * 7 + 3) % len(APELLIDOS)]}',
+        )
+        for i in range(docentes)
+    ])
+    if not users[0].pk:
+        users = list(User.objects.filter(username__startswith='docente').order_by('pk'))
+    if hoy is None:
+        # Tres cuartas partes de las reservas quedan en el pasado
+        hoy = desde + datetime.timedelta(days=int(total / (laboratorios * RESERVAS_POR_LAB_DIA) * 0.75))
+    # Popularidad tipo Zipf: el docente i reserva ~1/(i+1)^0.8
+    pesos_docente = [1 / (i + 1) ** 0.8 for i in range(len(users))]
+    labs_por_popularidad = sorted(labs, key=lambda _: rng.random())
+    demanda_lab = {lab.pk: 0.6 + 0.4 * (1 - i / max(len(labs) - 1, 1)) for i, lab in enumerate(labs_por_popularidad)}
+
+    def media_hora(n):
+        return datetime.time(n // 2, 30 * (n % 2))
+
+    creadas = 0
+    pendientes = []
+    fecha = desde
+    while creadas < total:
+        factor = _factor_calendario(fecha)
+        for lab in labs:
+            franja = 14  # 07:00
+            while franja < 42 and creadas < total:  # hasta las 21:00
+                if rng.random() >= OCUPACION_POR_HORA[franja // 2] * factor * demanda_lab[lab.pk]:
+                    franja += 1
+                    continue
+                fin = min(franja + rng.choices(*DURACIONES)[0], 42)
+                if fecha < hoy:
+                    estado = rng.choices(('Aprobada', 'Rechazada', 'Cancelada', 'Pendiente'), (80, 8, 10, 2))[0]
+                else:
+                    estado = rng.choices(('Pendiente', 'Aprobada', 'Cancelada'), (65, 30, 5))[0]
+                pendientes.append(Reserva(
+                    docente=rng.choices(users, pesos_docente)[0], laboratorio=lab, fecha=fecha,
+                    hora_inicio=media_hora(franja), hora_fin=media_hora(fin),
+                    motivo=f"{rng.choice(ACTIVIDADES)} {rng.choice(ASIGNATURAS)}", estado=estado,
+                ))
+                creadas += 1
+                franja = fin
+                if len(pendientes) >= lote:
+                    Reserva.objects.bulk_create(pendientes)
+                    pendientes = []
+        fecha += datetime.timedelta(days=1)
+    if pendientes:
+        Reserva.objects.bulk_create(pendientes)
+    return labs, users
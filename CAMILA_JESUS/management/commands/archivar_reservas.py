@@ -0,0 +1,33 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from CAMILA_JESUS import archivo
+from CAMILA_JESUS.models import Reserva
+
+
+class Command(BaseCommand):
+    help = ('Mueve a ReservaArchivada, por lotes y sin transacciones largas, las reservas con fecha '
+            'anterior al corte (por defecto, hace ARCHIVO_MESES meses).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antes-de', type=datetime.date.fromisoformat, help='Fecha de corte AAAA-MM-DD')
+        parser.add_argument('--meses', type=int, default=settings.ARCHIVO_MESES, help='Corte en meses hacia atrás')
+        parser.add_argument('--lote', type=int, default=archivo.TAMANO_LOTE)
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes')
+        parser.add_argument('--simular', action='store_true', help='Solo cuenta las reservas que se moverían')
+
+    def handle(self, *args, **options):
+        corte = options['antes_de'] or archivo.corte_por_meses(options['meses'])
+        if corte > timezone.localdate():
+            raise CommandError('La fecha de corte no puede ser futura.')
+
+        if options['simular']:
+            total = Reserva.objects.filter(fecha__lt=corte).count()
+            self.stdout.write(f"Se archivarían {total} reservas anteriores al {corte}.")
+            return
+
+        movidas = archivo.archivar(corte, lote=options['lote'], pausa=options['pausa'])
+        self.stdout.write(self.style.SUCCESS(f"{movidas} reservas anteriores al {corte} archivadas."))
@@ -0,0 +1,166 @@
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from CAMILA_JESUS import estadisticas
+
+from ._bench import base_temporal, generar_agenda
+from .bench_vistas import percentil
+
+# (rol, nombre de URL) de las vistas async que se comparan
+RUTAS = [
+    ('docente', 'camila:docente_dashboard'),
+    ('docente', 'camila:docente_reserva_list'),
+    ('docente', 'camila:disponibilidad'),
+    ('admin', 'camila:admin_dashboard'),
+    ('admin', 'camila:admin_reserva_list'),
+    ('admin', 'camila:admin_estadisticas'),
+]
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = ('Compara el rendimiento con peticiones concurrentes del despliegue WSGI (workers sync) '
+            'y del ASGI (workers de uvicorn) lanzando gunicorn con gunicorn.conf.py sobre una '
+            'base temporal SQLite.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=100_000)
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrencia', type=int, default=32, help='Clientes simultáneos')
+        parser.add_argument('--peticiones', type=int, default=50, help='Peticiones por cliente')
+        parser.add_argument('--salida', default='bench_asgi_wsgi.json')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        directorio = tempfile.TemporaryDirectory()
+        try:
+            with base_temporal() as connection:
+                if connection.vendor != 'sqlite':
+                    raise CommandError('Este benchmark usa una base temporal SQLite compartida con los servidores.')
+                self.stdout.write(f"Generando {options['reservas']} reservas...")
+                generar_agenda(options['reservas'])
+                estadisticas.reconstruir()
+                cookies = self.sesiones()
+                base = connection.settings_dict['NAME']
+                # Los servidores abren la base por su cuenta
+                connection.close()
+
+                resultado = {'parametros': {k: options[k] for k in ('reservas', 'workers', 'concurrencia', 'peticiones')}}
+                for servidor in ('wsgi', 'asgi'):
+                    resultado[servidor] = self.medir(servidor, base, cookies, directorio.name, options)
+        finally:
+            teardown_test_environment()
+            directorio.cleanup()
+
+        wsgi, asgi = resultado['wsgi']['peticiones_por_segundo'], resultado['asgi']['peticiones_por_segundo']
+        self.stdout.write(f"ASGI/WSGI: {asgi / wsgi:.2f}x")
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    def sesiones(self):
+        """Cookie de sesión para cada rol, creada en la base temporal"""
+        docente = User.objects.filter(username__startswith='docente').order_by('pk').first()
+        usuarios = {'docente': docente, 'admin': User.objects.create_user('bench_admin', is_staff=True)}
+        cookies = {}
+        for rol, usuario in usuarios.items():
+            cliente = Client()
+            cliente.force_login(usuario)
+            cookies[rol] = f"{settings.SESSION_COOKIE_NAME}={cliente.cookies[settings.SESSION_COOKIE_NAME].value}"
+        return cookies
+
+    def medir(self, servidor, base, cookies, directorio, options):
+        puerto = puerto_libre()
+        entorno = {
+            **os.environ,
+            'SERVIDOR': servidor,
+            'DATABASE_URL': f"sqlite:///{base}",
+            # Sin redirección a HTTPS; igual para los dos servidores
+            'DEBUG': 'True',
+            'METRICAS_DB': os.path.join(directorio, f'metricas_{servidor}.sqlite3'),
+            # La caché temporal de base_temporal, no la real
+            'CACHE_BACKEND': settings.CACHES['default']['BACKEND'],
+            'CACHE_LOCATION': settings.CACHES['default']['LOCATION'],
+        }
+        proceso = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{puerto}', '--workers', str(options['workers'])],
+            cwd=settings.BASE_DIR, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            self.esperar(puerto, proceso)
+            rutas = [(cookies[rol], reverse(nombre)) for rol, nombre in RUTAS]
+
+            def cliente(indice):
+                conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=60)
+                medidas = []
+                try:
+                    for i in range(options['peticiones']):
+                        cookie, ruta = rutas[(indice + i) % len(rutas)]
+                        t0 = time.perf_counter()
+                        conexion.request('GET', ruta, headers={'Cookie': cookie})
+                        respuesta = conexion.getresponse()
+                        respuesta.read()
+                        medidas.append((time.perf_counter() - t0, respuesta.status))
+                finally:
+                    conexion.close()
+                return medidas
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['concurrencia']) as pool:
+                medidas = [m for lote in pool.map(cliente, range(options['concurrencia'])) for m in lote]
+            duracion = time.perf_counter() - t0
+        finally:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+        latencias = [segundos for segundos, _ in medidas]
+        resumen = {
+            'peticiones': len(medidas),
+            'errores': sum(1 for _, status in medidas if status != 200),
+            'duracion_s': round(duracion, 2),
+            'peticiones_por_segundo': round(len(medidas) / duracion, 1),
+            'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+            'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+            'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        }
+        self.stdout.write(
+            f"{servidor.upper()}: {resumen['peticiones_por_segundo']} peticiones/s, "
+            f"p50 {resumen['p50_ms']} ms, p95 {resumen['p95_ms']} ms, p99 {resumen['p99_ms']} ms, "
+            f"{resumen['errores']} errores"
+        )
+        return resumen
+
+    def esperar(self, puerto, proceso, limite=30):
+        """Espera a que el servidor responda"""
+        fin = time.monotonic() + limite
+        while time.monotonic() < fin:
+            if proceso.poll() is not None:
+                raise CommandError(f"gunicorn terminó al arrancar (código {proceso.returncode}).")
+            try:
+                conexion = http.client.HTTPConnection('127.0.0.1', puerto, timeout=2)
+                conexion.request('GET', reverse('camila:inicio'))
+                conexion.getresponse().read()
+                conexion.close()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError('El servidor no respondió a tiempo.')
@@ -0,0 +1,85 @@
+import json
+import operator
+import time
+from functools import reduce
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from CAMILA_JESUS import busqueda
+from CAMILA_JESUS.models import Reserva
+
+from ._bench import base_temporal, generar_agenda
+from .bench_vistas import percentil
+
+TERMINOS = [
+    'química', 'titulación', 'microbiología', 'taller circuitos', 'óptica martínez',
+    'evaluación práctica genética', 'lucía', 'lab', 'cromatografía', 'inexistente',
+]
+
+
+def busqueda_like(qs, texto):
+    """Búsqueda anterior de la administración: icontains por palabra y por campo"""
+    for palabra in texto.split():
+        qs = qs.filter(reduce(operator.or_, (Q(**{f'{campo}__icontains': palabra}) for campo in busqueda.CAMPOS_TEXTO)))
+    return qs.order_by('-fecha', '-pk')
+
+
+def medir(funcion, iteraciones):
+    tiempos = []
+    for _ in range(iteraciones):
+        t0 = time.perf_counter()
+        filas = list(funcion().values_list('pk', flat=True)[:busqueda.MAX_RESULTADOS])
+        tiempos.append(time.perf_counter() - t0)
+    return tiempos, len(filas)
+
+
+def resumen(tiempos):
+    return {
+        'p50_ms': round(percentil(tiempos, 50) * 1000, 2),
+        'p95_ms': round(percentil(tiempos, 95) * 1000, 2),
+        'p99_ms': round(percentil(tiempos, 99) * 1000, 2),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Genera reservas en una base temporal y compara la búsqueda por texto completo '
+            '(GIN/FTS5) con la búsqueda LIKE anterior. Escribe los resultados en un archivo JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=200_000)
+        parser.add_argument('--iteraciones', type=int, default=20)
+        parser.add_argument('--salida', default='bench_busqueda.json')
+
+    def handle(self, *args, **options):
+        with base_temporal() as connection:
+            self.stdout.write(f"Generando {options['reservas']} reservas...")
+            generar_agenda(options['reservas'])
+            t0 = time.perf_counter()
+            indexadas = busqueda.reconstruir()
+            resultado = {
+                'base_de_datos': connection.vendor,
+                'reservas': options['reservas'],
+                'indexacion_s': round(time.perf_counter() - t0, 2),
+                'terminos': {},
+            }
+            self.stdout.write(f"{indexadas} reservas indexadas en {resultado['indexacion_s']} s")
+
+            qs = Reserva.objects.all()
+            for termino in TERMINOS:
+                like, n_like = medir(lambda: busqueda_like(qs, termino), options['iteraciones'])
+                texto, n_texto = medir(lambda: busqueda.buscar(qs, termino), options['iteraciones'])
+                fila = {
+                    'like': {**resumen(like), 'resultados': n_like},
+                    'texto_completo': {**resumen(texto), 'resultados': n_texto},
+                    'aceleracion_p50': round(percentil(like, 50) / percentil(texto, 50), 1),
+                }
+                resultado['terminos'][termino] = fila
+                self.stdout.write(
+                    f"{termino!r}: LIKE p50 {fila['like']['p50_ms']} ms, "
+                    f"texto completo p50 {fila['texto_completo']['p50_ms']} ms ({fila['aceleracion_p50']}x)"
+                )
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
@@ -0,0 +1,202 @@
+import datetime
+import json
+import multiprocessing
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections, connection
+from django.db.models import Count
+
+from CAMILA_JESUS import services
+from CAMILA_JESUS.estadisticas import cambiar_estado_masivo
+from CAMILA_JESUS.models import Reserva
+from PROYECTO_CAMILA_JESUS import basedatos
+
+from ._bench import base_temporal, poblar_reservas
+from .bench_vistas import percentil
+
+TIPOS = ('lectura', 'aprobacion', 'creacion')
+
+
+def perfiles(vendor):
+    """
+    {nombre: (OPTIONS, CONN_MAX_AGE, journal_mode)}: la configuración anterior
+    y la de basedatos.py. El journal_mode queda guardado en el archivo y solo
+    se puede cambiar sin otras conexiones abiertas: se fija antes de medir.
+    """
+    if vendor == 'sqlite':
+        return {
+            # Lo que hacía settings.py: sin pragmas (timeout de 5 s del módulo sqlite3)
+            'sin_ajustes': ({}, 0, 'DELETE'),
+            'ajustado': (basedatos.opciones_sqlite(wal=True), 0, 'WAL'),
+        }
+    resultado = {'sin_pool': ({}, 0, None)}
+    if basedatos.hay_pool():
+        resultado['pool'] = ({'pool': basedatos.opciones_pool()}, 0, None)
+    return resultado
+
+
+def _peticion(operacion, docente):
+    """Una petición: devuelve (tipo, resultado, duración)"""
+    tipo, lab_id, fecha, franja = operacion
+    resultado = tipo
+    t0 = time.perf_counter()
+    try:
+        if tipo == 'lectura':
+            list(Reserva.objects.filter(laboratorio_id=lab_id).values('estado').annotate(n=Count('pk')))
+        elif tipo == 'aprobacion':
+            # Lee y después escribe en la misma transacción, sin reintentos
+            cambiar_estado_masivo(
+                Reserva.objects.filter(laboratorio_id=lab_id, fecha=fecha, estado='Pendiente'), 'Aprobada',
+            )
+        else:
+            fin = min(franja + 2, 42)
+            services.crear_reserva(Reserva(
+                laboratorio_id=lab_id, fecha=fecha,
+                hora_inicio=datetime.time(franja // 2, 30 * (franja % 2)),
+                hora_fin=datetime.time(fin // 2, 30 * (fin % 2)), motivo='Benchmark',
+            ), docente)
+    except ValidationError:
+        resultado = 'conflictos'
+    except OperationalError:
+        resultado = 'errores_bloqueo'
+    finally:
+        # Fin de la petición: cierra la conexión o la devuelve al pool según CONN_MAX_AGE
+        close_old_connections()
+    return tipo, resultado, time.perf_counter() - t0
+
+
+def _worker(lote, hilos, docente_id):
+    """Un worker de gunicorn: un proceso que atiende `hilos` peticiones a la vez"""
+    docente = User.objects.get(pk=docente_id)
+    close_old_connections()
+    salida = []
+    candado = threading.Lock()
+
+    def hilo(operaciones):
+        try:
+            for operacion in operaciones:
+                medicion = _peticion(operacion, docente)
+                with candado:
+                    salida.append(medicion)
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        list(ejecutor.map(hilo, [lote[i::hilos] for i in range(hilos)]))
+    connection.close()
+    if connection.vendor == 'postgresql':
+        connection.close_pool()
+    return salida
+
+
+class Command(BaseCommand):
+    help = ('Mide el rendimiento de escritura con varios procesos (como los workers de gunicorn) que a la '
+            'vez crean reservas, aprueban las pendientes y leen resúmenes, comparando la configuración de '
+            'base de datos anterior con la de basedatos.py. Usa una base temporal y escribe los resultados '
+            'en un archivo JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--operaciones', type=int, default=4000)
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--hilos', type=int, default=2, help='Peticiones simultáneas por worker')
+        parser.add_argument('--lecturas', type=float, default=0.5, help='Fracción de operaciones de solo lectura')
+        parser.add_argument('--aprobaciones', type=float, default=0.2, help='Fracción de cambios de estado')
+        parser.add_argument('--historial', type=int, default=20_000, help='Reservas previas que leen las consultas')
+        parser.add_argument('--laboratorios', type=int, default=10)
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', default='bench_escrituras.json')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['semilla'])
+        workers = options['workers']
+        resultados = {}
+
+        with base_temporal() as conexion:
+            labs, _ = poblar_reservas(options['historial'], laboratorios=options['laboratorios'])
+            docente = User.objects.create_user('bench_docente')
+            ajustes = conexion.settings_dict
+            originales = (dict(ajustes['OPTIONS']), ajustes['CONN_MAX_AGE'])
+            # Opciones de la URL (p. ej. sslmode), sin las que agrega basedatos.py
+            comunes = {k: v for k, v in originales[0].items() if k not in ('init_command', 'transaction_mode', 'pool')}
+            self.stdout.write(
+                f"{options['operaciones']} operaciones, {workers} workers x {options['hilos']} hilos ({conexion.vendor})"
+            )
+
+            for indice, (nombre, (opciones, max_age, journal)) in enumerate(perfiles(conexion.vendor).items()):
+                # Cada perfil escribe en días distintos para no chocar con las reservas del anterior
+                inicio = datetime.date(2026, 2, 2) + datetime.timedelta(days=30 * indice)
+                operaciones = []
+                for _ in range(options['operaciones']):
+                    azar = rng.random()
+                    if azar < options['lecturas']:
+                        tipo = 'lectura'
+                    elif azar < options['lecturas'] + options['aprobaciones']:
+                        tipo = 'aprobacion'
+                    else:
+                        tipo = 'creacion'
+                    operaciones.append((
+                        tipo, rng.choice(labs).pk, inicio + datetime.timedelta(days=rng.randrange(20)),
+                        rng.randrange(14, 38),
+                    ))
+
+                # Los procesos hijos (fork) heredan este diccionario de ajustes
+                conexion.close()
+                ajustes['OPTIONS'] = {**comunes, **opciones}
+                ajustes['CONN_MAX_AGE'] = max_age
+                if journal:
+                    with conexion.cursor() as cursor:
+                        cursor.execute(f'PRAGMA journal_mode={journal}')
+                    conexion.close()
+
+                resultados[nombre] = self.medir(operaciones, workers, options['hilos'], docente.pk)
+                r = resultados[nombre]
+                self.stdout.write(
+                    f"{nombre:12s} {r['escrituras_por_s']:7.1f} escrituras/s  creación p50 {r['creacion_p50_ms']:.1f} ms "
+                    f"p95 {r['creacion_p95_ms']:.1f} ms  aprobación p95 {r['aprobacion_p95_ms']:.1f} ms  "
+                    f"lectura p95 {r['lectura_p95_ms']:.1f} ms  database is locked: {r['errores_bloqueo']}"
+                )
+
+            ajustes['OPTIONS'], ajustes['CONN_MAX_AGE'] = originales
+
+        with open(options['salida'], 'w') as f:
+            json.dump(resultados, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    def medir(self, operaciones, workers, hilos, docente_id):
+        lotes = [operaciones[i::workers] for i in range(workers)]
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork')) as ejecutor:
+            mediciones = [
+                medicion
+                for parte in ejecutor.map(_worker, lotes, [hilos] * workers, [docente_id] * workers)
+                for medicion in parte
+            ]
+        duracion = time.perf_counter() - t0
+
+        tiempos = {tipo: [d for t, _, d in mediciones if t == tipo] for tipo in TIPOS}
+        totales = Counter(resultado for _, resultado, _ in mediciones)
+
+        def ms(tipo, p):
+            return round(percentil(tiempos[tipo], p) * 1000, 2) if tiempos[tipo] else 0.0
+
+        escrituras = totales['creacion'] + totales['aprobacion'] + totales['conflictos']
+        return {
+            'duracion_s': round(duracion, 3),
+            'operaciones_por_s': round(len(operaciones) / duracion, 1),
+            'escrituras_por_s': round(escrituras / duracion, 1),
+            'creacion_p50_ms': ms('creacion', 50),
+            'creacion_p95_ms': ms('creacion', 95),
+            'aprobacion_p95_ms': ms('aprobacion', 95),
+            'lectura_p95_ms': ms('lectura', 95),
+            'creadas': totales['creacion'],
+            'aprobaciones': totales['aprobacion'],
+            'conflictos': totales['conflictos'],
+            'errores_bloqueo': totales['errores_bloqueo'],
+        }
@@ -0,0 +1,54 @@
+import time
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+
+from CAMILA_JESUS.views import AdminExportCSVView
+
+from ._bench import base_temporal, poblar_reservas
+
+
+class Command(BaseCommand):
+    help = ('Mide la exportación CSV en streaming sobre una base temporal: '
+            'filas por segundo y pico de memoria durante la exportación.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--filas', type=int, default=1_000_000)
+        parser.add_argument('--docente', default='', help='Filtro opcional por nombre de docente')
+
+    def consumir(self, request):
+        """Recorre la respuesta como lo haría el servidor; devuelve (filas, bytes)"""
+        response = AdminExportCSVView.as_view()(request)
+        filas = -1  # encabezado
+        bytes_enviados = 0
+        for parte in response.streaming_content:
+            filas += 1
+            bytes_enviados += len(parte)
+        return filas, bytes_enviados
+
+    def handle(self, *args, **options):
+        with base_temporal():
+            self.stdout.write(f"Generando {options['filas']} reservas...")
+            poblar_reservas(options['filas'])
+            admin = User.objects.create_user('bench_admin', is_staff=True)
+
+            request = RequestFactory().get('/administrador/exportar-csv/', {'docente': options['docente']})
+            request.user = admin
+
+            # Primera pasada sin tracemalloc (su costo distorsiona el tiempo)
+            t0 = time.perf_counter()
+            filas, bytes_enviados = self.consumir(request)
+            duracion = time.perf_counter() - t0
+
+            tracemalloc.start()
+            self.consumir(request)
+            _, pico = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        self.stdout.write(f"Filas exportadas: {filas}")
+        self.stdout.write(f"Tamaño:           {bytes_enviados / 1024 / 1024:.1f} MiB")
+        self.stdout.write(f"Tiempo:           {duracion:.2f} s")
+        self.stdout.write(f"Rendimiento:      {filas / duracion:,.0f} filas/s")
+        self.stdout.write(f"Pico de memoria:  {pico / 1024 / 1024:.1f} MiB")
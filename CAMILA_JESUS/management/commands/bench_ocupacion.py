@@ -0,0 +1,128 @@
+import datetime
+import json
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from CAMILA_JESUS import ocupacion
+from CAMILA_JESUS.models import Reserva
+
+from ._bench import base_temporal, generar_agenda
+from .bench_vistas import percentil
+
+
+def _reservas(desde, hasta):
+    return Reserva.objects.filter(fecha__range=(desde, hasta), estado__in=ocupacion.ESTADOS_OCUPAN).order_by()
+
+
+def por_instancias(laboratorios, desde, hasta):
+    """Lo que se haría sin este módulo: recorrer instancias y sumar en Python"""
+    indice = {lab.pk: i for i, lab in enumerate(laboratorios)}
+    franjas = len(ocupacion.INICIOS)
+    ocupado = [[[0] * franjas for _ in range(7)] for _ in laboratorios]
+    for reserva in _reservas(desde, hasta).iterator(chunk_size=5000):
+        inicio = reserva.hora_inicio.hour * 60 + reserva.hora_inicio.minute
+        fin = reserva.hora_fin.hour * 60 + reserva.hora_fin.minute
+        fila = ocupado[indice[reserva.laboratorio_id]][reserva.fecha.weekday()]
+        for f, franja in enumerate(ocupacion.INICIOS.tolist()):
+            minutos = min(fin, franja + ocupacion.MINUTOS_FRANJA) - max(inicio, franja)
+            if minutos > 0:
+                fila[f] += minutos
+    return np.array(ocupado, dtype=np.int64).reshape(len(laboratorios), 7, franjas), None
+
+
+def por_filas(laboratorios, desde, hasta):
+    """Una fila por reserva con values_list y las mismas operaciones de arrays"""
+    filas = list(_reservas(desde, hasta).values_list('laboratorio_id', 'fecha', 'hora_inicio', 'hora_fin'))
+    total = len(filas)
+    fechas = np.array([f[1] for f in filas], dtype='datetime64[D]')
+    ids = np.array([lab.pk for lab in laboratorios], dtype=np.int64)
+    ocupado = ocupacion.acumular(
+        ocupacion.posiciones(ids, np.fromiter((f[0] for f in filas), np.int64, total)),
+        (fechas.astype(np.int64) + 3) % 7,
+        np.fromiter((f[2].hour * 60 + f[2].minute for f in filas), np.int64, total),
+        np.fromiter((f[3].hour * 60 + f[3].minute for f in filas), np.int64, total),
+        np.ones(total, dtype=np.int64), len(laboratorios),
+    )
+    return ocupado, total
+
+
+def agrupado(laboratorios, desde, hasta):
+    """ocupacion.matriz(): agrupado en la base de datos"""
+    return ocupacion.matriz(laboratorios, desde, hasta), _reservas(desde, hasta).count()
+
+
+VARIANTES = {'instancias': por_instancias, 'values_list': por_filas, 'agrupado': agrupado}
+
+
+class Command(BaseCommand):
+    help = ('Genera una base temporal con muchas reservas y mide el cálculo de la ocupación por laboratorio, '
+            'día de la semana y franja recorriendo instancias del modelo, con una fila por reserva y agrupando '
+            'en la base de datos (ocupacion.py), para un semestre y para todo el historial. Escribe los '
+            'resultados en un archivo JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=1_000_000)
+        parser.add_argument('--laboratorios', type=int, default=200)
+        parser.add_argument('--iteraciones', type=int, default=3)
+        parser.add_argument('--sin-instancias', action='store_true', help='Omite la variante más lenta')
+        parser.add_argument('--salida', default='bench_ocupacion.json')
+
+    def handle(self, *args, **options):
+        variantes = {
+            nombre: funcion for nombre, funcion in VARIANTES.items()
+            if not (nombre == 'instancias' and options['sin_instancias'])
+        }
+        resultados = {}
+        with base_temporal():
+            self.stdout.write(f"Generando {options['reservas']} reservas en {options['laboratorios']} laboratorios...")
+            t0 = time.perf_counter()
+            labs, _ = generar_agenda(options['reservas'], laboratorios=options['laboratorios'])
+            self.stdout.write(f"  {time.perf_counter() - t0:.0f} s")
+
+            extremos = Reserva.objects.aggregate(desde=Min('fecha'), hasta=Max('fecha'))
+            # El primer semestre completo de la agenda
+            medio = extremos['desde'] + datetime.timedelta(days=183)
+            rangos = {
+                'semestre': ocupacion.semestre(ocupacion.nombre_semestre(medio)),
+                'historial': (extremos['desde'], extremos['hasta']),
+            }
+
+            for rango, (desde, hasta) in rangos.items():
+                self.stdout.write(f"{rango}: {desde} a {hasta}")
+                referencia = None
+                for nombre, funcion in variantes.items():
+                    tiempos = []
+                    for _ in range(options['iteraciones']):
+                        t0 = time.perf_counter()
+                        matriz, filas = funcion(labs, desde, hasta)
+                        tiempos.append(time.perf_counter() - t0)
+                    if referencia is None:
+                        referencia = matriz
+                    elif not np.array_equal(matriz, referencia):
+                        raise AssertionError(f"{nombre} no coincide con {next(iter(variantes))}")
+                    resultados.setdefault(rango, {})[nombre] = {
+                        'p50_s': round(percentil(tiempos, 50), 3),
+                        'min_s': round(min(tiempos), 3),
+                        'reservas': filas,
+                    }
+                    self.stdout.write(f"  {nombre:12s} {percentil(tiempos, 50) * 1000:9.1f} ms")
+
+                # Todo lo que hace la vista sin caché: matriz + JSON
+                t0 = time.perf_counter()
+                datos = ocupacion.calcular(desde, hasta, labs)
+                resultados[rango]['calcular'] = {
+                    's': round(time.perf_counter() - t0, 3),
+                    'utilizacion': datos['utilizacion'],
+                    'bytes_json': len(json.dumps(datos)),
+                }
+                self.stdout.write(
+                    f"  {'calcular':12s} {resultados[rango]['calcular']['s'] * 1000:9.1f} ms  "
+                    f"utilización {datos['utilizacion']:.1%}"
+                )
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
@@ -0,0 +1,132 @@
+import copy
+import json
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from CAMILA_JESUS import estadisticas
+
+from ._bench import base_temporal, generar_agenda
+from .bench_vistas import Datos, percentil
+
+MIDDLEWARE_NUEVOS = ('CAMILA_JESUS.middleware.CompresionMiddleware', 'django.middleware.http.ConditionalGetMiddleware')
+
+# (nombre, rol, función(datos) -> (url, parámetros))
+PAGINAS = [
+    ('admin_reserva_list', 'admin', lambda d: (reverse('camila:admin_reserva_list'), {})),
+    ('admin_reserva_list_laboratorio', 'admin', lambda d: (reverse('camila:admin_reserva_list'), {
+        'laboratorio': d.labs[0].pk, 'estado': 'Aprobada',
+    })),
+    ('admin_reserva_list_siguiente', 'admin', lambda d: (reverse('camila:admin_reserva_list'), {'ultima': 1})),
+    ('docente_reserva_list', 'docente', lambda d: (reverse('camila:docente_reserva_list'), {})),
+    ('admin_dashboard', 'admin', lambda d: (reverse('camila:admin_dashboard'), {})),
+    ('docente_dashboard', 'docente', lambda d: (reverse('camila:docente_dashboard'), {})),
+    ('admin_estadisticas', 'admin', lambda d: (reverse('camila:admin_estadisticas'), {})),
+]
+
+
+def ajustes_anteriores():
+    """Sin cargador de plantillas en caché, sin fragmentos en caché y sin compresión"""
+    plantillas = copy.deepcopy(settings.TEMPLATES)
+    for motor in plantillas:
+        cargadores = motor['OPTIONS'].get('loaders', [])
+        motor['OPTIONS']['loaders'] = [
+            c for cargador in cargadores
+            for c in (cargador[1] if isinstance(cargador, tuple) and cargador[0].endswith('cached.Loader') else [cargador])
+        ]
+    return {
+        'TEMPLATES': plantillas,
+        'MIDDLEWARE': [m for m in settings.MIDDLEWARE if m not in MIDDLEWARE_NUEVOS],
+        # {% cache %} usa este alias si existe: DummyCache no guarda nada
+        'CACHES': {**settings.CACHES, 'template_fragments': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+    }
+
+
+class Command(BaseCommand):
+    help = ('Genera una base temporal y mide, para las páginas de listas y dashboards, el tiempo de render, '
+            'el tiempo total y los bytes enviados antes (sin cargador en caché, fragmentos ni compresión) y '
+            'después. Incluye la revalidación con ETag. Escribe los resultados en un archivo JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=50_000)
+        parser.add_argument('--iteraciones', type=int, default=30)
+        parser.add_argument('--codificacion', default='br, gzip', help='Accept-Encoding del cliente')
+        parser.add_argument('--salida', default='bench_plantillas.json')
+
+    def handle(self, *args, **options):
+        directorio = tempfile.TemporaryDirectory()
+        try:
+            with override_settings(
+                METRICAS_DB=f"{directorio.name}/metricas.sqlite3", ALLOWED_HOSTS=['testserver'],
+            ), base_temporal():
+                self.stdout.write(f"Generando {options['reservas']} reservas...")
+                labs, docentes = generar_agenda(options['reservas'])
+                estadisticas.reconstruir()
+                datos = Datos(labs, docentes)
+
+                resultados = {}
+                with override_settings(**ajustes_anteriores()):
+                    resultados['antes'] = self.medir(datos, options, revalidar=False)
+                resultados['despues'] = self.medir(datos, options, revalidar=True)
+        finally:
+            directorio.cleanup()
+
+        self.stdout.write(f"{'':32} {'render p50':>11} {'total p50':>10} {'bytes':>8}")
+        for nombre, *_ in PAGINAS:
+            for fase in ('antes', 'despues'):
+                r = resultados[fase][nombre]
+                self.stdout.write(
+                    f"{nombre if fase == 'antes' else '':32} {r['render_p50_ms']:8.2f} ms {r['total_p50_ms']:7.2f} ms "
+                    f"{r['bytes']:8d}  {fase}"
+                )
+            r = resultados['despues'][nombre]
+            if 'revalidacion_p50_ms' in r:
+                self.stdout.write(f"{'':32} {'':11} {r['revalidacion_p50_ms']:7.2f} ms {0:8d}  304 (ETag)")
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    def medir(self, datos, options, revalidar):
+        cache.clear()
+        clientes = {}
+        for rol, usuario in (('admin', datos.admin), ('docente', datos.docente)):
+            # Un cliente por configuración: la lista de middleware se carga al crearlo
+            clientes[rol] = Client(HTTP_ACCEPT_ENCODING=options['codificacion'])
+            clientes[rol].force_login(usuario)
+
+        resultados = {}
+        for nombre, rol, pagina in PAGINAS:
+            url, parametros = pagina(datos)
+            cliente = clientes[rol]
+            respuesta = cliente.get(url, parametros)  # calentamiento
+            render, total = [], []
+            for _ in range(options['iteraciones']):
+                t0 = time.perf_counter()
+                respuesta = cliente.get(url, parametros)
+                total.append(time.perf_counter() - t0)
+                render.append(respuesta.wsgi_request._tiempo_render)
+            resultados[nombre] = {
+                'render_p50_ms': round(percentil(render, 50) * 1000, 2),
+                'render_p95_ms': round(percentil(render, 95) * 1000, 2),
+                'total_p50_ms': round(percentil(total, 50) * 1000, 2),
+                'total_p95_ms': round(percentil(total, 95) * 1000, 2),
+                'bytes': len(respuesta.content),
+                'codificacion': respuesta.get('Content-Encoding', 'identity'),
+            }
+
+            etag = respuesta.get('ETag')
+            if revalidar and etag:
+                tiempos = []
+                for _ in range(options['iteraciones']):
+                    t0 = time.perf_counter()
+                    condicional = cliente.get(url, parametros, HTTP_IF_NONE_MATCH=etag)
+                    tiempos.append(time.perf_counter() - t0)
+                if condicional.status_code == 304:
+                    resultados[nombre]['revalidacion_p50_ms'] = round(percentil(tiempos, 50) * 1000, 2)
+        return resultados
@@ -0,0 +1,101 @@
+import datetime
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Exists, OuterRef
+
+from CAMILA_JESUS import services
+from CAMILA_JESUS.models import Laboratorio, Reserva
+
+from ._bench import base_temporal
+
+
+def contar_solapamientos():
+    """Cantidad de reservas activas que se solapan con otra del mismo laboratorio y día"""
+    activas = Reserva.objects.exclude(estado='Cancelada')
+    otra = activas.filter(
+        laboratorio=OuterRef('laboratorio'),
+        fecha=OuterRef('fecha'),
+        hora_inicio__lt=OuterRef('hora_fin'),
+        hora_fin__gt=OuterRef('hora_inicio'),
+    ).exclude(pk=OuterRef('pk'))
+    return activas.filter(Exists(otra)).count()
+
+
+class Command(BaseCommand):
+    help = ('Lanza miles de reservas concurrentes que compiten por los mismos horarios '
+            'sobre una base temporal, verifica que no haya dobles reservas y mide el rendimiento.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=2000)
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--laboratorios', type=int, default=3)
+        parser.add_argument('--dias', type=int, default=5)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['semilla'])
+
+        with base_temporal():
+            docente = User.objects.create_user('bench_docente')
+            labs = [Laboratorio.objects.create(nombre=f'Lab bench {i}') for i in range(options['laboratorios'])]
+            inicio = datetime.date(2026, 2, 2)
+
+            # Franjas de 30 minutos entre 07:00 y 20:00 con duraciones de 1 a 3 horas
+            solicitudes = []
+            for _ in range(options['reservas']):
+                franja = rng.randrange(14, 38)
+                duracion = rng.randrange(2, 7)
+                solicitudes.append((
+                    rng.choice(labs).pk,
+                    inicio + datetime.timedelta(days=rng.randrange(options['dias'])),
+                    datetime.time(franja // 2, 30 * (franja % 2)),
+                    datetime.time(min(franja + duracion, 42) // 2, 30 * (min(franja + duracion, 42) % 2)),
+                ))
+
+            def trabajador(lote):
+                resultado = Counter()
+                try:
+                    for lab_id, fecha, hora_inicio, hora_fin in lote:
+                        reserva = Reserva(
+                            laboratorio_id=lab_id, fecha=fecha,
+                            hora_inicio=hora_inicio, hora_fin=hora_fin, motivo='Benchmark',
+                        )
+                        try:
+                            services.crear_reserva(reserva, docente)
+                            resultado['creadas'] += 1
+                        except ValidationError:
+                            resultado['conflictos'] += 1
+                        except OperationalError:
+                            resultado['errores'] += 1
+                finally:
+                    connection.close()
+                return resultado
+
+            hilos = options['hilos']
+            lotes = [solicitudes[i::hilos] for i in range(hilos)]
+
+            t0 = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=hilos) as pool:
+                totales = sum(pool.map(trabajador, lotes), Counter())
+            duracion = time.perf_counter() - t0
+
+            dobles = contar_solapamientos()
+
+        self.stdout.write(f"Solicitudes:     {len(solicitudes)} ({hilos} hilos, {connection.vendor})")
+        self.stdout.write(f"Creadas:         {totales['creadas']}")
+        self.stdout.write(f"Conflictos:      {totales['conflictos']}")
+        self.stdout.write(f"Errores de BD:   {totales['errores']}")
+        self.stdout.write(f"Tiempo:          {duracion:.2f} s")
+        self.stdout.write(f"Rendimiento:     {len(solicitudes) / duracion:.1f} solicitudes/s")
+        self.stdout.write(f"Dobles reservas: {dobles}")
+
+        if dobles:
+            raise CommandError(f"Se detectaron {dobles} reservas solapadas.")
+        self.stdout.write(self.style.SUCCESS('Sin dobles reservas.'))
@@ -0,0 +1,303 @@
+import datetime
+import itertools
+import json
+import math
+import platform
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from CAMILA_JESUS import busqueda, calendario, estadisticas, exportaciones, services
+from CAMILA_JESUS.models import Reserva
+
+from ._bench import base_temporal, generar_agenda
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def resumir(latencias, consultas):
+    """Resumen en milisegundos de una serie de peticiones"""
+    return {
+        'peticiones': len(latencias),
+        'p50_ms': round(percentil(latencias, 50) * 1000, 2),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 2),
+        'p99_ms': round(percentil(latencias, 99) * 1000, 2),
+        'media_ms': round(sum(latencias) / len(latencias) * 1000, 2),
+        'consultas_media': round(sum(consultas) / len(consultas), 1),
+        'consultas_max': max(consultas),
+    }
+
+
+class Datos:
+    """Objetos de la base generada que usan los escenarios"""
+
+    def __init__(self, labs, docentes):
+        self.labs = labs
+        # El docente con más reservas (el primero en la distribución Zipf)
+        self.docente = docentes[0]
+        self.admin = User.objects.create_user('bench_admin', is_staff=True)
+        mias = Reserva.objects.filter(docente=self.docente)
+        self.reserva = mias.order_by('-fecha').first()
+        self._lock = threading.Lock()
+        self._cancelables = list(mias.filter(estado='Pendiente').order_by('-fecha').values_list('pk', flat=True))
+        self._aprobables = list(
+            Reserva.objects.filter(estado='Pendiente').exclude(docente=self.docente)
+            .order_by('-fecha').values_list('pk', flat=True)[:10000]
+        )
+        self.ocupada = Reserva.objects.exclude(estado='Cancelada').order_by('-fecha').first()
+        # Fechas sin reservas para las creaciones que deben tener éxito
+        ultima = Reserva.objects.order_by('-fecha').values_list('fecha', flat=True).first()
+        self._dias_libres = itertools.count(1)
+        self._desde_libre = ultima + datetime.timedelta(days=30)
+        # Pendiente propia que solo se edita (no está entre las cancelables)
+        self.editable = services.crear_reserva(Reserva(
+            laboratorio=labs[0], fecha=self.fecha_libre(), motivo='Benchmark',
+            hora_inicio=datetime.time(9, 0), hora_fin=datetime.time(11, 0),
+        ), self.docente)
+        # Exportación ya generada para medir la descarga
+        exportacion, _ = exportaciones.solicitar(self.admin, {'laboratorio': str(labs[0].pk), 'estado': 'Aprobada'})
+        exportaciones.tomar_siguiente()
+        self.exportacion = exportaciones.procesar(exportacion)
+
+    def _tomar(self, lista):
+        with self._lock:
+            return lista.pop() if lista else self.reserva.pk
+
+    def cancelable(self):
+        return self._tomar(self._cancelables)
+
+    def aprobable(self):
+        return self._tomar(self._aprobables)
+
+    def aprobables(self, n):
+        return [self.aprobable() for _ in range(n)]
+
+    def fecha_libre(self):
+        return self._desde_libre + datetime.timedelta(days=next(self._dias_libres))
+
+
+def _datos_reserva(laboratorio, fecha, inicio, fin):
+    return {
+        'laboratorio': laboratorio.pk, 'fecha': fecha.isoformat(),
+        'hora_inicio': inicio, 'hora_fin': fin, 'motivo': 'Benchmark',
+    }
+
+
+# (nombre, rol, función(cliente, datos, rng) -> response, incluir en la carga concurrente)
+ESCENARIOS = [
+    ('docente_dashboard', 'docente', lambda c, d, r: c.get(reverse('camila:docente_dashboard')), True),
+    ('docente_reserva_list', 'docente', lambda c, d, r: c.get(reverse('camila:docente_reserva_list')), True),
+    ('docente_reserva_list_ultima', 'docente', lambda c, d, r: c.get(reverse('camila:docente_reserva_list'), {'ultima': 1}), False),
+    ('docente_reserva_detail', 'docente', lambda c, d, r: c.get(reverse('camila:docente_reserva_detail', args=[d.reserva.pk])), True),
+    ('docente_reserva_update_get', 'docente', lambda c, d, r: c.get(reverse('camila:docente_reserva_update', args=[d.reserva.pk])), False),
+    ('docente_reserva_update_post', 'docente', lambda c, d, r: c.post(
+        reverse('camila:docente_reserva_update', args=[d.editable.pk]),
+        _datos_reserva(d.editable.laboratorio, d.editable.fecha, *r.choice((('09:00', '11:00'), ('10:00', '12:00')))),
+    ), False),
+    ('docente_reserva_create_get', 'docente', lambda c, d, r: c.get(reverse('camila:docente_reserva_create')), False),
+    ('docente_reserva_create_ok', 'docente', lambda c, d, r: c.post(
+        reverse('camila:docente_reserva_create'),
+        _datos_reserva(r.choice(d.labs), d.fecha_libre(), '09:00', '11:00'),
+    ), True),
+    ('docente_reserva_create_conflicto', 'docente', lambda c, d, r: c.post(
+        reverse('camila:docente_reserva_create'),
+        _datos_reserva(d.ocupada.laboratorio, d.ocupada.fecha,
+                       d.ocupada.hora_inicio.strftime('%H:%M'), d.ocupada.hora_fin.strftime('%H:%M')),
+    ), True),
+    ('docente_reserva_recurrente_get', 'docente', lambda c, d, r: c.get(reverse('camila:docente_reserva_recurrente')), False),
+    ('docente_reserva_cancelar', 'docente', lambda c, d, r: c.post(reverse('camila:docente_reserva_cancelar', args=[d.cancelable()])), False),
+    ('disponibilidad', 'docente', lambda c, d, r: c.get(reverse('camila:disponibilidad'), {
+        'desde': d.ocupada.fecha.isoformat(), 'hasta': (d.ocupada.fecha + datetime.timedelta(days=6)).isoformat(),
+    }), True),
+    ('calendario_laboratorio', 'docente', lambda c, d, r: c.get(calendario.url('laboratorio', r.choice(d.labs).pk)), True),
+    ('admin_dashboard', 'admin', lambda c, d, r: c.get(reverse('camila:admin_dashboard')), True),
+    ('admin_reserva_list', 'admin', lambda c, d, r: c.get(reverse('camila:admin_reserva_list')), True),
+    ('admin_reserva_list_filtros', 'admin', lambda c, d, r: c.get(reverse('camila:admin_reserva_list'), {
+        'estado': 'Pendiente', 'laboratorio': r.choice(d.labs).pk,
+    }), True),
+    ('admin_reserva_list_docente', 'admin', lambda c, d, r: c.get(reverse('camila:admin_reserva_list'), {
+        'docente': 'docente001', 'contar': 1,
+    }), False),
+    ('admin_reserva_list_busqueda', 'admin', lambda c, d, r: c.get(reverse('camila:admin_reserva_list'), {
+        'q': r.choice(('química', 'titulación', 'microbiología', 'óptica martínez', 'taller circuitos')),
+    }), True),
+    ('admin_reserva_detail', 'admin', lambda c, d, r: c.get(reverse('camila:admin_reserva_detail', args=[d.reserva.pk])), True),
+    ('admin_cambiar_estado', 'admin', lambda c, d, r: c.post(
+        reverse('camila:admin_cambiar_estado', args=[d.aprobable()]), {'accion': r.choice(('aprobar', 'rechazar'))},
+    ), False),
+    ('admin_cambiar_estado_lote', 'admin', lambda c, d, r: c.post(reverse('camila:admin_cambiar_estado_lote'), {
+        'accion': r.choice(('aprobar', 'rechazar')), 'reservas': d.aprobables(10),
+    }), False),
+    ('admin_estadisticas', 'admin', lambda c, d, r: c.get(reverse('camila:admin_estadisticas')), True),
+    ('admin_export_csv_laboratorio', 'admin', lambda c, d, r: c.get(reverse('camila:admin_export_csv'), {
+        'laboratorio': r.choice(d.labs).pk, 'estado': 'Aprobada',
+    }), False),
+    ('admin_exportacion_list', 'admin', lambda c, d, r: c.get(reverse('camila:admin_exportacion_list')), False),
+    ('admin_exportacion_crear', 'admin', lambda c, d, r: c.post(reverse('camila:admin_exportacion_crear'), {
+        'laboratorio': r.choice(d.labs).pk, 'estado': 'Aprobada',
+    }), False),
+    ('admin_exportacion_descargar', 'admin', lambda c, d, r: c.get(
+        reverse('camila:admin_exportacion_descargar', args=[d.exportacion.pk]),
+    ), False),
+    ('metricas', 'admin', lambda c, d, r: c.get(reverse('camila:metricas')), False),
+]
+
+
+def ejecutar(funcion, cliente, datos, rng):
+    """Ejecuta un escenario; devuelve (segundos, consultas, status)"""
+    with CaptureQueriesContext(connection) as consultas:
+        t0 = time.perf_counter()
+        response = funcion(cliente, datos, rng)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        duracion = time.perf_counter() - t0
+    return duracion, len(consultas), response.status_code
+
+
+class Command(BaseCommand):
+    help = ('Genera una base temporal con datos realistas y mide cada vista de la aplicación '
+            '(secuencial con el cliente de pruebas y con carga concurrente en hilos). '
+            'Escribe p50/p95/p99 y consultas por vista en un archivo JSON.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reservas', type=int, default=200_000)
+        parser.add_argument('--laboratorios', type=int, default=20)
+        parser.add_argument('--docentes', type=int, default=200)
+        parser.add_argument('--iteraciones', type=int, default=30, help='Peticiones por vista en la fase secuencial')
+        parser.add_argument('--hilos', type=int, default=8)
+        parser.add_argument('--peticiones', type=int, default=50, help='Peticiones por hilo en la fase concurrente')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', default='bench_vistas.json')
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        directorio = tempfile.TemporaryDirectory()
+        try:
+            # Las peticiones del benchmark no van a las métricas ni a las exportaciones reales
+            with override_settings(
+                METRICAS_DB=f"{directorio.name}/metricas.sqlite3", EXPORTACIONES_DIR=f"{directorio.name}/exportaciones",
+            ), base_temporal():
+                resultado = self.medir(options)
+        finally:
+            teardown_test_environment()
+            directorio.cleanup()
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados en {options['salida']}"))
+
+    def medir(self, options):
+        self.stdout.write(f"Generando {options['reservas']} reservas...")
+        t0 = time.perf_counter()
+        labs, docentes = generar_agenda(
+            options['reservas'], laboratorios=options['laboratorios'],
+            docentes=options['docentes'], semilla=options['semilla'],
+        )
+        estadisticas.reconstruir()
+        busqueda.reconstruir()
+        generacion = time.perf_counter() - t0
+        datos = Datos(labs, docentes)
+        cache.clear()
+
+        resultado = {
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base_de_datos': connection.vendor,
+            },
+            'parametros': {k: options[k] for k in (
+                'reservas', 'laboratorios', 'docentes', 'iteraciones', 'hilos', 'peticiones', 'semilla',
+            )},
+            'generacion_s': round(generacion, 2),
+            'secuencial': self.secuencial(datos, options),
+            'concurrente': self.concurrente(datos, options),
+        }
+        return resultado
+
+    def _cliente(self, datos, rol):
+        cliente = Client()
+        cliente.force_login(datos.docente if rol == 'docente' else datos.admin)
+        return cliente
+
+    def secuencial(self, datos, options):
+        rng = random.Random(options['semilla'])
+        clientes = {rol: self._cliente(datos, rol) for rol in ('docente', 'admin')}
+        resultados = {}
+        for nombre, rol, funcion, _ in ESCENARIOS:
+            # Una petición de calentamiento (caché, plantillas compiladas)
+            ejecutar(funcion, clientes[rol], datos, rng)
+            latencias, consultas, estados = [], [], set()
+            for _ in range(options['iteraciones']):
+                duracion, n, status = ejecutar(funcion, clientes[rol], datos, rng)
+                latencias.append(duracion)
+                consultas.append(n)
+                estados.add(status)
+            resultados[nombre] = {**resumir(latencias, consultas), 'status': sorted(estados)}
+            self.stdout.write(
+                f"{nombre:34} p50 {resultados[nombre]['p50_ms']:8.2f} ms  "
+                f"p95 {resultados[nombre]['p95_ms']:8.2f} ms  "
+                f"p99 {resultados[nombre]['p99_ms']:8.2f} ms  "
+                f"{resultados[nombre]['consultas_media']:5.1f} consultas"
+            )
+        return resultados
+
+    def concurrente(self, datos, options):
+        escenarios = [(nombre, rol, funcion) for nombre, rol, funcion, carga in ESCENARIOS if carga]
+
+        def trabajador(indice):
+            rng = random.Random(options['semilla'] + indice)
+            clientes = {rol: self._cliente(datos, rol) for rol in ('docente', 'admin')}
+            medidas = []
+            try:
+                for _ in range(options['peticiones']):
+                    nombre, rol, funcion = rng.choice(escenarios)
+                    duracion, n, status = ejecutar(funcion, clientes[rol], datos, rng)
+                    medidas.append((nombre, duracion, n, status))
+            finally:
+                connection.close()
+            return medidas
+
+        hilos = options['hilos']
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            medidas = [m for lote in pool.map(trabajador, range(hilos)) for m in lote]
+        duracion = time.perf_counter() - t0
+
+        por_escenario = {}
+        for nombre, segundos, n, _ in medidas:
+            serie = por_escenario.setdefault(nombre, ([], []))
+            serie[0].append(segundos)
+            serie[1].append(n)
+        errores = sum(1 for *_, status in medidas if status >= 500)
+
+        total = resumir([m[1] for m in medidas], [m[2] for m in medidas])
+        self.stdout.write(
+            f"Concurrente ({hilos} hilos): {len(medidas) / duracion:.1f} peticiones/s, "
+            f"p50 {total['p50_ms']:.2f} ms, p95 {total['p95_ms']:.2f} ms, p99 {total['p99_ms']:.2f} ms, "
+            f"{errores} errores"
+        )
+        return {
+            'hilos': hilos,
+            'duracion_s': round(duracion, 2),
+            'peticiones_por_segundo': round(len(medidas) / duracion, 1),
+            'errores_5xx': errores,
+            'total': total,
+            'por_vista': {nombre: resumir(*serie) for nombre, serie in sorted(por_escenario.items())},
+        }
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from CAMILA_JESUS import importaciones
+
+
+class Command(BaseCommand):
+    help = ('Importa reservas (y crea los laboratorios que falten) desde un CSV con el formato de la '
+            'exportación. Valida horarios y solapamientos e informa los errores por línea.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV')
+        parser.add_argument('--lote', type=int, default=importaciones.TAMANO_LOTE)
+        parser.add_argument('--simular', action='store_true', help='Solo valida, no guarda nada')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['archivo'], encoding='utf-8-sig', newline='') as archivo:
+                resultado = importaciones.importar(archivo, lote=options['lote'], simular=options['simular'])
+        except (OSError, UnicodeDecodeError, importaciones.ArchivoInvalido) as e:
+            raise CommandError(f"No se pudo leer el archivo: {e}")
+
+        for linea, mensaje in resultado.errores:
+            self.stderr.write(f"Línea {linea}: {mensaje}")
+        if resultado.total_errores > len(resultado.errores):
+            self.stderr.write(f"... y {resultado.total_errores - len(resultado.errores)} errores más.")
+
+        if options['simular']:
+            resumen = f"Se importarían {resultado.creadas} reservas"
+        else:
+            resumen = f"{resultado.creadas} reservas importadas"
+        self.stdout.write(self.style.SUCCESS(
+            f"{resumen}; {resultado.laboratorios_creados} laboratorios nuevos; "
+            f"{resultado.total_errores} filas con errores."
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from CAMILA_JESUS import exportaciones
+
+
+class Command(BaseCommand):
+    help = 'Worker de exportaciones CSV: toma las solicitudes pendientes de la base de datos y genera los archivos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa lo pendiente y termina')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos entre consultas cuando no hay trabajo')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            exportacion = exportaciones.tomar_siguiente()
+            if exportacion is None:
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            exportacion = exportaciones.procesar(exportacion)
+            if exportacion.estado == 'Completada':
+                self.stdout.write(self.style.SUCCESS(f"Exportación #{exportacion.pk}: {exportacion.filas} filas."))
+            else:
+                self.stderr.write(f"Exportación #{exportacion.pk} fallida: {exportacion.error}")
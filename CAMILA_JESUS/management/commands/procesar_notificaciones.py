@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from CAMILA_JESUS import notificaciones
+
+
+class Command(BaseCommand):
+    help = ('Worker de notificaciones: toma por lotes los cambios de estado pendientes de la base de datos y '
+            'envía un correo por docente, reintentando los envíos fallidos con espera exponencial.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa lo pendiente y termina')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos entre consultas cuando no hay trabajo')
+        parser.add_argument('--lote', type=int, default=notificaciones.TAMANO_LOTE)
+        parser.add_argument('--conservar-dias', type=int, default=30,
+                            help='Las notificaciones enviadas se borran después de estos días')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            lote = notificaciones.reclamar(options['lote'])
+            if not lote:
+                notificaciones.purgar(options['conservar_dias'])
+                if options['una_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+
+            conteo = notificaciones.enviar(lote)
+            self.stdout.write(
+                f"{conteo['enviadas']} notificaciones en {conteo['correos']} correos, "
+                f"{conteo['reintentos']} por reintentar, {conteo['fallidas']} fallidas, {conteo['omitidas']} omitidas."
+            )
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from CAMILA_JESUS import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de búsqueda de texto de las reservas (IndiceBusqueda).'
+
+    def handle(self, *args, **options):
+        total = busqueda.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Índice reconstruido: {total} reservas."))
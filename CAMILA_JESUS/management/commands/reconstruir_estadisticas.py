@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from CAMILA_JESUS import estadisticas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el resumen diario de reservas (EstadisticaDiaria).'
+
+    def handle(self, *args, **options):
+        filas = estadisticas.reconstruir()
+        self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido: {filas} filas."))
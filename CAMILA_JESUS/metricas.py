@@ -0,0 +1,228 @@
+# CAMILA_JESUS/metricas.py
+"""
+Métricas de rendimiento por vista (latencia, consultas, tiempo de BD,
+render de plantillas y tamaño de respuesta).
+
+Cada proceso acumula en memoria y un hilo suyo vuelca los incrementos cada
+METRICAS_INTERVALO segundos (y al terminar el proceso) a un archivo SQLite
+compartido (METRICAS_DB), de modo que el endpoint /metrics muestra el total
+de todos los workers de gunicorn. Las peticiones nunca escriben en él.
+El formato de salida es el de texto de Prometheus.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import caches
+
+logger = logging.getLogger('camila.lentas')
+
+# Límites superiores (segundos) de los buckets del histograma de latencia
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Peticiones lentas que se conservan en el archivo compartido
+MAX_LENTAS = 50
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS metricas (
+    vista TEXT NOT NULL,
+    nombre TEXT NOT NULL,
+    valor REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (vista, nombre)
+);
+CREATE TABLE IF NOT EXISTS lentas (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    vista TEXT NOT NULL,
+    ruta TEXT NOT NULL,
+    duracion REAL NOT NULL,
+    consultas INTEGER NOT NULL,
+    sql TEXT NOT NULL,
+    fecha REAL NOT NULL
+);
+"""
+
+
+def _bucket(segundos):
+    for limite in BUCKETS:
+        if segundos <= limite:
+            return f"bucket:{limite}"
+    return "bucket:+Inf"
+
+
+class RegistroMetricas:
+    """Acumulador por proceso, seguro entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pendientes = defaultdict(float)  # (vista, nombre) -> incremento
+        self._lentas = []
+        # Proceso en el que corre el hilo de volcado (tras un fork hay que arrancar otro)
+        self._pid = None
+
+    @contextmanager
+    def _conectar(self):
+        """Conexión al archivo compartido; confirma al salir y la cierra"""
+        ruta = settings.METRICAS_DB
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        conexion = sqlite3.connect(ruta, timeout=5)
+        try:
+            with conexion:
+                conexion.executescript(ESQUEMA)
+                yield conexion
+        finally:
+            conexion.close()
+
+    def registrar(self, vista, duracion, consultas, tiempo_bd, tiempo_render, tamano):
+        with self._lock:
+            p = self._pendientes
+            p[(vista, _bucket(duracion))] += 1
+            p[(vista, 'sum')] += duracion
+            p[(vista, 'count')] += 1
+            p[(vista, 'db_queries')] += consultas
+            p[(vista, 'db_time')] += tiempo_bd
+            p[(vista, 'render_time')] += tiempo_render
+            p[(vista, 'bytes')] += tamano
+        self._arrancar_volcado()
+
+    def _arrancar_volcado(self):
+        """Arranca, una vez por proceso, el hilo que vuelca cada METRICAS_INTERVALO s"""
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+        threading.Thread(target=self._volcar_periodicamente, name='metricas', daemon=True).start()
+        # Lo acumulado desde el último volcado no se pierde al salir
+        atexit.register(self.volcar)
+
+    def _volcar_periodicamente(self):
+        while True:
+            time.sleep(settings.METRICAS_INTERVALO)
+            self.volcar()
+
+    def registrar_cache(self, nombre, acierto):
+        with self._lock:
+            self._pendientes[(f"cache:{nombre}", 'hit' if acierto else 'miss')] += 1
+
+    def registrar_lenta(self, vista, ruta, duracion, consultas, sentencias):
+        """`sentencias`: lista de (segundos, sql) con las más lentas de la petición"""
+        sql = '\n'.join(f"-- {seg * 1000:.1f} ms\n{texto}" for seg, texto in sentencias)
+        logger.warning("Petición lenta %s (%s): %.3f s, %d consultas\n%s", vista, ruta, duracion, consultas, sql)
+        with self._lock:
+            self._lentas.append((vista, ruta, duracion, consultas, sql, time.time()))
+
+    def volcar(self):
+        """Suma los incrementos de este proceso al archivo compartido"""
+        with self._lock:
+            pendientes, self._pendientes = self._pendientes, defaultdict(float)
+            lentas, self._lentas = self._lentas, []
+        if not pendientes and not lentas:
+            return
+        try:
+            with self._conectar() as conexion:
+                conexion.executemany(
+                    "INSERT INTO metricas (vista, nombre, valor) VALUES (?, ?, ?) "
+                    "ON CONFLICT (vista, nombre) DO UPDATE SET valor = valor + excluded.valor",
+                    [(vista, nombre, valor) for (vista, nombre), valor in pendientes.items()],
+                )
+                if lentas:
+                    conexion.executemany(
+                        "INSERT INTO lentas (vista, ruta, duracion, consultas, sql, fecha) VALUES (?, ?, ?, ?, ?, ?)",
+                        lentas,
+                    )
+                    conexion.execute(
+                        "DELETE FROM lentas WHERE id NOT IN (SELECT id FROM lentas ORDER BY duracion DESC LIMIT ?)",
+                        [MAX_LENTAS],
+                    )
+        except sqlite3.Error:
+            logger.exception("No se pudieron volcar las métricas a %s", settings.METRICAS_DB)
+
+    def leer(self):
+        """Totales de todos los procesos: ({(vista, nombre): valor}, [lentas])"""
+        self.volcar()
+        with self._conectar() as conexion:
+            valores = {(v, n): valor for v, n, valor in conexion.execute("SELECT vista, nombre, valor FROM metricas")}
+            lentas = conexion.execute(
+                "SELECT vista, ruta, duracion, consultas, sql FROM lentas ORDER BY duracion DESC"
+            ).fetchall()
+        return valores, lentas
+
+
+registro = RegistroMetricas()
+
+
+def _contar_cache(sender, nombre, acierto, **kwargs):
+    # 'dashboard:docente:7' -> 'dashboard:docente': una serie por tipo, no por docente
+    partes = nombre.split(':')
+    if partes[-1].isdigit():
+        partes.pop()
+    registro.registrar_cache(':'.join(partes), acierto)
+
+
+caches.consulta_cache.connect(_contar_cache)
+
+
+def _etiqueta(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _numero(valor):
+    return repr(int(valor)) if float(valor).is_integer() else repr(valor)
+
+
+def exportar_prometheus():
+    """Texto en formato de exposición de Prometheus (versión 0.0.4)"""
+    valores, _ = registro.leer()
+    por_vista = defaultdict(dict)
+    for (vista, nombre), valor in valores.items():
+        por_vista[vista][nombre] = valor
+
+    lineas = [
+        '# HELP camila_request_duration_seconds Latencia de las peticiones por vista.',
+        '# TYPE camila_request_duration_seconds histogram',
+    ]
+    vistas = sorted(v for v in por_vista if not v.startswith('cache:'))
+    for vista in vistas:
+        datos = por_vista[vista]
+        acumulado = 0
+        for limite in BUCKETS:
+            acumulado += datos.get(f"bucket:{limite}", 0)
+            lineas.append(f'camila_request_duration_seconds_bucket{{vista="{_etiqueta(vista)}",le="{limite}"}} {_numero(acumulado)}')
+        total = datos.get('count', 0)
+        lineas.append(f'camila_request_duration_seconds_bucket{{vista="{_etiqueta(vista)}",le="+Inf"}} {_numero(total)}')
+        lineas.append(f'camila_request_duration_seconds_sum{{vista="{_etiqueta(vista)}"}} {_numero(datos.get("sum", 0))}')
+        lineas.append(f'camila_request_duration_seconds_count{{vista="{_etiqueta(vista)}"}} {_numero(total)}')
+
+    contadores = [
+        ('camila_db_queries_total', 'db_queries', 'Consultas SQL ejecutadas por vista.'),
+        ('camila_db_time_seconds_total', 'db_time', 'Tiempo total en la base de datos por vista.'),
+        ('camila_template_render_seconds_total', 'render_time', 'Tiempo total de render de plantillas por vista.'),
+        ('camila_response_bytes_total', 'bytes', 'Bytes enviados por vista (sin respuestas en streaming).'),
+    ]
+    for metrica, nombre, ayuda in contadores:
+        lineas.append(f'# HELP {metrica} {ayuda}')
+        lineas.append(f'# TYPE {metrica} counter')
+        for vista in vistas:
+            lineas.append(f'{metrica}{{vista="{_etiqueta(vista)}"}} {_numero(por_vista[vista].get(nombre, 0))}')
+
+    lineas.append('# HELP camila_cache_consultas_total Consultas a la caché de la aplicación.')
+    lineas.append('# TYPE camila_cache_consultas_total counter')
+    for clave in sorted(por_vista):
+        if not clave.startswith('cache:'):
+            continue
+        for resultado in ('hit', 'miss'):
+            valor = por_vista[clave].get(resultado)
+            if valor is not None:
+                lineas.append(
+                    f'camila_cache_consultas_total{{cache="{_etiqueta(clave[6:])}",resultado="{resultado}"}} {_numero(valor)}'
+                )
+    return '\n'.join(lineas) + '\n'
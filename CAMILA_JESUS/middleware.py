@@ -0,0 +1,228 @@
+# CAMILA_JESUS/middleware.py
+import heapq
+import re
+import secrets
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.crypto import get_random_string
+
+from . import replicas
+from .metricas import registro
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él se comprime solo con gzip
+    brotli = None
+
+# Sentencias SQL más lentas que se guardan de una petición lenta
+SQL_POR_PETICION_LENTA = 5
+
+# Calidad de Brotli para respuestas dinámicas: por encima de 5 comprime
+# apenas mejor y tarda varias veces más
+CALIDAD_BROTLI = 5
+_ACEPTA_BR = re.compile(r'\bbr\b')
+
+# Medidor de la petición en curso. Una ContextVar (y no un execute_wrapper
+# por petición) porque en las vistas async las consultas corren en otro hilo
+# con su propia conexión; sync_to_async copia el contexto a ese hilo.
+_medidor_actual = ContextVar('camila_medidor_sql', default=None)
+
+
+class _MedidorSQL:
+    """Cuenta consultas, suma su tiempo y guarda las más lentas"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo = 0.0
+        self._lentas = []  # heap de (segundos, n, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.consultas += 1
+            self.tiempo += duracion
+            entrada = (duracion, self.consultas, sql)
+            if len(self._lentas) < SQL_POR_PETICION_LENTA:
+                heapq.heappush(self._lentas, entrada)
+            else:
+                heapq.heappushpop(self._lentas, entrada)
+
+    def mas_lentas(self):
+        return [(seg, sql) for seg, _, sql in sorted(self._lentas, reverse=True)]
+
+
+def _medir_sql(execute, sql, params, many, context):
+    medidor = _medidor_actual.get()
+    if medidor is None:
+        return execute(sql, params, many, context)
+    return medidor(execute, sql, params, many, context)
+
+
+def _instalar(connection, **kwargs):
+    if _medir_sql not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_sql)
+
+
+connection_created.connect(_instalar)
+for _conexion in connections.all(initialized_only=True):
+    _instalar(_conexion)
+
+
+class MetricasMiddleware:
+    """
+    Mide cada petición: latencia, consultas y tiempo de BD, render de la
+    plantilla y bytes de la respuesta, etiquetados por nombre de URL.
+    Las peticiones que superan METRICAS_UMBRAL_LENTO se registran con sus
+    sentencias SQL más lentas en el logger 'camila.lentas'.
+    Funciona tanto bajo WSGI como bajo ASGI.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medidor, token, inicio = self._iniciar(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _medidor_actual.reset(token)
+        self._registrar(request, response, medidor, time.perf_counter() - inicio)
+        return response
+
+    async def __acall__(self, request):
+        medidor, token, inicio = self._iniciar(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _medidor_actual.reset(token)
+        self._registrar(request, response, medidor, time.perf_counter() - inicio)
+        return response
+
+    def _iniciar(self, request):
+        medidor = _MedidorSQL()
+        request._tiempo_render = 0.0
+        return medidor, _medidor_actual.set(medidor), time.perf_counter()
+
+    def _registrar(self, request, response, medidor, duracion):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_ruta'
+        # En streaming el cuerpo aún no se ha generado: no se cuenta
+        tamano = 0 if response.streaming else len(response.content)
+        registro.registrar(vista, duracion, medidor.consultas, medidor.tiempo, request._tiempo_render, tamano)
+
+        if duracion >= settings.METRICAS_UMBRAL_LENTO:
+            registro.registrar_lenta(
+                vista, request.get_full_path(), duracion, medidor.consultas, medidor.mas_lentas(),
+            )
+
+    def process_template_response(self, request, response):
+        # Se llama justo antes de render(); el callback corre justo después
+        inicio = time.perf_counter()
+
+        def medir(rendered):
+            request._tiempo_render += time.perf_counter() - inicio
+
+        response.add_post_render_callback(medir)
+        return response
+
+
+class CompresionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware que prefiere Brotli si el cliente lo acepta y el paquete
+    `brotli` está instalado. Las respuestas en streaming (CSV, descargas)
+    siguen con gzip. Como en GZipMiddleware, un ETag fuerte pasa a débil
+    (W/"...") y las peticiones condicionales siguen funcionando.
+
+    Contra BREACH, el HTML (con el token CSRF y los de los feeds junto a
+    parámetros reflejados) se rellena con un comentario de longitud
+    aleatoria, como el nombre de archivo aleatorio que GZipMiddleware pone
+    en la cabecera gzip.
+    """
+
+    def process_response(self, request, response):
+        if (
+            brotli is None or response.streaming or len(response.content) < 200
+            or response.has_header('Content-Encoding')
+            or not _ACEPTA_BR.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        contenido = response.content
+        if response.get('Content-Type', '').startswith('text/html'):
+            relleno = get_random_string(secrets.randbelow(self.max_random_bytes) + 1)
+            contenido += f'<!-- {relleno} -->'.encode()
+        comprimido = brotli.compress(contenido, quality=CALIDAD_BROTLI)
+        if len(comprimido) >= len(response.content):
+            return response
+        response.content = comprimido
+        response.headers['Content-Length'] = str(len(comprimido))
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = f'W/{etag}'
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class ReplicasMiddleware:
+    """
+    Con réplicas de lectura (ver replicas.py): fija al primario las
+    peticiones que escriben y, si escribieron, pone una cookie para que las
+    del mismo navegador lean del primario durante DATABASE_REPLICA_RETRASO
+    segundos. Sin réplicas no hace nada.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replicas.activas():
+            return self.get_response(request)
+        token = replicas.iniciar_peticion(self._fijada(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            escribio = replicas.terminar_peticion(token)
+        return self._recordar(response, escribio)
+
+    async def __acall__(self, request):
+        if not replicas.activas():
+            return await self.get_response(request)
+        token = replicas.iniciar_peticion(self._fijada(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            escribio = replicas.terminar_peticion(token)
+        return self._recordar(response, escribio)
+
+    def _fijada(self, request):
+        return request.method not in ('GET', 'HEAD', 'OPTIONS') or replicas.COOKIE in request.COOKIES
+
+    def _recordar(self, response, escribio):
+        if escribio:
+            response.set_cookie(
+                replicas.COOKIE, '1', max_age=settings.DATABASE_REPLICA_RETRASO, httponly=True, samesite='Lax',
+            )
+        return response
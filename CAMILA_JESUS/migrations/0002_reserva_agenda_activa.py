@@ -0,0 +1,47 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+EXCLUSION_SQL = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE "CAMILA_JESUS_reserva"
+    ADD CONSTRAINT reserva_sin_solapamiento
+    EXCLUDE USING gist (
+        laboratorio_id WITH =,
+        tsrange(fecha + hora_inicio, fecha + hora_fin, '[)') WITH &&
+    ) WHERE (estado <> 'Cancelada');
+"""
+
+EXCLUSION_REVERSE_SQL = """
+ALTER TABLE "CAMILA_JESUS_reserva" DROP CONSTRAINT IF EXISTS reserva_sin_solapamiento;
+"""
+
+
+def crear_restriccion_exclusion(apps, schema_editor):
+    # Solo PostgreSQL soporta restricciones de exclusión; en SQLite el
+    # solapamiento se evita con Reserva.guardar_validado()
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(EXCLUSION_SQL)
+
+
+def eliminar_restriccion_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(EXCLUSION_REVERSE_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('estado', 'Cancelada'), _negated=True), fields=['laboratorio', 'fecha', 'hora_inicio', 'hora_fin'], name='reserva_agenda_activa_idx'),
+        ),
+        migrations.RunPython(crear_restriccion_exclusion, eliminar_restriccion_exclusion),
+    ]
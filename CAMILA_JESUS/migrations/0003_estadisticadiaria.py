@@ -0,0 +1,50 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def poblar_estadisticas(apps, schema_editor):
+    Reserva = apps.get_model('CAMILA_JESUS', 'Reserva')
+    EstadisticaDiaria = apps.get_model('CAMILA_JESUS', 'EstadisticaDiaria')
+    grupos = Reserva.objects.order_by().values('fecha', 'laboratorio', 'docente', 'estado').annotate(n=Count('id'))
+    EstadisticaDiaria.objects.bulk_create(
+        [
+            EstadisticaDiaria(
+                fecha=g['fecha'], laboratorio_id=g['laboratorio'],
+                docente_id=g['docente'], estado=g['estado'], total=g['n'],
+            )
+            for g in grupos.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0002_reserva_agenda_activa'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('Aprobada', 'Aprobada'), ('Rechazada', 'Rechazada'), ('Cancelada', 'Cancelada')], max_length=10)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('docente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('laboratorio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='CAMILA_JESUS.laboratorio')),
+            ],
+            options={
+                'verbose_name': 'Estadística diaria',
+                'verbose_name_plural': 'Estadísticas diarias',
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'laboratorio', 'docente', 'estado'), name='estadistica_diaria_unica')],
+            },
+        ),
+        migrations.RunPython(poblar_estadisticas, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0003_estadisticadiaria'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionDatos',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de datos',
+                'verbose_name_plural': 'Versiones de datos',
+            },
+        ),
+        migrations.CreateModel(
+            name='Exportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filtros', models.JSONField(default=dict)),
+                ('clave', models.CharField(db_index=True, max_length=40)),
+                ('version_datos', models.PositiveBigIntegerField(default=0)),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('En proceso', 'En proceso'), ('Completada', 'Completada'), ('Fallida', 'Fallida'), ('Vencida', 'Vencida')], default='Pendiente', max_length=10)),
+                ('archivo', models.CharField(blank=True, max_length=255)),
+                ('filas', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('solicitada_por', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exportaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Exportación',
+                'verbose_name_plural': 'Exportaciones',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
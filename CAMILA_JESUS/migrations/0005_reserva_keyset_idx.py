@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0004_exportaciones'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['-fecha', '-hora_inicio', '-id'], name='reserva_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['docente', '-fecha', '-hora_inicio', '-id'], name='reserva_docente_keyset_idx'),
+        ),
+    ]
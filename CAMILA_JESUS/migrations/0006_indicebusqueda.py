@@ -0,0 +1,93 @@
+# Generated by Django 5.2.8 on 2026-10-18 00:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FTS = 'CAMILA_JESUS_indicebusqueda_fts'
+
+# Tabla FTS5 de contenido externo sobre IndiceBusqueda; los triggers la
+# mantienen al día con cada INSERT/UPDATE/DELETE de la tabla base
+SQLITE_FTS_SQL = [
+    f"""CREATE VIRTUAL TABLE "{FTS}" USING fts5(
+        documento, content='CAMILA_JESUS_indicebusqueda', content_rowid='reserva_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER "{FTS}_ai" AFTER INSERT ON "CAMILA_JESUS_indicebusqueda" BEGIN
+        INSERT INTO "{FTS}"(rowid, documento) VALUES (new.reserva_id, new.documento);
+    END""",
+    f"""CREATE TRIGGER "{FTS}_ad" AFTER DELETE ON "CAMILA_JESUS_indicebusqueda" BEGIN
+        INSERT INTO "{FTS}"("{FTS}", rowid, documento) VALUES ('delete', old.reserva_id, old.documento);
+    END""",
+    f"""CREATE TRIGGER "{FTS}_au" AFTER UPDATE ON "CAMILA_JESUS_indicebusqueda" BEGIN
+        INSERT INTO "{FTS}"("{FTS}", rowid, documento) VALUES ('delete', old.reserva_id, old.documento);
+        INSERT INTO "{FTS}"(rowid, documento) VALUES (new.reserva_id, new.documento);
+    END""",
+]
+
+SQLITE_FTS_REVERSE_SQL = [
+    f'DROP TRIGGER IF EXISTS "{FTS}_ai"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_ad"',
+    f'DROP TRIGGER IF EXISTS "{FTS}_au"',
+    f'DROP TABLE IF EXISTS "{FTS}"',
+]
+
+
+def _indice_gin():
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+    return GinIndex(SearchVector('documento', config='spanish'), name='indice_busqueda_gin')
+
+
+def crear_indice_texto(apps, schema_editor):
+    # GIN sobre to_tsvector en PostgreSQL, FTS5 en SQLite; otros motores
+    # buscan con LIKE sobre IndiceBusqueda.documento
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.add_index(apps.get_model('CAMILA_JESUS', 'IndiceBusqueda'), _indice_gin())
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FTS_SQL:
+            schema_editor.execute(sql)
+
+
+def eliminar_indice_texto(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.remove_index(apps.get_model('CAMILA_JESUS', 'IndiceBusqueda'), _indice_gin())
+    elif vendor == 'sqlite':
+        for sql in SQLITE_FTS_REVERSE_SQL:
+            schema_editor.execute(sql)
+
+
+def poblar_indice(apps, schema_editor):
+    Reserva = apps.get_model('CAMILA_JESUS', 'Reserva')
+    IndiceBusqueda = apps.get_model('CAMILA_JESUS', 'IndiceBusqueda')
+    filas = Reserva.objects.values_list(
+        'pk', 'motivo', 'docente__first_name', 'docente__last_name', 'docente__username', 'laboratorio__nombre',
+    )
+    IndiceBusqueda.objects.bulk_create(
+        (IndiceBusqueda(reserva_id=pk, documento=' '.join(textos)) for pk, *textos in filas.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0005_reserva_keyset_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusqueda',
+            fields=[
+                ('reserva', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='indice', serialize=False, to='CAMILA_JESUS.reserva')),
+                ('documento', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Índice de búsqueda',
+                'verbose_name_plural': 'Índices de búsqueda',
+            },
+        ),
+        migrations.RunPython(crear_indice_texto, eliminar_indice_texto),
+        migrations.RunPython(poblar_indice, migrations.RunPython.noop),
+    ]
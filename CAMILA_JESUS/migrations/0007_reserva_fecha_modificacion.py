@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copiar_fecha_creacion(apps, schema_editor):
+    # Las reservas existentes se consideran sin modificar desde su creación
+    Reserva = apps.get_model('CAMILA_JESUS', 'Reserva')
+    Reserva.objects.update(fecha_modificacion=models.F('fecha_creacion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0006_indicebusqueda'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(copiar_fecha_creacion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['laboratorio', 'fecha_modificacion'], name='reserva_lab_modif_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['docente', 'fecha_modificacion'], name='reserva_docente_modif_idx'),
+        ),
+    ]
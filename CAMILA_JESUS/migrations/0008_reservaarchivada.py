@@ -0,0 +1,37 @@
+# Generated by Django 5.2.8 on 2026-10-18 01:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0007_reserva_fecha_modificacion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservaArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha', models.DateField(db_index=True)),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('motivo', models.TextField()),
+                ('estado', models.CharField(choices=[('Pendiente', 'Pendiente'), ('Aprobada', 'Aprobada'), ('Rechazada', 'Rechazada'), ('Cancelada', 'Cancelada')], max_length=10)),
+                ('fecha_creacion', models.DateTimeField()),
+                ('fecha_modificacion', models.DateTimeField()),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True)),
+                ('docente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_archivadas', to=settings.AUTH_USER_MODEL)),
+                ('laboratorio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservas_archivadas', to='CAMILA_JESUS.laboratorio')),
+            ],
+            options={
+                'verbose_name': 'Reserva archivada',
+                'verbose_name_plural': 'Reservas archivadas',
+                'ordering': ['-fecha', 'hora_inicio'],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:21
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0009_notificacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='versiondatos',
+            name='modificado',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
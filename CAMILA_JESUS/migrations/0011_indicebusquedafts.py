@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 02:40
+
+import CAMILA_JESUS.models
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CAMILA_JESUS', '0010_versiondatos_modificado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceBusquedaFTS',
+            fields=[
+                ('reserva', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='fts', serialize=False, to='CAMILA_JESUS.reserva')),
+                ('documento', models.TextField()),
+                ('tabla', CAMILA_JESUS.models.CampoFTS(db_column='CAMILA_JESUS_indicebusqueda_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'CAMILA_JESUS_indicebusqueda_fts',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, router, transaction, connections
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.db.models import Q
+from django.utils import timezone
 
 ESTADOS = [
     ('Pendiente', 'Pendiente'),
@@ -10,6 +11,32 @@ ESTADOS = [
     ('Cancelada', 'Cancelada'),
 ]
 
+def bloquear_agenda(laboratorio_id, fecha, using='default'):
+    """
+    Toma un bloqueo sobre la agenda de un laboratorio en una fecha.
+    Debe llamarse dentro de transaction.atomic(); el bloqueo se libera al
+    terminar la transacción.
+    """
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Bloqueo consultivo por (laboratorio, día): no bloquea otras agendas
+            cursor.execute(
+                'SELECT pg_advisory_xact_lock(%s, %s)',
+                [int(laboratorio_id), fecha.toordinal()]
+            )
+        elif connection.vendor == 'sqlite':
+            # SQLite bloquea a nivel de base de datos: una escritura vacía
+            # escala la transacción a RESERVED antes de la verificación, así
+            # los demás escritores esperan (busy_timeout) en lugar de fallar.
+            cursor.execute(
+                f'UPDATE {Laboratorio._meta.db_table} SET id = id WHERE id = %s',
+                [laboratorio_id]
+            )
+        else:
+            list(Laboratorio.objects.using(using).select_for_update().filter(pk=laboratorio_id))
+
+
 class Laboratorio(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
 
@@ -21,6 +48,22 @@ class Laboratorio(models.Model):
     def __str__(self):
         return self.nombre
 
+class ReservaQuerySet(models.QuerySet):
+
+    def estadisticas(self):
+        """
+        Totales por estado en una sola consulta (agregación condicional).
+        Devuelve un dict con total, pendientes, aprobadas, rechazadas y canceladas.
+        """
+        return self.order_by().aggregate(
+            total=models.Count('id'),
+            pendientes=models.Count('id', filter=Q(estado='Pendiente')),
+            aprobadas=models.Count('id', filter=Q(estado='Aprobada')),
+            rechazadas=models.Count('id', filter=Q(estado='Rechazada')),
+            canceladas=models.Count('id', filter=Q(estado='Cancelada')),
+        )
+
+
 class Reserva(models.Model):
     docente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservas')
     laboratorio = models.ForeignKey(Laboratorio, on_delete=models.CASCADE, related_name='reservas')
@@ -30,23 +73,63 @@ class Reserva(models.Model):
     motivo = models.TextField()
     estado = models.CharField(max_length=10, choices=ESTADOS, default='Pendiente')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
+    # Marca de agua de los feeds iCalendar (ver calendario.py); los update()
+    # masivos deben fijarla a mano
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    objects = ReservaQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Reserva'
         verbose_name_plural = 'Reservas'
         ordering = ['-fecha', 'hora_inicio']
+        indexes = [
+            # Cubre la búsqueda de solapamientos de Reserva.clean()
+            models.Index(
+                fields=['laboratorio', 'fecha', 'hora_inicio', 'hora_fin'],
+                condition=~Q(estado='Cancelada'),
+                name='reserva_agenda_activa_idx',
+            ),
+            # Paginación por cursor (-fecha, -hora_inicio, -id) en las listas
+            models.Index(fields=['-fecha', '-hora_inicio', '-id'], name='reserva_keyset_idx'),
+            models.Index(fields=['docente', '-fecha', '-hora_inicio', '-id'], name='reserva_docente_keyset_idx'),
+            # Actualización incremental de los feeds iCalendar
+            models.Index(fields=['laboratorio', 'fecha_modificacion'], name='reserva_lab_modif_idx'),
+            models.Index(fields=['docente', 'fecha_modificacion'], name='reserva_docente_modif_idx'),
+        ]
 
     def __str__(self):
         return f"{self.docente.username} - {self.laboratorio.nombre} ({self.fecha})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Valores tal como están en la BD, para ajustar el resumen diario al guardar
+        diferidos = instance.get_deferred_fields()
+        if not diferidos.intersection(('fecha', 'laboratorio', 'docente', 'estado')):
+            instance._clave_original = instance.clave_estadistica()
+        # ... y para reindexar el texto solo si cambió
+        if not diferidos.intersection(('motivo', 'laboratorio', 'docente')):
+            instance._texto_original = instance.clave_busqueda()
+        return instance
+
+    def clave_estadistica(self):
+        """(fecha, laboratorio_id, docente_id, estado) usada por EstadisticaDiaria"""
+        return (self.fecha, self.laboratorio_id, self.docente_id, self.estado)
+
+    def clave_busqueda(self):
+        """Campos de los que depende IndiceBusqueda"""
+        return (self.motivo, self.laboratorio_id, self.docente_id)
+
     def clean(self):
         # Validación: hora_inicio debe ser anterior a hora_fin
         if self.hora_inicio >= self.hora_fin:
             raise ValidationError("La hora de inicio debe ser anterior a la hora de fin.")
 
         # Validación: no puede haber conflictos de horarios en el mismo laboratorio
-        # Buscar reservas en el mismo laboratorio y fecha
-        qs = Reserva.objects.filter(
+        # Buscar reservas en el mismo laboratorio y fecha, en la base donde se
+        # escribirá (nunca en una réplica de lectura atrasada)
+        qs = Reserva.objects.db_manager(router.db_for_write(Reserva, instance=self)).filter(
             laboratorio=self.laboratorio,
             fecha=self.fecha
         ).exclude(estado='Cancelada')  # No considerar reservas canceladas
@@ -65,3 +148,246 @@ class Reserva(models.Model):
             raise ValidationError(
                 f"Ya existe una reserva en {self.laboratorio.nombre} que se solapa con este horario."
             )
+
+    def guardar_validado(self, using='default'):
+        """
+        Valida y guarda la reserva bajo el bloqueo de su agenda, de modo que
+        dos escritores concurrentes no puedan pasar ambos la verificación de
+        solapamiento.
+        """
+        with transaction.atomic(using=using):
+            bloquear_agenda(self.laboratorio_id, self.fecha, using=using)
+            self.full_clean()
+            self.save(using=using)
+
+
+class ReservaArchivada(models.Model):
+    """
+    Reservas anteriores al corte de archivo, movidas por lotes desde Reserva
+    (ver archivo.py). Conservan su id y sus datos y no se editan; así las
+    consultas frecuentes (solapamientos, listas, dashboards) solo recorren
+    las reservas vigentes. El resumen diario y las exportaciones las siguen
+    incluyendo.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    docente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reservas_archivadas')
+    laboratorio = models.ForeignKey(Laboratorio, on_delete=models.CASCADE, related_name='reservas_archivadas')
+    fecha = models.DateField(db_index=True)
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    motivo = models.TextField()
+    estado = models.CharField(max_length=10, choices=ESTADOS)
+    fecha_creacion = models.DateTimeField()
+    fecha_modificacion = models.DateTimeField()
+    fecha_archivo = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Reserva archivada'
+        verbose_name_plural = 'Reservas archivadas'
+        ordering = ['-fecha', 'hora_inicio']
+
+    def __str__(self):
+        return f"Reserva #{self.pk} ({self.fecha}, archivada)"
+
+
+class EstadisticaDiaria(models.Model):
+    """
+    Resumen precalculado: cantidad de reservas por día, laboratorio, docente
+    y estado. Lo mantienen las señales de Reserva y las acciones masivas
+    (ver estadisticas.py); se reconstruye con `manage.py reconstruir_estadisticas`.
+    """
+    fecha = models.DateField()
+    laboratorio = models.ForeignKey(Laboratorio, on_delete=models.CASCADE, related_name='+')
+    docente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    estado = models.CharField(max_length=10, choices=ESTADOS)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Estadística diaria'
+        verbose_name_plural = 'Estadísticas diarias'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fecha', 'laboratorio', 'docente', 'estado'],
+                name='estadistica_diaria_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.laboratorio_id}/{self.docente_id} {self.estado}: {self.total}"
+
+
+class IndiceBusqueda(models.Model):
+    """
+    Texto buscable de cada reserva (motivo, docente y laboratorio) en una
+    sola columna, para no buscar con LIKE sobre tablas unidas. Sobre esta
+    tabla hay un índice GIN (PostgreSQL) o una tabla FTS5 (SQLite); ver
+    busqueda.py. Lo mantienen las señales.
+    """
+    reserva = models.OneToOneField(Reserva, on_delete=models.CASCADE, primary_key=True, related_name='indice')
+    documento = models.TextField()
+
+    class Meta:
+        verbose_name = 'Índice de búsqueda'
+        verbose_name_plural = 'Índices de búsqueda'
+
+    def __str__(self):
+        return f"Reserva #{self.reserva_id}"
+
+
+class Coincide(models.Lookup):
+    """`campo__coincide=consulta`: MATCH de FTS5"""
+    lookup_name = 'coincide'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', [*lhs_params, *rhs_params]
+
+
+class CampoFTS(models.TextField):
+    """Columna oculta de una tabla FTS5 (lleva el nombre de la tabla)"""
+
+
+CampoFTS.register_lookup(Coincide)
+
+
+class IndiceBusquedaFTS(models.Model):
+    """
+    Tabla FTS5 sobre IndiceBusqueda (solo SQLite). La crea y la mantiene la
+    migración 0006 con triggers; el modelo existe para que busqueda.py
+    pueda unirla por rowid y leer `rank` desde el ORM.
+    """
+    reserva = models.OneToOneField(
+        Reserva, on_delete=models.DO_NOTHING, primary_key=True, db_column='rowid',
+        db_constraint=False, related_name='fts',
+    )
+    documento = models.TextField()
+    tabla = CampoFTS(db_column='CAMILA_JESUS_indicebusqueda_fts')
+    # bm25: más negativo es más relevante
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'CAMILA_JESUS_indicebusqueda_fts'
+
+
+VERSION_RESERVAS = 'reservas'
+VERSION_LABORATORIOS = 'laboratorios'
+
+
+class VersionDatos(models.Model):
+    """
+    Contador de cambios compartido por todos los procesos. Se incrementa en
+    cada escritura de Reserva y sirve para invalidar artefactos derivados
+    (exportaciones en caché, etc.).
+    """
+    nombre = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    # Último incremento: Last-Modified de la API
+    modificado = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = 'Versión de datos'
+        verbose_name_plural = 'Versiones de datos'
+
+    def __str__(self):
+        return f"{self.nombre}: {self.version}"
+
+    @classmethod
+    def actual(cls, nombre):
+        return cls.objects.filter(nombre=nombre).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def versiones(cls, *nombres):
+        """Versiones de varios contadores en una sola consulta, en el mismo orden"""
+        versiones = dict(cls.objects.filter(nombre__in=nombres).values_list('nombre', 'version'))
+        return [versiones.get(n, 0) for n in nombres]
+
+    @classmethod
+    def cambios(cls, *nombres):
+        """(versiones(), fecha del último incremento de cualquiera o None) en una consulta"""
+        filas = list(cls.objects.filter(nombre__in=nombres).values_list('nombre', 'version', 'modificado'))
+        versiones = {nombre: version for nombre, version, _ in filas}
+        return [versiones.get(n, 0) for n in nombres], max((fila[2] for fila in filas), default=None)
+
+    @classmethod
+    def firma(cls, *nombres):
+        """Como versiones(), como texto: p. ej. '12-3'"""
+        return '-'.join(str(v) for v in cls.versiones(*nombres))
+
+    @classmethod
+    def incrementar(cls, nombre):
+        if not cls.objects.filter(nombre=nombre).update(version=models.F('version') + 1, modificado=timezone.now()):
+            cls.objects.get_or_create(nombre=nombre, defaults={'version': 1})
+
+
+ESTADOS_EXPORTACION = [
+    ('Pendiente', 'Pendiente'),
+    ('En proceso', 'En proceso'),
+    ('Completada', 'Completada'),
+    ('Fallida', 'Fallida'),
+    ('Vencida', 'Vencida'),
+]
+
+
+class Exportacion(models.Model):
+    """Exportación CSV solicitada por un administrador y generada por el worker"""
+    solicitada_por = models.ForeignKey(User, on_delete=models.CASCADE, related_name='exportaciones')
+    filtros = models.JSONField(default=dict)
+    clave = models.CharField(max_length=40, db_index=True)
+    version_datos = models.PositiveBigIntegerField(default=0)
+    estado = models.CharField(max_length=10, choices=ESTADOS_EXPORTACION, default='Pendiente')
+    archivo = models.CharField(max_length=255, blank=True)
+    filas = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Exportación'
+        verbose_name_plural = 'Exportaciones'
+        ordering = ['-fecha_creacion']
+
+    def __str__(self):
+        return f"Exportación #{self.pk} ({self.estado})"
+
+
+ESTADOS_NOTIFICACION = [
+    ('Pendiente', 'Pendiente'),
+    ('En proceso', 'En proceso'),
+    ('Enviada', 'Enviada'),
+    ('Fallida', 'Fallida'),
+    ('Omitida', 'Omitida'),
+]
+
+
+class Notificacion(models.Model):
+    """
+    Bandeja de salida: un cambio de estado de una reserva que se debe
+    comunicar al docente. Se escribe en la misma transacción que el cambio
+    y la envía el worker (ver notificaciones.py). Guarda una copia de los
+    datos de la reserva: esta puede archivarse antes del envío.
+    """
+    docente = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notificaciones')
+    reserva_id = models.BigIntegerField()
+    evento = models.CharField(max_length=10, choices=ESTADOS)
+    datos = models.JSONField(default=dict)
+    estado = models.CharField(max_length=10, choices=ESTADOS_NOTIFICACION, default='Pendiente')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    # Pendiente: cuándo se puede intentar; En proceso: cuándo vence el reclamo
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_envio = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Notificación'
+        verbose_name_plural = 'Notificaciones'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'proximo_intento'], name='notificacion_cola_idx'),
+        ]
+
+    def __str__(self):
+        return f"Notificación #{self.pk} ({self.evento}, {self.estado})"
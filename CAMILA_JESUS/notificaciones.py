@@ -0,0 +1,175 @@
+# CAMILA_JESUS/notificaciones.py
+"""
+Notificaciones por correo de los cambios de estado de las reservas.
+
+Quien cambia el estado (aprobar/rechazar en services.cambiar_estado_lote,
+cancelar en services.cancelar_reserva) llama a registrar() dentro de la
+misma transacción: la Notificacion existe si y solo si el cambio se
+confirmó, y la petición no espera al servidor de correo.
+
+El worker (`manage.py procesar_notificaciones`) reclama lotes de
+notificaciones vencidas, agrupa las de cada docente en un solo correo y
+las envía por una conexión del backend de correo de Django. Un envío
+fallido se reintenta con espera exponencial hasta MAX_INTENTOS. Un
+worker que muere deja sus notificaciones En proceso; vuelven a la cola
+cuando vence el reclamo.
+"""
+import datetime
+import random
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Notificacion
+
+TAMANO_LOTE = 200
+MAX_INTENTOS = 6
+ESPERA_BASE = 60  # segundos; se duplica en cada intento
+# Segundos que un worker tiene para enviar un lote reclamado
+DURACION_RECLAMO = 300
+
+ASUNTOS = {
+    'Aprobada': 'Reserva aprobada',
+    'Rechazada': 'Reserva rechazada',
+    'Cancelada': 'Reserva cancelada',
+}
+
+
+def datos_reserva(laboratorio, fecha, hora_inicio, hora_fin, motivo):
+    return {
+        'laboratorio': laboratorio,
+        'fecha': fecha.isoformat(),
+        'hora_inicio': hora_inicio.strftime('%H:%M'),
+        'hora_fin': hora_fin.strftime('%H:%M'),
+        'motivo': motivo,
+    }
+
+
+def registrar(eventos):
+    """
+    Encola notificaciones: eventos es [(docente_id, reserva_id, estado, datos)].
+    Debe llamarse en la transacción del cambio de estado.
+    """
+    Notificacion.objects.bulk_create([
+        Notificacion(docente_id=docente_id, reserva_id=reserva_id, evento=evento, datos=datos)
+        for docente_id, reserva_id, evento, datos in eventos
+    ])
+
+
+def reclamar(limite=TAMANO_LOTE, ahora=None):
+    """
+    Marca En proceso hasta `limite` notificaciones vencidas y las devuelve
+    (con su docente). Dos workers no reclaman la misma: en PostgreSQL por
+    SKIP LOCKED, en SQLite porque la transacción toma el bloqueo de
+    escritura al empezar.
+    """
+    ahora = ahora or timezone.now()
+    with transaction.atomic():
+        pks = list(
+            Notificacion.objects.select_for_update(skip_locked=True)
+            .filter(estado__in=('Pendiente', 'En proceso'), proximo_intento__lte=ahora)
+            .order_by('proximo_intento', 'pk').values_list('pk', flat=True)[:limite]
+        )
+        Notificacion.objects.filter(pk__in=pks).update(
+            estado='En proceso', proximo_intento=ahora + datetime.timedelta(seconds=DURACION_RECLAMO),
+        )
+        # Dentro de la transacción: se lee del primario aunque haya réplicas
+        return list(Notificacion.objects.filter(pk__in=pks).select_related('docente').order_by('docente_id', 'pk'))
+
+
+def _linea(notificacion):
+    d = notificacion.datos
+    return (
+        f"- {notificacion.evento}: reserva #{notificacion.reserva_id} en {d['laboratorio']}, "
+        f"{d['fecha']} de {d['hora_inicio']} a {d['hora_fin']} ({d['motivo']})"
+    )
+
+
+def resumen(docente, notificaciones):
+    """Un correo con todas las notificaciones de un docente"""
+    if len(notificaciones) == 1:
+        n = notificaciones[0]
+        asunto = f"{ASUNTOS.get(n.evento, n.evento)}: {n.datos['laboratorio']} el {n.datos['fecha']}"
+    else:
+        asunto = f"{len(notificaciones)} cambios en tus reservas de laboratorio"
+    cuerpo = '\n'.join([
+        f"Hola {docente.get_full_name() or docente.username},",
+        '',
+        'Estos son los cambios en tus reservas:',
+        '',
+        *(_linea(n) for n in notificaciones),
+    ])
+    return EmailMessage(asunto, cuerpo, settings.DEFAULT_FROM_EMAIL, [docente.email])
+
+
+def espera(intentos):
+    """Segundos hasta el siguiente intento, con variación para no sincronizar reintentos"""
+    return ESPERA_BASE * 2 ** (intentos - 1) * random.uniform(0.5, 1.5)
+
+
+def _fallo(pks, intentos, error, ahora):
+    """Marca un grupo fallido: reintento más tarde o Fallida si ya no quedan intentos"""
+    if intentos >= MAX_INTENTOS:
+        Notificacion.objects.filter(pk__in=pks).update(estado='Fallida', intentos=intentos, error=error)
+        return 'fallidas'
+    Notificacion.objects.filter(pk__in=pks).update(
+        estado='Pendiente', intentos=intentos, error=error,
+        proximo_intento=ahora + datetime.timedelta(seconds=espera(intentos)),
+    )
+    return 'reintentos'
+
+
+def enviar(notificaciones):
+    """
+    Envía las notificaciones reclamadas, un correo por docente, por una sola
+    conexión. Devuelve el conteo {'enviadas', 'correos', 'reintentos',
+    'fallidas', 'omitidas'} por notificación (correos: mensajes enviados).
+    """
+    conteo = dict.fromkeys(('enviadas', 'correos', 'reintentos', 'fallidas', 'omitidas'), 0)
+    por_docente = {}
+    for n in notificaciones:
+        por_docente.setdefault(n.docente_id, []).append(n)
+
+    try:
+        conexion = get_connection()
+        conexion.open()
+    except Exception as e:
+        # Sin servidor de correo: todo el lote se reintenta
+        ahora = timezone.now()
+        for grupo in por_docente.values():
+            intentos = max(n.intentos for n in grupo) + 1
+            conteo[_fallo([n.pk for n in grupo], intentos, str(e), ahora)] += len(grupo)
+        return conteo
+
+    try:
+        for grupo in por_docente.values():
+            pks = [n.pk for n in grupo]
+            docente = grupo[0].docente
+            if not docente.email:
+                Notificacion.objects.filter(pk__in=pks).update(estado='Omitida', error='El docente no tiene correo.')
+                conteo['omitidas'] += len(grupo)
+                continue
+            try:
+                conexion.send_messages([resumen(docente, grupo)])
+            except Exception as e:
+                intentos = max(n.intentos for n in grupo) + 1
+                conteo[_fallo(pks, intentos, str(e), timezone.now())] += len(grupo)
+                continue
+            Notificacion.objects.filter(pk__in=pks).update(
+                estado='Enviada', intentos=F('intentos') + 1, error='', fecha_envio=timezone.now(),
+            )
+            conteo['enviadas'] += len(grupo)
+            conteo['correos'] += 1
+    finally:
+        conexion.close()
+    return conteo
+
+
+def purgar(dias, ahora=None):
+    """Borra las notificaciones enviadas u omitidas hace más de `dias` días"""
+    limite = (ahora or timezone.now()) - datetime.timedelta(days=dias)
+    borradas, _ = Notificacion.objects.filter(estado__in=('Enviada', 'Omitida'), fecha_creacion__lt=limite).delete()
+    return borradas
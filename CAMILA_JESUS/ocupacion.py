@@ -0,0 +1,184 @@
+# CAMILA_JESUS/ocupacion.py
+"""
+Ocupación de los laboratorios: qué parte de las horas reservables se usó,
+por laboratorio, día de la semana y franja de media hora.
+
+Horas reservables: la jornada de disponibilidad.py (07:00 a 21:00) todos
+los días del rango. Cuentan como usadas las horas de las reservas
+aprobadas, también las archivadas.
+
+No se recorren instancias del modelo: la base de datos agrupa las
+reservas por (laboratorio, día de la semana, hora de inicio, hora de fin)
+con values_list, de modo que un semestre con cientos de miles de reservas
+llega como unos pocos miles de filas con su conteo. Los minutos de cada
+grupo que caen en cada franja se calculan con operaciones de arrays de
+NumPy y se acumulan en una matriz laboratorio × día × franja.
+"""
+import datetime
+
+import numpy as np
+from django.db.models import Count
+from django.db.models.functions import ExtractIsoWeekDay
+from django.utils import timezone
+
+from . import caches
+from .archivo import con_historial
+from .disponibilidad import HORA_APERTURA, HORA_CIERRE
+
+ESTADOS_OCUPAN = ('Aprobada',)
+MINUTOS_FRANJA = 30
+DIAS = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+
+# Máximo de días por consulta
+MAX_DIAS = 366
+
+
+def _minutos(t):
+    return t.hour * 60 + t.minute
+
+
+APERTURA = _minutos(HORA_APERTURA)
+CIERRE = _minutos(HORA_CIERRE)
+# Minuto de inicio de cada franja de la jornada
+INICIOS = np.arange(APERTURA, CIERRE, MINUTOS_FRANJA)
+FRANJAS = [f"{m // 60:02d}:{m % 60:02d}" for m in INICIOS.tolist()]
+
+
+def semestre(texto=None, hoy=None):
+    """
+    (desde, hasta) del semestre 'AAAA-1' (enero a junio) o 'AAAA-2' (julio a
+    diciembre); sin texto, el semestre en curso. Lanza ValueError.
+    """
+    if not texto:
+        hoy = hoy or timezone.localdate()
+        texto = f"{hoy.year}-{1 if hoy.month <= 6 else 2}"
+    anio, _, mitad = texto.partition('-')
+    if not anio.isdigit() or mitad not in ('1', '2'):
+        raise ValueError(texto)
+    anio = int(anio)
+    if mitad == '1':
+        return datetime.date(anio, 1, 1), datetime.date(anio, 6, 30)
+    return datetime.date(anio, 7, 1), datetime.date(anio, 12, 31)
+
+
+def nombre_semestre(desde):
+    return f"{desde.year}-{1 if desde.month <= 6 else 2}"
+
+
+def dias_por_semana(desde, hasta):
+    """Cuántas veces aparece cada día de la semana (lunes = 0) en el rango"""
+    dias = np.arange(np.datetime64(desde, 'D'), np.datetime64(hasta, 'D') + 1)
+    # El 1970-01-01 (día 0) fue jueves
+    return np.bincount((dias.astype(np.int64) + 3) % 7, minlength=7)
+
+
+def minutos_por_franja(inicio, fin):
+    """
+    Matriz (n, franjas) con los minutos de cada intervalo [inicio, fin)
+    (en minutos desde las 00:00) que caen en cada franja de la jornada.
+    """
+    desde = np.maximum(inicio[:, None], INICIOS)
+    hasta = np.minimum(fin[:, None], INICIOS + MINUTOS_FRANJA)
+    return np.clip(hasta - desde, 0, None)
+
+
+def acumular(posicion, dia, inicio, fin, conteo, laboratorios):
+    """
+    Minutos ocupados (laboratorios, 7, franjas) a partir de arrays paralelos:
+    índice del laboratorio, día de la semana (lunes = 0), inicio y fin en
+    minutos y número de reservas con esos valores.
+    """
+    ocupado = np.zeros((laboratorios * 7, len(INICIOS)), dtype=np.int64)
+    # add.at suma bien los índices repetidos (varias horas del mismo día)
+    np.add.at(ocupado, posicion * 7 + dia, minutos_por_franja(inicio, fin) * conteo[:, None])
+    return ocupado.reshape(laboratorios, 7, len(INICIOS))
+
+
+def _grupos(queryset, desde, hasta):
+    return (
+        queryset.filter(fecha__range=(desde, hasta), estado__in=ESTADOS_OCUPAN)
+        .annotate(dia=ExtractIsoWeekDay('fecha'))
+        .values_list('laboratorio_id', 'dia', 'hora_inicio', 'hora_fin')
+        .annotate(n=Count('pk'))
+        .order_by()
+    )
+
+
+def _arrays(filas):
+    filas = list(filas)
+    total = len(filas)
+    return (
+        np.fromiter((f[0] for f in filas), np.int64, total),
+        # ISO: lunes = 1
+        np.fromiter((f[1] - 1 for f in filas), np.int64, total),
+        np.fromiter((_minutos(f[2]) for f in filas), np.int64, total),
+        np.fromiter((_minutos(f[3]) for f in filas), np.int64, total),
+        np.fromiter((f[4] for f in filas), np.int64, total),
+    )
+
+
+def posiciones(ids, laboratorio_ids):
+    """Índice en `ids` de cada laboratorio_id (todos deben estar en `ids`)"""
+    orden = np.argsort(ids)
+    return orden[np.searchsorted(ids[orden], laboratorio_ids)]
+
+
+def matriz(laboratorios, desde, hasta):
+    """Minutos ocupados (len(laboratorios), 7, franjas) entre dos fechas (inclusive)"""
+    filas = [fila for qs in con_historial(lambda qs: _grupos(qs, desde, hasta)) for fila in qs]
+    lab_ids, dia, inicio, fin, conteo = _arrays(filas)
+    ids = np.array([lab.pk for lab in laboratorios], dtype=np.int64)
+    # Un laboratorio borrado se lleva sus reservas; filtrar cubre una carrera
+    conocidos = np.isin(lab_ids, ids)
+    return acumular(
+        posiciones(ids, lab_ids[conocidos]), dia[conocidos], inicio[conocidos], fin[conocidos],
+        conteo[conocidos], len(laboratorios),
+    )
+
+
+def _fraccion(ocupado, capacidad):
+    """ocupado / capacidad redondeado (0 donde no hay capacidad)"""
+    capacidad = np.broadcast_to(capacidad, np.shape(ocupado))
+    resultado = np.divide(ocupado, capacidad, out=np.zeros(np.shape(ocupado)), where=capacidad > 0)
+    return np.round(resultado, 4).tolist()
+
+
+def calcular(desde, hasta, laboratorios=None):
+    """Utilización entre dos fechas (inclusive) como estructura JSON"""
+    laboratorios = list(caches.laboratorios() if laboratorios is None else laboratorios)
+    ocupado = matriz(laboratorios, desde, hasta)
+    # Minutos reservables de un laboratorio por (día, franja)
+    capacidad = dias_por_semana(desde, hasta)[:, None] * MINUTOS_FRANJA * np.ones(len(INICIOS), dtype=np.int64)
+    por_laboratorio = ocupado.sum(axis=(1, 2))
+    reservables = int(capacidad.sum())
+
+    return {
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'dias': list(DIAS),
+        'franjas': FRANJAS,
+        'horas_reservables': reservables / 60,
+        'horas_ocupadas': int(por_laboratorio.sum()) / 60,
+        'utilizacion': _fraccion(por_laboratorio.sum(), reservables * len(laboratorios)),
+        # Todos los laboratorios juntos, por hora de la semana
+        'semana': _fraccion(ocupado.sum(axis=0), capacidad * len(laboratorios)),
+        'laboratorios': [
+            {
+                'id': lab.pk,
+                'nombre': lab.nombre,
+                'horas_ocupadas': int(minutos) / 60,
+                'utilizacion': utilizacion,
+                'matriz': filas,
+            }
+            for lab, minutos, utilizacion, filas in zip(
+                laboratorios, por_laboratorio.tolist(),
+                _fraccion(por_laboratorio, reservables), _fraccion(ocupado, capacidad),
+            )
+        ],
+    }
+
+
+def obtener(desde, hasta):
+    """calcular() cacheado hasta la próxima escritura de reservas o de laboratorios"""
+    nombre = f"ocupacion:{caches.version(caches.GRUPO_LABORATORIOS)}:{desde}:{hasta}"
+    return caches.obtener(nombre, caches.GRUPO_ADMIN, lambda: calcular(desde, hasta))
@@ -0,0 +1,212 @@
+# CAMILA_JESUS/paginacion.py
+"""
+Paginación por cursor (keyset) para listas de reservas.
+
+En lugar de OFFSET + COUNT(*), cada página filtra a partir de la última
+fila vista usando la clave (fecha, hora_inicio, id), que está indexada.
+El costo de la página 5.000 es el mismo que el de la página 1.
+"""
+import asyncio
+import base64
+import datetime
+
+from asgiref.sync import sync_to_async
+from django.db import connections
+from django.db.models import Q
+
+# Conteo aproximado: más allá de este límite solo se informa "más de N"
+LIMITE_CONTEO = 10000
+
+
+def codificar_clave(fecha, hora_inicio, pk):
+    valor = f"{fecha.isoformat()}|{hora_inicio.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(valor.encode()).decode().rstrip('=')
+
+
+def codificar_cursor(reserva):
+    return codificar_clave(reserva.fecha, reserva.hora_inicio, reserva.pk)
+
+
+def decodificar_cursor(cursor):
+    """Devuelve (fecha, hora_inicio, pk) o None si el cursor no es válido"""
+    try:
+        valor = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        fecha, hora, pk = valor.split('|')
+        return datetime.date.fromisoformat(fecha), datetime.time.fromisoformat(hora), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _posteriores(fecha, hora, pk):
+    """Filas que van después de la clave en orden descendente"""
+    return Q(fecha__lt=fecha) | Q(fecha=fecha, hora_inicio__lt=hora) | Q(fecha=fecha, hora_inicio=hora, pk__lt=pk)
+
+
+def posteriores(cursor):
+    """Q de las filas que van después del cursor en orden descendente, o None si no es válido"""
+    clave = decodificar_cursor(cursor)
+    return _posteriores(*clave) if clave else None
+
+
+def _anteriores(fecha, hora, pk):
+    return Q(fecha__gt=fecha) | Q(fecha=fecha, hora_inicio__gt=hora) | Q(fecha=fecha, hora_inicio=hora, pk__gt=pk)
+
+
+def contar_aproximado(qs):
+    """
+    Devuelve (total, exacto). Sin filtros en PostgreSQL usa la estimación
+    del planificador; en otro caso cuenta como máximo LIMITE_CONTEO filas.
+    """
+    connection = connections[qs.db]
+    if connection.vendor == 'postgresql' and not qs.query.where:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [connection.ops.quote_name(qs.model._meta.db_table)]
+            )
+            fila = cursor.fetchone()
+        if fila and fila[0] >= 0:
+            return fila[0], False
+
+    total = qs.order_by()[:LIMITE_CONTEO + 1].count()
+    return min(total, LIMITE_CONTEO), total <= LIMITE_CONTEO
+
+
+async def acontar_aproximado(qs):
+    """Como contar_aproximado(), con el ORM async"""
+    if connections[qs.db].vendor == 'postgresql' and not qs.query.where:
+        return await sync_to_async(contar_aproximado)(qs)
+    total = await qs.order_by()[:LIMITE_CONTEO + 1].acount()
+    return min(total, LIMITE_CONTEO), total <= LIMITE_CONTEO
+
+
+class PaginaKeyset:
+    """Página con la misma interfaz básica que django.core.paginator.Page"""
+
+    def __init__(self, object_list, has_next, has_previous, total=None, total_exacto=True):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.total = total
+        self.total_exacto = total_exacto
+        self.url_primera = self.url_anterior = self.url_siguiente = self.url_ultima = ''
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def cursor_siguiente(self):
+        return codificar_cursor(self.object_list[-1]) if self.object_list else None
+
+    @property
+    def cursor_anterior(self):
+        return codificar_cursor(self.object_list[0]) if self.object_list else None
+
+
+def _preparar(qs, tamano, despues, antes, ultima):
+    """Consulta de la página (tamano + 1 filas) y cómo interpretar el resultado"""
+    descendente = qs.order_by('-fecha', '-hora_inicio', '-pk')
+    ascendente = qs.order_by('fecha', 'hora_inicio', 'pk')
+
+    clave_despues = decodificar_cursor(despues) if despues else None
+    clave_antes = decodificar_cursor(antes) if antes else None
+
+    if clave_despues:
+        return descendente.filter(_posteriores(*clave_despues))[:tamano + 1], 'despues'
+    if clave_antes:
+        return ascendente.filter(_anteriores(*clave_antes))[:tamano + 1], 'antes'
+    if ultima:
+        return ascendente[:tamano + 1], 'ultima'
+    return descendente[:tamano + 1], 'primera'
+
+
+def _armar(filas, tamano, modo):
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+    if modo == 'despues':
+        return PaginaKeyset(filas, hay_mas, True)
+    if modo in ('antes', 'ultima'):
+        # Se leyó en orden ascendente
+        filas.reverse()
+        return PaginaKeyset(filas, modo == 'antes', hay_mas)
+    return PaginaKeyset(filas, hay_mas, False)
+
+
+def paginar(qs, tamano, despues=None, antes=None, ultima=False):
+    """
+    Pagina `qs` en orden (-fecha, -hora_inicio, -id).
+    `despues`/`antes` son cursores; `ultima` devuelve la última página.
+    """
+    consulta, modo = _preparar(qs, tamano, despues, antes, ultima)
+    return _armar(list(consulta), tamano, modo)
+
+
+async def apaginar(qs, tamano, despues=None, antes=None, ultima=False):
+    """Como paginar(), con el ORM async"""
+    consulta, modo = _preparar(qs, tamano, despues, antes, ultima)
+    return _armar([fila async for fila in consulta], tamano, modo)
+
+
+class KeysetPaginationMixin:
+    """
+    Para ListView: reemplaza el paginador por OFFSET. Parámetros GET:
+    `despues`, `antes`, `ultima=1` y `contar=1` (conteo aproximado).
+    """
+    paginate_by = 20
+    parametros_cursor = ('despues', 'antes', 'ultima', 'page')
+
+    def _url(self, **params):
+        query = self.request.GET.copy()
+        for nombre in self.parametros_cursor:
+            query.pop(nombre, None)
+        query.update(params)
+        return f"?{query.urlencode()}"
+
+    def _completar(self, pagina):
+        pagina.url_primera = self._url()
+        pagina.url_ultima = self._url(ultima='1')
+        if pagina.has_previous():
+            pagina.url_anterior = self._url(antes=pagina.cursor_anterior)
+        if pagina.has_next():
+            pagina.url_siguiente = self._url(despues=pagina.cursor_siguiente)
+        return None, pagina, pagina.object_list, pagina.has_other_pages()
+
+    def paginate_queryset(self, queryset, page_size):
+        if getattr(self, 'pagina_cargada', None):
+            # Ya cargada por apaginate_queryset() en una vista async
+            return self.pagina_cargada
+        get = self.request.GET
+        pagina = paginar(
+            queryset, page_size,
+            despues=get.get('despues'), antes=get.get('antes'), ultima=get.get('ultima') == '1',
+        )
+        if get.get('contar') == '1':
+            pagina.total, pagina.total_exacto = contar_aproximado(queryset)
+        return self._completar(pagina)
+
+    async def apaginate_queryset(self, queryset, page_size):
+        """Versión async: la página y el conteo se piden a la vez"""
+        get = self.request.GET
+        consultas = [apaginar(
+            queryset, page_size,
+            despues=get.get('despues'), antes=get.get('antes'), ultima=get.get('ultima') == '1',
+        )]
+        if get.get('contar') == '1':
+            consultas.append(acontar_aproximado(queryset))
+        pagina, *conteo = await asyncio.gather(*consultas)
+        if conteo:
+            pagina.total, pagina.total_exacto = conteo[0]
+        self.pagina_cargada = self._completar(pagina)
+        return self.pagina_cargada
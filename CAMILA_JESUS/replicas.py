@@ -0,0 +1,128 @@
+# CAMILA_JESUS/replicas.py
+"""
+Réplicas de lectura (DATABASE_REPLICA_URLS, ver basedatos.py).
+
+Enrutador manda las lecturas a una réplica al azar y las escrituras a
+'default'. Se leen del primario:
+
+- las consultas dentro de una transacción, como la verificación de
+  solapamiento de Reserva.clean() bajo el bloqueo de la agenda;
+- las peticiones que escriben (una sentencia INSERT/UPDATE/DELETE en el
+  primario que llega a confirmarse) y, durante DATABASE_REPLICA_RETRASO
+  segundos, las siguientes del mismo navegador (cookie que pone
+  ReplicasMiddleware): quien acaba de escribir ve lo que escribió aunque
+  la réplica vaya atrasada;
+- lo que se calcula para la caché o para los fragmentos de las listas
+  justo después de una escritura del grupo (caches.reciente): de lo
+  contrario datos atrasados quedarían guardados bajo la versión nueva;
+- el código dentro de primario().
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.backends.signals import connection_created
+
+PRIMARIO = 'default'
+COOKIE = 'camila_primario'
+
+_ESCRITURAS = ('INSERT', 'UPDATE', 'DELETE')
+
+
+class _Peticion:
+    """Estado de la petición en curso, compartido con los hilos de sync_to_async"""
+
+    def __init__(self, fijada):
+        self.fijada = fijada
+        self.escribio = False
+
+
+# Una ContextVar con un objeto mutable: lo que marca una consulta en el
+# hilo de sync_to_async se ve en la corrutina de la petición
+_peticion = ContextVar('camila_replicas_peticion', default=None)
+_primario = ContextVar('camila_replicas_primario', default=False)
+
+
+def activas():
+    return bool(settings.DATABASE_REPLICAS)
+
+
+def iniciar_peticion(fijada):
+    return _peticion.set(_Peticion(fijada))
+
+
+def terminar_peticion(token):
+    """Devuelve True si la petición escribió en la base de datos"""
+    estado = _peticion.get()
+    _peticion.reset(token)
+    return estado is not None and estado.escribio
+
+
+@contextmanager
+def primario(activar=True):
+    """Las lecturas del bloque van al primario (si `activar`)"""
+    if not activar:
+        yield
+        return
+    token = _primario.set(True)
+    try:
+        yield
+    finally:
+        _primario.reset(token)
+
+
+def _marcar_escritura(execute, sql, params, many, context):
+    estado = _peticion.get()
+    resultado = execute(sql, params, many, context)
+    if estado is not None and not estado.escribio and sql.lstrip()[:6].upper() in _ESCRITURAS:
+        connection = context['connection']
+        if connection.in_atomic_block:
+            # Lo que se revierte (un formulario inválido tras bloquear la
+            # agenda, por ejemplo) no cuenta como escritura
+            transaction.on_commit(lambda: setattr(estado, 'escribio', True), using=connection.alias)
+        else:
+            estado.escribio = True
+    return resultado
+
+
+def _instalar(connection, **kwargs):
+    if connection.alias == PRIMARIO and _marcar_escritura not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_marcar_escritura)
+
+
+connection_created.connect(_instalar)
+for _conexion in connections.all(initialized_only=True):
+    _instalar(_conexion)
+
+
+def _leer_del_primario():
+    estado = _peticion.get()
+    return (
+        _primario.get()
+        or (estado is not None and (estado.fijada or estado.escribio))
+        or connections[PRIMARIO].in_atomic_block
+    )
+
+
+class Enrutador:
+    """DATABASE_ROUTERS: lecturas a las réplicas, escrituras al primario"""
+
+    def db_for_read(self, model, **hints):
+        instancia = hints.get('instance')
+        if instancia is not None and instancia._state.db:
+            # Relaciones de un objeto: de la misma base que el objeto
+            return instancia._state.db
+        if not settings.DATABASE_REPLICAS or _leer_del_primario():
+            return PRIMARIO
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        # Elegir la base no es escribir: Reserva.clean() pide db_for_write
+        # para verificar solapamientos. La escritura la marca _marcar_escritura.
+        return PRIMARIO
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Todas las bases tienen los mismos datos
+        return True
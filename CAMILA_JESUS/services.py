@@ -0,0 +1,295 @@
+# CAMILA_JESUS/services.py
+import datetime
+import random
+import time
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, OperationalError, transaction
+
+from . import busqueda, estadisticas, notificaciones
+from .models import Reserva, bloquear_agenda
+
+# Reintentos ante bloqueos o fallos de serialización de la base de datos
+MAX_REINTENTOS = 5
+ESPERA_BASE = 0.05  # segundos
+
+# Máximo de fechas generadas por una reserva recurrente
+MAX_OCURRENCIAS = 60
+
+# Códigos SQLSTATE de PostgreSQL
+SERIALIZATION_FAILURE = '40001'
+DEADLOCK_DETECTED = '40P01'
+EXCLUSION_VIOLATION = '23P01'
+
+
+def _sqlstate(exc):
+    """Código SQLSTATE del error original del driver, si lo hay"""
+    causa = exc.__cause__
+    return getattr(causa, 'pgcode', None) or getattr(causa, 'sqlstate', None)
+
+
+def _es_reintentable(exc):
+    if _sqlstate(exc) in (SERIALIZATION_FAILURE, DEADLOCK_DETECTED):
+        return True
+    # SQLite: otro escritor mantiene el bloqueo más allá del busy_timeout
+    return 'database is locked' in str(exc)
+
+
+def guardar_reserva(reserva, reintentos=MAX_REINTENTOS):
+    """
+    Valida y guarda una reserva (nueva o existente) bajo el bloqueo de su
+    agenda, reintentando con espera exponencial si la base de datos reporta
+    un bloqueo o un fallo de serialización.
+
+    Lanza ValidationError si el horario no es válido o se solapa.
+    """
+    creando = reserva._state.adding
+
+    for intento in range(1, reintentos + 1):
+        try:
+            reserva.guardar_validado()
+            return reserva
+        except IntegrityError as e:
+            # La restricción de exclusión de PostgreSQL es la última barrera
+            if _sqlstate(e) == EXCLUSION_VIOLATION:
+                raise ValidationError(
+                    f"Ya existe una reserva en {reserva.laboratorio.nombre} que se solapa con este horario."
+                )
+            raise
+        except OperationalError as e:
+            if not _es_reintentable(e) or intento == reintentos:
+                raise
+            if creando:
+                # La transacción se revirtió: el INSERT debe repetirse
+                reserva.pk = None
+                reserva._state.adding = True
+            time.sleep(ESPERA_BASE * (2 ** (intento - 1)) * random.uniform(0.5, 1.5))
+
+
+def crear_reserva(reserva, docente):
+    """Registra una reserva nueva del docente en estado Pendiente"""
+    reserva.docente = docente
+    reserva.estado = 'Pendiente'
+    return guardar_reserva(reserva)
+
+
+def generar_fechas(desde, hasta, cada_semanas=1):
+    """Fechas desde `desde` hasta `hasta` (inclusive) cada `cada_semanas` semanas"""
+    paso = datetime.timedelta(weeks=cada_semanas)
+    fechas = []
+    fecha = desde
+    while fecha <= hasta:
+        fechas.append(fecha)
+        fecha += paso
+    return fechas
+
+
+def se_solapa(inicio, fin, ocupados):
+    """True si [inicio, fin) se solapa con alguno de los intervalos (inicio, fin)"""
+    return any(inicio < f and i < fin for i, f in ocupados)
+
+
+def crear_reservas_recurrentes(docente, laboratorio, fechas, hora_inicio, hora_fin, motivo):
+    """
+    Crea una reserva Pendiente por cada fecha libre. Las reservas existentes
+    se cargan con una sola consulta sobre el rango y el solapamiento se
+    verifica en memoria; las aceptadas se insertan con bulk_create en una
+    sola transacción.
+
+    Devuelve (creadas, conflictos) donde conflictos es una lista de
+    (fecha, mensaje).
+    """
+    if hora_inicio >= hora_fin:
+        raise ValidationError("La hora de inicio debe ser anterior a la hora de fin.")
+    if not fechas:
+        return [], []
+
+    with transaction.atomic():
+        for fecha in fechas:
+            bloquear_agenda(laboratorio.pk, fecha)
+
+        ocupados = {}
+        for fecha, inicio, fin in (
+            Reserva.objects.filter(laboratorio=laboratorio, fecha__range=(min(fechas), max(fechas)))
+            .exclude(estado='Cancelada')
+            .values_list('fecha', 'hora_inicio', 'hora_fin')
+        ):
+            ocupados.setdefault(fecha, []).append((inicio, fin))
+
+        nuevas, conflictos = [], []
+        for fecha in fechas:
+            if se_solapa(hora_inicio, hora_fin, ocupados.get(fecha, [])):
+                conflictos.append((fecha, f"Ya existe una reserva en {laboratorio.nombre} que se solapa con este horario."))
+                continue
+            nuevas.append(Reserva(
+                docente=docente, laboratorio=laboratorio, fecha=fecha,
+                hora_inicio=hora_inicio, hora_fin=hora_fin, motivo=motivo, estado='Pendiente',
+            ))
+            # Fechas repetidas en la lista también cuentan como conflicto
+            ocupados.setdefault(fecha, []).append((hora_inicio, hora_fin))
+
+        creadas = Reserva.objects.bulk_create(nuevas)
+        # bulk_create no dispara señales
+        estadisticas.registrar_creadas(creadas)
+        busqueda.indexar_reservas(creadas)
+
+    return creadas, conflictos
+
+
+def crear_reservas(docente, reservas):
+    """
+    Registra varias reservas nuevas del docente (Reserva sin guardar con
+    laboratorio, fecha, horas y motivo) en estado Pendiente, con las reglas
+    de Reserva.clean() y en una sola transacción: las agendas afectadas se
+    bloquean en orden, sus reservas activas se cargan con una consulta y el
+    solapamiento se verifica en memoria, también entre las del mismo lote.
+
+    Devuelve (creadas, errores) donde errores es un dict {índice: mensaje}
+    con las posiciones de `reservas` que no se crearon.
+    """
+    errores = {}
+    validas = []
+    for i, reserva in enumerate(reservas):
+        if reserva.hora_inicio >= reserva.hora_fin:
+            errores[i] = "La hora de inicio debe ser anterior a la hora de fin."
+        else:
+            validas.append((i, reserva))
+    if not validas:
+        return [], errores
+
+    agendas = sorted({(r.laboratorio_id, r.fecha) for _, r in validas})
+    with transaction.atomic():
+        # Orden fijo de bloqueo para no provocar interbloqueos
+        for laboratorio_id, fecha in agendas:
+            bloquear_agenda(laboratorio_id, fecha)
+
+        ocupados = {agenda: [] for agenda in agendas}
+        for lab_id, fecha, inicio, fin in (
+            Reserva.objects.filter(
+                laboratorio_id__in={lab for lab, _ in agendas}, fecha__in={fecha for _, fecha in agendas},
+            ).exclude(estado='Cancelada').values_list('laboratorio_id', 'fecha', 'hora_inicio', 'hora_fin')
+        ):
+            if (lab_id, fecha) in ocupados:
+                ocupados[(lab_id, fecha)].append((inicio, fin))
+
+        nuevas = []
+        for i, reserva in validas:
+            agenda = (reserva.laboratorio_id, reserva.fecha)
+            if se_solapa(reserva.hora_inicio, reserva.hora_fin, ocupados[agenda]):
+                errores[i] = f"Ya existe una reserva en {reserva.laboratorio.nombre} que se solapa con este horario."
+                continue
+            ocupados[agenda].append((reserva.hora_inicio, reserva.hora_fin))
+            reserva.docente = docente
+            reserva.estado = 'Pendiente'
+            nuevas.append(reserva)
+
+        creadas = Reserva.objects.bulk_create(nuevas)
+        # bulk_create no dispara señales
+        estadisticas.registrar_creadas(creadas)
+        busqueda.indexar_reservas(creadas)
+
+    return creadas, errores
+
+
+TRANSICIONES = {
+    'aprobar': 'Aprobada',
+    'rechazar': 'Rechazada',
+}
+NO_EXISTE = "La reserva no existe."
+
+
+def _con_solapamiento(intervalos):
+    """
+    pks de los intervalos (inicio, fin, pk) que se solapan con algún otro.
+    Un solo recorrido sobre la lista ordenada por inicio: un intervalo se
+    solapa si empieza antes del mayor fin previo o si el siguiente empieza
+    antes de su fin.
+    """
+    intervalos = sorted(intervalos)
+    solapados = set()
+    fin_maximo = None
+    for i, (inicio, fin, pk) in enumerate(intervalos):
+        if fin_maximo is not None and inicio < fin_maximo:
+            solapados.add(pk)
+        if i + 1 < len(intervalos) and intervalos[i + 1][0] < fin:
+            solapados.add(pk)
+        fin_maximo = fin if fin_maximo is None else max(fin_maximo, fin)
+    return solapados
+
+
+def cambiar_estado_lote(pks, accion):
+    """
+    Aprueba o rechaza varias reservas Pendientes en una sola transacción,
+    con las mismas reglas que Reserva.clean(): una reserva no se aprueba si
+    se solapa con otra reserva activa, ya sea existente o del mismo lote.
+
+    Devuelve (actualizadas, errores): la lista de pks cambiados y un dict
+    {pk: mensaje} con las reservas que no se pudieron cambiar.
+    """
+    nuevo_estado = TRANSICIONES[accion]
+    pks = set(pks)
+
+    with transaction.atomic():
+        filas = {
+            fila[0]: fila for fila in Reserva.objects.filter(pk__in=pks).order_by().values_list(
+                'pk', 'laboratorio_id', 'fecha', 'docente_id',
+                # Para la notificación
+                'laboratorio__nombre', 'motivo',
+            )
+        }
+        claves = {fila[1:3] for fila in filas.values()}
+        # Orden fijo de bloqueo para no provocar interbloqueos entre lotes
+        for laboratorio_id, fecha in sorted(claves):
+            bloquear_agenda(laboratorio_id, fecha)
+
+        # Ya bajo bloqueo, en una consulta: todas las reservas activas de las
+        # agendas, con el estado y el horario vigentes de las del lote
+        por_agenda, vigentes = {}, {}
+        for pk, lab_id, fecha, inicio, fin, estado in (
+            Reserva.objects.filter(
+                laboratorio_id__in={c[0] for c in claves}, fecha__in={c[1] for c in claves},
+            ).exclude(estado='Cancelada').order_by().values_list('pk', 'laboratorio_id', 'fecha', 'hora_inicio', 'hora_fin', 'estado')
+        ):
+            if (lab_id, fecha) in claves:
+                por_agenda.setdefault((lab_id, fecha), []).append((inicio, fin, pk))
+                if pk in filas:
+                    vigentes[pk] = (lab_id, fecha, inicio, fin, estado)
+
+        errores = {pk: NO_EXISTE for pk in pks - filas.keys()}
+        candidatas = set()
+        for pk in filas:
+            # Sin fila vigente: se canceló mientras tanto
+            if pk not in vigentes or vigentes[pk][4] != 'Pendiente':
+                errores[pk] = f"Solo se pueden {accion} reservas en estado Pendiente."
+            else:
+                candidatas.add(pk)
+
+        if nuevo_estado == 'Aprobada' and candidatas:
+            for intervalos in por_agenda.values():
+                for pk in _con_solapamiento(intervalos) & candidatas:
+                    errores[pk] = "Se solapa con otra reserva activa en el mismo laboratorio."
+                    candidatas.discard(pk)
+
+        if candidatas:
+            estadisticas.cambiar_estado_filas(
+                [(pk, vigentes[pk][1], vigentes[pk][0], filas[pk][3], 'Pendiente') for pk in candidatas], nuevo_estado,
+            )
+            notificaciones.registrar(
+                (filas[pk][3], pk, nuevo_estado, notificaciones.datos_reserva(filas[pk][4], *vigentes[pk][1:4], filas[pk][5]))
+                for pk in sorted(candidatas)
+            )
+
+    return sorted(candidatas), errores
+
+
+def cancelar_reserva(reserva):
+    """Cancela una reserva y encola la notificación en la misma transacción"""
+    with transaction.atomic():
+        reserva.estado = 'Cancelada'
+        reserva.save(update_fields=['estado', 'fecha_modificacion'])
+        notificaciones.registrar([(
+            reserva.docente_id, reserva.pk, 'Cancelada', notificaciones.datos_reserva(
+                reserva.laboratorio.nombre, reserva.fecha, reserva.hora_inicio, reserva.hora_fin, reserva.motivo,
+            ),
+        )])
+    return reserva
@@ -0,0 +1,109 @@
+# CAMILA_JESUS/signals.py
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import busqueda, calendario, caches, estadisticas
+from .models import VERSION_LABORATORIOS, VERSION_RESERVAS, Laboratorio, Reserva, VersionDatos
+
+
+@receiver(pre_save, sender=Reserva)
+def recordar_clave_anterior(sender, instance, raw, **kwargs):
+    if raw or instance.pk is None:
+        return
+    anterior = getattr(instance, '_clave_original', None)
+    if anterior is None:
+        fila = Reserva.objects.filter(pk=instance.pk).values_list(
+            'fecha', 'laboratorio_id', 'docente_id', 'estado'
+        ).first()
+        anterior = tuple(fila) if fila else None
+    instance._clave_anterior = anterior
+
+
+@receiver(post_save, sender=Reserva)
+def actualizar_estadisticas(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    nueva = instance.clave_estadistica()
+    anterior = None if created else instance.__dict__.pop('_clave_anterior', None)
+    if anterior != nueva:
+        deltas = {nueva: 1}
+        if anterior:
+            deltas[anterior] = -1
+        estadisticas.ajustar_varios(deltas)
+    instance._clave_original = nueva
+    VersionDatos.incrementar(VERSION_RESERVAS)
+    caches.invalidar_reservas(
+        [instance.docente_id] + ([anterior[2]] if anterior else []),
+        [instance.laboratorio_id] + ([anterior[1]] if anterior else []),
+    )
+    if anterior and anterior[1:3] != nueva[1:3]:
+        # La consulta incremental de su feed anterior ya no la vería
+        calendario.olvidar(laboratorio_id=anterior[1], docente_id=anterior[2])
+
+
+@receiver(post_save, sender=Reserva)
+def indexar_texto(sender, instance, created, raw, **kwargs):
+    if raw:
+        return
+    clave = instance.clave_busqueda()
+    if created or getattr(instance, '_texto_original', None) != clave:
+        busqueda.indexar_reservas([instance])
+        instance._texto_original = clave
+
+
+@receiver(post_delete, sender=Reserva)
+def descontar_estadisticas(sender, instance, **kwargs):
+    estadisticas.ajustar(getattr(instance, '_clave_original', None) or instance.clave_estadistica(), -1)
+    VersionDatos.incrementar(VERSION_RESERVAS)
+    caches.invalidar_reservas([instance.docente_id], [instance.laboratorio_id])
+    calendario.olvidar(laboratorio_id=instance.laboratorio_id, docente_id=instance.docente_id)
+
+
+@receiver(post_save, sender=Laboratorio)
+@receiver(post_delete, sender=Laboratorio)
+def incrementar_version_laboratorios(sender, raw=False, **kwargs):
+    if not raw:
+        VersionDatos.incrementar(VERSION_LABORATORIOS)
+        caches.invalidar(caches.GRUPO_LABORATORIOS)
+
+
+@receiver(pre_save, sender=Laboratorio)
+def recordar_nombre_anterior(sender, instance, raw, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._nombre_anterior = Laboratorio.objects.filter(pk=instance.pk).values_list('nombre', flat=True).first()
+
+
+@receiver(post_save, sender=Laboratorio)
+def reindexar_laboratorio(sender, instance, created, raw, **kwargs):
+    # Solo si cambió el nombre: es lo único que muestran índice y feeds
+    if raw or created or instance.__dict__.pop('_nombre_anterior', None) == instance.nombre:
+        return
+    busqueda.indexar(Reserva.objects.filter(laboratorio=instance))
+    # El nombre aparece en los eventos de los feeds y en el título del suyo
+    calendario.tocar(Reserva.objects.filter(laboratorio=instance))
+    calendario.olvidar(laboratorio_id=instance.pk)
+
+
+# Campos del docente que aparecen en el índice de búsqueda y en los feeds
+CAMPOS_DOCENTE = ('username', 'first_name', 'last_name')
+
+
+@receiver(pre_save, sender=User)
+def recordar_nombres_anteriores(sender, instance, raw, update_fields, **kwargs):
+    # El login guarda solo last_login: ni se consulta
+    if raw or instance.pk is None or (update_fields is not None and not set(CAMPOS_DOCENTE) & set(update_fields)):
+        return
+    instance._nombres_anteriores = User.objects.filter(pk=instance.pk).values_list(*CAMPOS_DOCENTE).first()
+
+
+@receiver(post_save, sender=User)
+def reindexar_docente(sender, instance, created, raw, **kwargs):
+    anteriores = instance.__dict__.pop('_nombres_anteriores', None)
+    # Contraseña, permisos, last_login...: nada que reindexar
+    if raw or created or anteriores is None or tuple(anteriores) == tuple(getattr(instance, c) for c in CAMPOS_DOCENTE):
+        return
+    busqueda.indexar(Reserva.objects.filter(docente=instance))
+    calendario.tocar(Reserva.objects.filter(docente=instance))
+    calendario.olvidar(docente_id=instance.pk)
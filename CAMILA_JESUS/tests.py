@@ -1,3 +1,1528 @@
-from django.test import TestCase
+import atexit
+import copy
+import datetime
+import gzip
+import shutil
+import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from PROYECTO_CAMILA_JESUS import basedatos
+
+from . import (
+    api, archivo, busqueda, caches, calendario, exportaciones, importaciones, metricas, notificaciones, ocupacion, replicas,
+    services,
+)
+from .estadisticas import cambiar_estado_masivo, reconstruir
+from .models import (
+    VERSION_RESERVAS, EstadisticaDiaria, Exportacion, IndiceBusqueda, Laboratorio, Notificacion, Reserva,
+    ReservaArchivada, VersionDatos,
+)
+
+# Las peticiones de todas las pruebas pasan por MetricasMiddleware: sus
+# volcados van a un archivo temporal, nunca al metricas.sqlite3 real
+_METRICAS = tempfile.mkdtemp(prefix='camila-metricas-')
+atexit.register(shutil.rmtree, _METRICAS, ignore_errors=True)
+override_settings(METRICAS_DB=f"{_METRICAS}/metricas.sqlite3").enable()
+# Ni la caché real (archivos en BASE_DIR/cache): cache.clear() la vaciaría
+# y las versiones y fragmentos de las pruebas quedarían para la aplicación
+override_settings(CACHES={'default': {
+    **settings.CACHES['default'], 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'camila-pruebas',
+}}).enable()
+
+
+def crear_reserva(docente, laboratorio, inicio, fin, fecha=datetime.date(2026, 3, 2), estado='Pendiente'):
+    return Reserva.objects.create(
+        docente=docente,
+        laboratorio=laboratorio,
+        fecha=fecha,
+        hora_inicio=datetime.time(*inicio),
+        hora_fin=datetime.time(*fin),
+        motivo='Práctica',
+        estado=estado,
+    )
+
+
+class ReservaConflictosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Química')
+
+    def test_guardar_validado_rechaza_solapamiento(self):
+        crear_reserva(self.docente, self.lab, (8, 0), (10, 0))
+        nueva = Reserva(
+            docente=self.docente, laboratorio=self.lab, fecha=datetime.date(2026, 3, 2),
+            hora_inicio=datetime.time(9, 0), hora_fin=datetime.time(11, 0), motivo='Otra',
+        )
+        with self.assertRaises(ValidationError):
+            nueva.guardar_validado()
+        self.assertEqual(Reserva.objects.count(), 1)
+
+    def test_guardar_validado_ignora_canceladas(self):
+        crear_reserva(self.docente, self.lab, (8, 0), (10, 0), estado='Cancelada')
+        nueva = Reserva(
+            docente=self.docente, laboratorio=self.lab, fecha=datetime.date(2026, 3, 2),
+            hora_inicio=datetime.time(8, 0), hora_fin=datetime.time(10, 0), motivo='Otra',
+        )
+        nueva.guardar_validado()
+        self.assertEqual(Reserva.objects.count(), 2)
+
+    def test_indice_de_agenda_existe(self):
+        with connection.cursor() as cursor:
+            restricciones = connection.introspection.get_constraints(cursor, Reserva._meta.db_table)
+        self.assertIn('reserva_agenda_activa_idx', restricciones)
+
+
+class GuardarReservaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Física')
+
+    def nueva_reserva(self):
+        return Reserva(
+            laboratorio=self.lab, fecha=datetime.date(2026, 3, 2),
+            hora_inicio=datetime.time(8, 0), hora_fin=datetime.time(9, 0), motivo='Práctica',
+        )
+
+    @mock.patch('CAMILA_JESUS.services.time.sleep')
+    def test_reintenta_si_la_base_esta_bloqueada(self, _sleep):
+        original = Reserva.guardar_validado
+        llamadas = []
+
+        def bloqueada_una_vez(reserva, *args, **kwargs):
+            llamadas.append(reserva.pk)
+            if len(llamadas) == 1:
+                raise OperationalError('database is locked')
+            return original(reserva, *args, **kwargs)
+
+        with mock.patch.object(Reserva, 'guardar_validado', bloqueada_una_vez):
+            reserva = services.crear_reserva(self.nueva_reserva(), self.docente)
+
+        self.assertEqual(len(llamadas), 2)
+        self.assertEqual(reserva.estado, 'Pendiente')
+        self.assertEqual(Reserva.objects.count(), 1)
+
+    @mock.patch('CAMILA_JESUS.services.time.sleep')
+    def test_agota_reintentos(self, _sleep):
+        with mock.patch.object(Reserva, 'guardar_validado', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                services.crear_reserva(self.nueva_reserva(), self.docente)
+        self.assertEqual(_sleep.call_count, services.MAX_REINTENTOS - 1)
+
+    @mock.patch('CAMILA_JESUS.services.time.sleep')
+    def test_admin_de_django_reintenta_y_avisa_solapamientos(self, _sleep):
+        admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True, is_superuser=True)
+        self.client.force_login(admin)
+        datos = {
+            'docente': self.docente.pk, 'laboratorio': self.lab.pk, 'estado': 'Pendiente',
+            'fecha': '2026-03-02', 'hora_inicio': '08:00', 'hora_fin': '09:00', 'motivo': 'Práctica',
+        }
+        original = Reserva.guardar_validado
+        llamadas = []
+
+        def bloqueada_una_vez(reserva, *args, **kwargs):
+            llamadas.append(reserva.pk)
+            if len(llamadas) == 1:
+                raise OperationalError('database is locked')
+            return original(reserva, *args, **kwargs)
+
+        url = reverse('admin:CAMILA_JESUS_reserva_add')
+        with mock.patch.object(Reserva, 'guardar_validado', bloqueada_una_vez):
+            self.client.post(url, datos)
+        self.assertEqual(len(llamadas), 2)
+        self.assertEqual(Reserva.objects.count(), 1)
+
+        # Un solapamiento que aparece al guardar (p. ej. 23P01) se avisa, no es un 500
+        solapada = ValidationError('Ya existe una reserva en Física que se solapa con este horario.')
+        with mock.patch.object(Reserva, 'guardar_validado', side_effect=solapada):
+            response = self.client.post(url, {**datos, 'hora_inicio': '10:00', 'hora_fin': '11:00'}, follow=True)
+        self.assertEqual(Reserva.objects.count(), 1)
+        self.assertTrue(any('se solapa' in str(m) for m in response.context['messages']))
+
+
+class DashboardConsultasTests(TestCase):
+    """Cada dashboard debe costar un número fijo de consultas, sin importar el volumen"""
+
+    def setUp(self):
+        cache.clear()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        labs = [Laboratorio.objects.create(nombre=f'Lab {i}') for i in range(3)]
+        for i, estado in enumerate(['Pendiente', 'Aprobada', 'Rechazada', 'Cancelada'] * 3):
+            crear_reserva(cls.docente, labs[i % 3], (7 + i, 0), (7 + i, 30), estado=estado)
+
+    def test_estadisticas_del_manager(self):
+        stats = Reserva.objects.estadisticas()
+        self.assertEqual(stats, {
+            'total': 12, 'pendientes': 3, 'aprobadas': 3, 'rechazadas': 3, 'canceladas': 3,
+        })
+
+    def test_consultas_dashboard_docente(self):
+        self.client.force_login(self.docente)
+        # sesión + usuario + estadísticas + reservas recientes
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('camila:docente_dashboard'))
+        self.assertEqual(response.context['total_reservas'], 12)
+        self.assertEqual(response.context['pendientes'], 3)
+
+    def test_consultas_dashboard_admin(self):
+        self.client.force_login(self.admin)
+        # sesión + usuario + estadísticas + reservas pendientes
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('camila:admin_dashboard'))
+        self.assertEqual(response.context['aprobadas'], 3)
+
+
+class EstadisticaDiariaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Biología')
+
+    def resumen(self):
+        return {
+            (e.fecha, e.laboratorio_id, e.docente_id, e.estado): e.total
+            for e in EstadisticaDiaria.objects.filter(total__gt=0)
+        }
+
+    def test_senales_mantienen_el_resumen(self):
+        r1 = crear_reserva(self.docente, self.lab, (8, 0), (9, 0))
+        r2 = crear_reserva(self.docente, self.lab, (9, 0), (10, 0))
+        fecha = r1.fecha
+        self.assertEqual(self.resumen(), {(fecha, self.lab.pk, self.docente.pk, 'Pendiente'): 2})
+
+        r1.estado = 'Aprobada'
+        r1.save()
+        Reserva.objects.get(pk=r2.pk).delete()
+        self.assertEqual(self.resumen(), {(fecha, self.lab.pk, self.docente.pk, 'Aprobada'): 1})
+
+    def test_cambio_masivo_y_reconstruccion(self):
+        for h in range(8, 12):
+            crear_reserva(self.docente, self.lab, (h, 0), (h, 30))
+        actualizadas = cambiar_estado_masivo(Reserva.objects.filter(hora_inicio__lt=datetime.time(10, 0)), 'Rechazada')
+        self.assertEqual(actualizadas, 2)
+
+        antes = self.resumen()
+        self.assertEqual(sorted(antes.values()), [2, 2])
+        call_command('reconstruir_estadisticas', stdout=StringIO())
+        self.assertEqual(self.resumen(), antes)
+
+
+class ExportarCSVTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.ana = User.objects.create_user('ana', password='clave-segura-123')
+        cls.luis = User.objects.create_user('luis', password='clave-segura-123')
+        lab = Laboratorio.objects.create(nombre='Redes')
+        crear_reserva(cls.ana, lab, (8, 0), (9, 0))
+        crear_reserva(cls.luis, lab, (9, 0), (10, 0))
+
+    def exportar(self, **params):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('camila:admin_export_csv'), params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_exporta_todas(self):
+        lineas = self.exportar()
+        self.assertEqual(lineas[0].split(',')[:3], ['ID', 'Docente', 'Laboratorio'])
+        self.assertEqual(len(lineas), 3)
+
+    def test_filtra_por_docente(self):
+        lineas = self.exportar(docente='ana')
+        self.assertEqual(len(lineas), 2)
+        self.assertIn(',ana,Redes,2026-03-02,08:00:00,09:00:00,Pendiente,', lineas[1])
+
+
+class ExportacionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Electrónica')
+        crear_reserva(cls.docente, cls.lab, (8, 0), (9, 0))
+
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = self.settings(EXPORTACIONES_DIR=directorio.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def test_procesa_y_reutiliza_hasta_nueva_escritura(self):
+        exportacion, reutilizada = exportaciones.solicitar(self.admin, {'estado': 'Pendiente', 'page': '2'})
+        self.assertFalse(reutilizada)
+        self.assertEqual(exportacion.filtros, {'estado': 'Pendiente'})
+
+        call_command('procesar_exportaciones', '--una-vez', stdout=StringIO())
+        exportacion.refresh_from_db()
+        self.assertEqual(exportacion.estado, 'Completada')
+        self.assertEqual(exportacion.filas, 1)
+        with gzip.open(exportacion.archivo, 'rt', encoding='utf-8') as f:
+            self.assertEqual(len(f.read().splitlines()), 2)
+
+        misma, reutilizada = exportaciones.solicitar(self.admin, {'estado': 'Pendiente'})
+        self.assertTrue(reutilizada)
+        self.assertEqual(misma.pk, exportacion.pk)
+
+        crear_reserva(self.docente, self.lab, (9, 0), (10, 0))
+        nueva, reutilizada = exportaciones.solicitar(self.admin, {'estado': 'Pendiente'})
+        self.assertFalse(reutilizada)
+
+    def test_exportacion_abandonada_se_vuelve_a_tomar(self):
+        exportacion, _ = exportaciones.solicitar(self.admin, {})
+        self.assertEqual(exportaciones.tomar_siguiente().pk, exportacion.pk)
+        # El worker muere: mientras el reclamo esté vigente nadie más la toma
+        self.assertIsNone(exportaciones.tomar_siguiente())
+        Exportacion.objects.filter(pk=exportacion.pk).update(
+            fecha_inicio=timezone.now() - datetime.timedelta(seconds=exportaciones.DURACION_RECLAMO + 1),
+        )
+        misma, reutilizada = exportaciones.solicitar(self.admin, {})
+        self.assertTrue(reutilizada)
+        call_command('procesar_exportaciones', '--una-vez', stdout=StringIO())
+        misma.refresh_from_db()
+        self.assertEqual((misma.pk, misma.estado), (exportacion.pk, 'Completada'))
+
+    def test_descarga(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse('camila:admin_exportacion_crear'), {'laboratorio': self.lab.pk})
+        call_command('procesar_exportaciones', '--una-vez', stdout=StringIO())
+        exportacion = Exportacion.objects.get()
+        response = self.client.get(reverse('camila:admin_exportacion_descargar', args=[exportacion.pk]))
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(len(gzip.decompress(b''.join(response.streaming_content)).splitlines()), 2)
+
+
+class PaginacionKeysetTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        docente = User.objects.create_user('docente', password='clave-segura-123')
+        lab = Laboratorio.objects.create(nombre='Cómputo')
+        for dia in range(1, 26):
+            crear_reserva(docente, lab, (8, 0), (9, 0), fecha=datetime.date(2026, 3, dia))
+        cls.orden = list(Reserva.objects.order_by('-fecha', '-hora_inicio', '-id').values_list('pk', flat=True))
+
+    def pagina(self, url):
+        self.client.force_login(self.admin)
+        return self.client.get(reverse('camila:admin_reserva_list') + url).context['page_obj']
+
+    def test_recorre_todas_las_paginas_sin_contar(self):
+        primera = self.pagina('')
+        self.assertEqual([r.pk for r in primera], self.orden[:20])
+        self.assertFalse(primera.has_previous())
+
+        segunda = self.pagina(primera.url_siguiente)
+        self.assertEqual([r.pk for r in segunda], self.orden[20:])
+        self.assertFalse(segunda.has_next())
+        self.assertIsNone(segunda.total)
+
+        anterior = self.pagina(segunda.url_anterior)
+        self.assertEqual([r.pk for r in anterior], self.orden[:20])
+
+    def test_ultima_pagina_y_conteo(self):
+        ultima = self.pagina('?ultima=1&contar=1')
+        self.assertEqual([r.pk for r in ultima], self.orden[-20:])
+        self.assertEqual((ultima.total, ultima.total_exacto), (25, True))
+
+    def test_cursor_invalido_vuelve_al_inicio(self):
+        self.assertEqual([r.pk for r in self.pagina('?despues=basura')], self.orden[:20])
+
+
+class DisponibilidadTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Óptica')
+        crear_reserva(cls.docente, cls.lab, (8, 0), (10, 0))
+        crear_reserva(cls.docente, cls.lab, (9, 0), (11, 0), estado='Aprobada')
+        crear_reserva(cls.docente, cls.lab, (13, 0), (14, 0), estado='Cancelada')
+
+    def setUp(self):
+        self.client.force_login(self.docente)
+        self.url = reverse('camila:disponibilidad') + f'?laboratorio={self.lab.pk}&desde=2026-03-02&hasta=2026-03-03'
+
+    def test_intervalos_libres_y_ocupados(self):
+        datos = self.client.get(self.url).json()
+        dias = datos['laboratorios'][0]['dias']
+        self.assertEqual(len(dias), 2)
+        self.assertEqual(dias[0]['ocupado'], [['08:00', '10:00', 'Pendiente'], ['09:00', '11:00', 'Aprobada']])
+        self.assertEqual(dias[0]['libre'], [['07:00', '08:00'], ['11:00', '21:00']])
+        self.assertEqual(dias[1]['libre'], [['07:00', '21:00']])
+
+    def test_etag_devuelve_304_hasta_que_cambian_las_reservas(self):
+        response = self.client.get(self.url)
+        etag = response['ETag']
+        self.assertIn('max-age=60', response['Cache-Control'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        crear_reserva(self.docente, self.lab, (15, 0), (16, 0))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_etag_sin_fechas_cambia_con_el_dia(self):
+        url = reverse('camila:disponibilidad')
+        with mock.patch('django.utils.timezone.localdate', return_value=datetime.date(2026, 3, 2)):
+            etag = self.client.get(url)['ETag']
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('django.utils.timezone.localdate', return_value=datetime.date(2026, 3, 3)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['laboratorios'][0]['dias'][0]['fecha'], '2026-03-03')
+
+    def test_rango_invalido(self):
+        url = reverse('camila:disponibilidad') + '?desde=2026-03-05&hasta=2026-03-01'
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+
+class ReservaRecurrenteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Mecánica')
+        # Ocupa el tercer lunes del rango
+        crear_reserva(cls.docente, cls.lab, (9, 0), (11, 0), fecha=datetime.date(2026, 3, 16), estado='Aprobada')
+
+    def test_crea_las_libres_y_reporta_conflictos(self):
+        self.client.force_login(self.docente)
+        with CaptureQueriesContext(connection) as consultas:
+            response = self.client.post(reverse('camila:docente_reserva_recurrente'), {
+                'laboratorio': self.lab.pk, 'fecha_inicio': '2026-03-02', 'fecha_fin': '2026-03-30',
+                'frecuencia': 1, 'hora_inicio': '10:00', 'hora_fin': '12:00', 'motivo': 'Curso semestral',
+            })
+        sobre_reservas = [q['sql'] for q in consultas if '"CAMILA_JESUS_reserva"' in q['sql'].split(' WHERE ')[0]]
+        # Una consulta de conflictos para todo el rango y un único INSERT
+        self.assertEqual([sql.split()[0] for sql in sobre_reservas], ['SELECT', 'INSERT'])
+        resultado = response.context['resultado']
+        self.assertEqual([r['creada'] for r in resultado], [True, True, False, True, True])
+        self.assertEqual(Reserva.objects.filter(estado='Pendiente').count(), 4)
+        self.assertEqual(Reserva.objects.estadisticas()['pendientes'], 4)
+        self.assertEqual(EstadisticaDiaria.objects.filter(estado='Pendiente').count(), 4)
+
+    def test_quincenal(self):
+        fechas = services.generar_fechas(datetime.date(2026, 3, 2), datetime.date(2026, 3, 30), 2)
+        self.assertEqual([f.day for f in fechas], [2, 16, 30])
+
+
+class CambioEstadoLoteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Suelos')
+
+    def test_detecta_solapamientos_del_lote_y_existentes(self):
+        libre = crear_reserva(self.docente, self.lab, (7, 0), (8, 0))
+        # Dos pendientes solapadas entre sí (creadas saltando la validación)
+        a = crear_reserva(self.docente, self.lab, (9, 0), (11, 0))
+        b = crear_reserva(self.docente, self.lab, (10, 0), (12, 0))
+        aprobada = crear_reserva(self.docente, self.lab, (13, 0), (14, 0), estado='Aprobada')
+
+        actualizadas, errores = services.cambiar_estado_lote([libre.pk, a.pk, b.pk, aprobada.pk], 'aprobar')
+
+        self.assertEqual(actualizadas, [libre.pk])
+        self.assertEqual(set(errores), {a.pk, b.pk, aprobada.pk})
+        self.assertIn('Pendiente', errores[aprobada.pk])
+        self.assertEqual(Reserva.objects.get(pk=libre.pk).estado, 'Aprobada')
+        self.assertEqual(Reserva.objects.get(pk=a.pk).estado, 'Pendiente')
+        self.assertEqual(EstadisticaDiaria.objects.get(estado='Aprobada').total, 2)
+
+    def test_consultas_constantes_por_lote(self):
+        pks = [
+            crear_reserva(self.docente, self.lab, (7 + h, 0), (7 + h, 30), fecha=datetime.date(2026, 3, d)).pk
+            for d in range(2, 4) for h in range(10)
+        ]
+        with CaptureQueriesContext(connection) as consultas:
+            actualizadas, errores = services.cambiar_estado_lote(pks, 'aprobar')
+        self.assertEqual((len(actualizadas), errores), (20, {}))
+        lecturas = [q for q in consultas if q['sql'].startswith('SELECT') and '"CAMILA_JESUS_reserva"' in q['sql']]
+        self.assertLessEqual(len(lecturas), 5)
+
+    def test_vista_de_lote(self):
+        r = crear_reserva(self.docente, self.lab, (8, 0), (9, 0))
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('camila:admin_cambiar_estado_lote'), {
+            'accion': 'rechazar', 'reservas': [r.pk], 'siguiente': '?estado=Pendiente',
+        })
+        self.assertRedirects(response, reverse('camila:admin_reserva_list') + '?estado=Pendiente')
+        self.assertEqual(Reserva.objects.get(pk=r.pk).estado, 'Rechazada')
+
+
+class CacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Geología')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.docente)
+
+    def test_dashboard_docente_cacheado_e_invalidado(self):
+        url = reverse('camila:docente_dashboard')
+        self.client.get(url)
+        # sesión + usuario + reservas recientes; las estadísticas salen de la caché
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(response.context['total_reservas'], 0)
+
+        crear_reserva(self.docente, self.lab, (8, 0), (9, 0))
+        self.assertEqual(self.client.get(url).context['total_reservas'], 1)
+
+    def test_laboratorios_invalidados_por_senal(self):
+        self.assertEqual([lab.nombre for lab in caches.laboratorios()], ['Geología'])
+        with self.assertNumQueries(0):
+            caches.laboratorios()
+        Laboratorio.objects.create(nombre='Astronomía')
+        self.assertEqual([lab.nombre for lab in caches.laboratorios()], ['Astronomía', 'Geología'])
+
+    def test_metricas_y_senal(self):
+        recibidas = []
+
+        def receptor(sender, nombre, acierto, **kwargs):
+            recibidas.append((nombre, acierto))
+
+        caches.consulta_cache.connect(receptor)
+        self.addCleanup(caches.consulta_cache.disconnect, receptor)
+        caches.laboratorios()
+        caches.laboratorios()
+        self.assertEqual(recibidas, [('laboratorios', False), ('laboratorios', True)])
+        self.assertGreaterEqual(caches.metricas()[('laboratorios', 'hit')], 1)
+
+
+class ConsultasPorVistaTests(TestCase):
+    """
+    Número de consultas de cada vista de docente y de administración, con
+    la caché vacía. Una regresión (N+1, objeto cargado dos veces...) cambia
+    estos números.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        labs = [Laboratorio.objects.create(nombre=f'Lab {i}') for i in range(3)]
+        for i in range(30):
+            crear_reserva(cls.docente, labs[i % 3], (7 + i % 10, 0), (7 + i % 10, 30),
+                          fecha=datetime.date(2026, 3, 1 + i // 10))
+        cls.reserva = Reserva.objects.filter(docente=cls.docente).first()
+
+    def setUp(self):
+        cache.clear()
+
+    def assertConsultas(self, usuario, n, metodo, nombre, *args, datos=None):
+        self.client.force_login(usuario)
+        with self.assertNumQueries(n):
+            response = getattr(self.client, metodo)(reverse(f'camila:{nombre}', args=args), datos or {})
+            if getattr(response, 'streaming', False):
+                b''.join(response.streaming_content)
+        self.assertIn(response.status_code, (200, 302))
+
+    def test_vistas_docente(self):
+        pk = self.reserva.pk
+        self.assertConsultas(self.docente, 4, 'get', 'docente_dashboard')
+        # + las versiones de los datos (VersionDatos) para el ETag y los fragmentos
+        self.assertConsultas(self.docente, 5, 'get', 'docente_reserva_list')
+        self.assertConsultas(self.docente, 2, 'get', 'docente_reserva_create')
+        self.assertConsultas(self.docente, 2, 'get', 'docente_reserva_recurrente')
+        self.assertConsultas(self.docente, 3, 'get', 'docente_reserva_detail', pk)
+        self.assertConsultas(self.docente, 3, 'get', 'docente_reserva_update', pk)
+        self.assertConsultas(self.docente, 5, 'get', 'disponibilidad')
+        # + VersionDatos para el ETag y Last-Modified
+        self.assertConsultas(self.docente, 4, 'get', 'api_reserva_list')
+        # UPDATE, resumen (UPDATE del estado anterior + upsert del nuevo),
+        # versión y notificación, en su transacción (SAVEPOINT ... RELEASE)
+        self.assertConsultas(self.docente, 10, 'post', 'docente_reserva_cancelar', pk)
+
+    def test_reserva_ajena_se_rechaza_con_una_consulta(self):
+        otro = User.objects.create_user('otro', password='clave-segura-123')
+        self.client.force_login(otro)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('camila:docente_reserva_detail', args=[self.reserva.pk]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_reserva_inexistente_da_404(self):
+        self.client.force_login(self.docente)
+        for nombre in ('docente_reserva_detail', 'docente_reserva_update'):
+            self.assertEqual(self.client.get(reverse(f'camila:{nombre}', args=[0])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('camila:docente_reserva_cancelar', args=[0])).status_code, 404)
+
+    def test_reserva_propia_no_pendiente_redirige(self):
+        Reserva.objects.filter(pk=self.reserva.pk).update(estado='Aprobada')
+        self.client.force_login(self.docente)
+        response = self.client.post(reverse('camila:docente_reserva_cancelar', args=[self.reserva.pk]))
+        self.assertRedirects(response, reverse('camila:docente_reserva_list'), fetch_redirect_response=False)
+
+    def test_vistas_admin(self):
+        pk = self.reserva.pk
+        self.assertConsultas(self.admin, 4, 'get', 'admin_dashboard')
+        self.assertConsultas(self.admin, 5, 'get', 'admin_reserva_list')
+        self.assertConsultas(self.admin, 3, 'get', 'admin_reserva_detail', pk)
+        self.assertConsultas(self.admin, 6, 'get', 'admin_estadisticas')
+        # Vigentes y archivadas agrupadas (los laboratorios ya están en caché)
+        self.assertConsultas(self.admin, 4, 'get', 'admin_ocupacion')
+        # vigentes + archivadas
+        self.assertConsultas(self.admin, 4, 'get', 'admin_export_csv')
+        self.assertConsultas(self.admin, 3, 'get', 'admin_exportacion_list')
+        # Lectura del lote, bloqueo, agenda vigente, UPDATE, resumen, versión y
+        # notificación, en su transacción
+        self.assertConsultas(self.admin, 12, 'post', 'admin_cambiar_estado', pk, datos={'accion': 'aprobar'})
+        self.assertConsultas(self.admin, 7, 'post', 'admin_cambiar_estado_lote', datos={'accion': 'rechazar', 'reservas': [pk]})
+        self.assertConsultas(self.admin, 4, 'get', 'api_reserva_list')
+
+
+class MetricasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+
+    def setUp(self):
+        cache.clear()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        ajustes = self.settings(METRICAS_DB=f"{directorio.name}/metricas.sqlite3", METRICAS_INTERVALO=3600)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        # Descarta lo acumulado por otras pruebas
+        metricas.registro.volcar()
+        with metricas.registro._conectar() as conexion:
+            conexion.execute("DELETE FROM metricas")
+            conexion.execute("DELETE FROM lentas")
+
+    def test_metricas_por_vista_en_formato_prometheus(self):
+        self.client.force_login(self.docente)
+        self.client.get(reverse('camila:docente_dashboard'))
+        self.client.get(reverse('camila:docente_dashboard'))
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('camila:metricas'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        texto = response.content.decode()
+        self.assertIn('camila_request_duration_seconds_count{vista="camila:docente_dashboard"} 2', texto)
+        self.assertIn('camila_request_duration_seconds_bucket{vista="camila:docente_dashboard",le="+Inf"} 2', texto)
+        self.assertIn('camila_cache_consultas_total{cache="dashboard:docente",resultado="hit"} 1', texto)
+        consultas = next(l for l in texto.splitlines() if l.startswith('camila_db_queries_total{vista="camila:docente_dashboard"}'))
+        self.assertGreater(int(consultas.split()[-1]), 0)
+        render = next(l for l in texto.splitlines() if l.startswith('camila_template_render_seconds_total{vista="camila:docente_dashboard"}'))
+        self.assertGreater(float(render.split()[-1]), 0)
+
+    def test_solo_admin(self):
+        self.client.force_login(self.docente)
+        self.assertEqual(self.client.get(reverse('camila:metricas')).status_code, 403)
+
+    def test_suma_los_volcados_de_varios_procesos(self):
+        for _ in range(2):
+            worker = metricas.RegistroMetricas()
+            worker.registrar('camila:inicio', 0.02, 3, 0.01, 0.005, 100)
+            worker.volcar()
+        valores, _ = metricas.registro.leer()
+        self.assertEqual(valores[('camila:inicio', 'count')], 2)
+        self.assertEqual(valores[('camila:inicio', 'db_queries')], 6)
+        self.assertEqual(valores[('camila:inicio', 'bucket:0.025')], 2)
+
+    def test_las_peticiones_no_vuelcan(self):
+        self.client.force_login(self.docente)
+        hilos = []
+        with self.settings(METRICAS_INTERVALO=0.01), mock.patch.object(
+            metricas.registro, 'volcar', side_effect=lambda: hilos.append(threading.current_thread()),
+        ):
+            self.client.get(reverse('camila:docente_dashboard'))
+        # Solo vuelca el hilo de fondo, nunca el de la petición
+        self.assertNotIn(threading.current_thread(), hilos)
+
+    def test_registra_peticiones_lentas_con_su_sql(self):
+        self.client.force_login(self.docente)
+        with self.settings(METRICAS_UMBRAL_LENTO=0), self.assertLogs('camila.lentas', 'WARNING') as logs:
+            self.client.get(reverse('camila:docente_dashboard'))
+        self.assertIn('camila:docente_dashboard', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+        _, lentas = metricas.registro.leer()
+        self.assertEqual(lentas[0][0], 'camila:docente_dashboard')
+
+
+class GeneradorBenchmarkTests(TestCase):
+
+    def test_agenda_sin_solapamientos(self):
+        from .management.commands._bench import generar_agenda
+        from .management.commands.bench_reservas_concurrentes import contar_solapamientos
+
+        labs, docentes = generar_agenda(600, laboratorios=3, docentes=10, semilla=7)
+        self.assertEqual(Reserva.objects.count(), 600)
+        self.assertEqual(contar_solapamientos(), 0)
+        fechas = Reserva.objects.values_list('fecha', flat=True)
+        self.assertFalse(any(f.weekday() == 6 for f in fechas))
+        # Pocos docentes concentran la mayoría de las reservas
+        self.assertGreater(Reserva.objects.filter(docente=docentes[0]).count(),
+                           Reserva.objects.filter(docente=docentes[-1]).count())
+
+
+class VistasAsyncTests(TestCase):
+    """Las vistas async bajo un cliente ASGI: acceso y contenido"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Física')
+        crear_reserva(cls.docente, cls.lab, (8, 0), (9, 0))
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_anonimo_va_al_login(self):
+        response = await self.async_client.get(reverse('camila:docente_dashboard'))
+        self.assertRedirects(response, f"/accounts/login/?next={reverse('camila:docente_dashboard')}",
+                             fetch_redirect_response=False)
+
+    async def test_docente_no_entra_a_vistas_de_admin(self):
+        await self.async_client.aforce_login(self.docente)
+        for nombre in ('admin_dashboard', 'admin_reserva_list', 'admin_estadisticas'):
+            response = await self.async_client.get(reverse(f'camila:{nombre}'))
+            self.assertEqual(response.status_code, 403)
+
+    async def test_vistas_async_responden(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(reverse('camila:admin_reserva_list'), {'contar': '1'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['reservas']), 1)
+        self.assertEqual(response.context['page_obj'].total, 1)
+        response = await self.async_client.get(reverse('camila:admin_estadisticas'))
+        self.assertEqual(response.context['total'], 1)
+
+        await self.async_client.aforce_login(self.docente)
+        response = await self.async_client.get(reverse('camila:docente_dashboard'))
+        self.assertEqual(response.context['total_reservas'], 1)
+        self.assertEqual(len(response.context['reservas_recientes']), 1)
+        response = await self.async_client.get(reverse('camila:disponibilidad'), {'desde': '2026-03-02'})
+        self.assertEqual(response.json()['laboratorios'][0]['dias'][0]['ocupado'], [['08:00', '09:00', 'Pendiente']])
+
+
+class BusquedaTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='clave-segura-123')
+        cls.ana = User.objects.create_user('amartinez', first_name='Ana', last_name='Martínez')
+        cls.luis = User.objects.create_user('lperez', first_name='Luis', last_name='Pérez')
+        cls.quimica = Laboratorio.objects.create(nombre='Química')
+        cls.fisica = Laboratorio.objects.create(nombre='Física')
+        cls.titulacion = crear_reserva(cls.ana, cls.quimica, (8, 0), (9, 0))
+        cls.titulacion.motivo = 'Titulación ácido-base: titulación con fenolftaleína'
+        cls.titulacion.save()
+        cls.optica = crear_reserva(cls.luis, cls.fisica, (8, 0), (9, 0))
+        cls.optica.motivo = 'Óptica geométrica y una titulación de repaso'
+        cls.optica.save()
+
+    def ids(self, texto):
+        return list(busqueda.buscar(Reserva.objects.all(), texto).values_list('pk', flat=True))
+
+    def test_busca_motivo_docente_y_laboratorio_sin_tildes(self):
+        self.assertEqual(self.ids('optica'), [self.optica.pk])
+        self.assertEqual(self.ids('martinez'), [self.titulacion.pk])
+        self.assertEqual(self.ids('fisi'), [self.optica.pk])
+        self.assertEqual(self.ids('inexistente'), [])
+
+    def test_ordena_por_relevancia(self):
+        self.assertEqual(self.ids('titulación'), [self.titulacion.pk, self.optica.pk])
+
+    def test_se_reindexa_al_renombrar(self):
+        self.fisica.nombre = 'Electromagnetismo'
+        self.fisica.save()
+        self.luis.last_name = 'Gómez'
+        self.luis.save()
+        self.assertEqual(self.ids('electromagnetismo gomez'), [self.optica.pk])
+        self.assertEqual(self.ids('fisica'), [])
+
+    def test_guardar_sin_renombrar_no_toca_las_reservas(self):
+        antes = Reserva.objects.get(pk=self.optica.pk).fecha_modificacion
+        # Solo la lectura del nombre anterior y el UPDATE (más la versión de laboratorios)
+        with self.assertNumQueries(3):
+            self.fisica.save()
+        self.luis.set_password('otra-clave-segura-456')
+        with self.assertNumQueries(2):
+            self.luis.save()
+        self.assertEqual(Reserva.objects.get(pk=self.optica.pk).fecha_modificacion, antes)
+
+    def test_reservas_recurrentes_quedan_indexadas(self):
+        services.crear_reservas_recurrentes(
+            self.ana, self.quimica, [datetime.date(2026, 4, 6), datetime.date(2026, 4, 13)],
+            datetime.time(10, 0), datetime.time(11, 0), 'Espectrofotometría',
+        )
+        self.assertEqual(len(self.ids('espectrofotometria')), 2)
+
+    def test_lista_admin_y_admin_de_django_usan_el_indice(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('camila:admin_reserva_list'), {'q': 'titulacion'})
+        self.assertEqual([r.pk for r in response.context['reservas']], [self.titulacion.pk, self.optica.pk])
+
+        response = self.client.get(reverse('admin:CAMILA_JESUS_reserva_changelist'), {'q': 'geometrica'})
+        self.assertEqual([r.pk for r in response.context['cl'].result_list], [self.optica.pk])
+
+
+class CalendarioTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.docente = User.objects.create_user('amartinez', first_name='Ana', last_name='Martínez')
+        cls.quimica = Laboratorio.objects.create(nombre='Química')
+        cls.fisica = Laboratorio.objects.create(nombre='Física')
+        fecha = datetime.date.today() + datetime.timedelta(days=7)
+        cls.aprobada = crear_reserva(cls.docente, cls.quimica, (8, 0), (9, 0), fecha=fecha, estado='Aprobada')
+        cls.pendiente = crear_reserva(cls.docente, cls.quimica, (9, 0), (10, 0), fecha=fecha)
+        cls.cancelada = crear_reserva(cls.docente, cls.quimica, (10, 0), (11, 0), fecha=fecha, estado='Cancelada')
+        # La aprobada queda fuera del margen de la marca de agua
+        Reserva.objects.update(fecha_modificacion=timezone.now() - datetime.timedelta(hours=1))
+        Reserva.objects.filter(pk=cls.aprobada.pk).update(fecha_modificacion=timezone.now() - datetime.timedelta(hours=2))
+
+    def setUp(self):
+        cache.clear()
+
+    def url(self, tipo='laboratorio', pk=None):
+        return calendario.url(tipo, pk or self.quimica.pk)
+
+    def uids(self, response):
+        return {int(linea.split('-')[1].split('@')[0]) for linea in response.content.decode().split('\r\n')
+                if linea.startswith('UID:')}
+
+    def test_feed_publica_aprobadas_y_pendientes(self):
+        response = self.client.get(self.url())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        self.assertEqual(self.uids(response), {self.aprobada.pk, self.pendiente.pk})
+        self.assertIn('STATUS:TENTATIVE', response.content.decode())
+        self.assertEqual(self.uids(self.client.get(self.url('docente', self.docente.pk))), {self.aprobada.pk, self.pendiente.pk})
+
+    def test_token_invalido(self):
+        url = self.url().replace(calendario.token('laboratorio', self.quimica.pk), 'otro')
+        self.assertEqual(self.client.get(url).status_code, 404)
+        otro = calendario.url('laboratorio', self.fisica.pk).replace(str(self.fisica.pk), str(self.quimica.pk), 1)
+        self.assertEqual(self.client.get(otro).status_code, 404)
+
+    def test_sin_cambios_sale_de_cache_o_304(self):
+        response = self.client.get(self.url())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url()).content, response.content)
+            self.assertEqual(self.client.get(self.url(), HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+            self.assertEqual(
+                self.client.get(self.url(), HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304,
+            )
+
+    def test_actualizacion_incremental(self):
+        etag = self.client.get(self.url())['ETag']
+        self.pendiente.estado = 'Rechazada'
+        self.pendiente.save()
+        nueva = crear_reserva(self.docente, self.quimica, (11, 0), (12, 0), fecha=self.aprobada.fecha)
+
+        # Solo se consultan y renderizan las reservas modificadas
+        with mock.patch.object(calendario, 'evento', wraps=calendario.evento) as evento:
+            response = self.client.get(self.url(), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.uids(response), {self.aprobada.pk, nueva.pk})
+        self.assertEqual(evento.call_count, 1)
+
+    def test_cambios_masivos_y_reservas_movidas(self):
+        self.client.get(self.url())
+        self.client.get(self.url(pk=self.fisica.pk))
+        cambiar_estado_masivo(Reserva.objects.filter(pk=self.aprobada.pk), 'Cancelada')
+        self.pendiente.laboratorio = self.fisica
+        self.pendiente.save()
+        self.assertEqual(self.uids(self.client.get(self.url())), set())
+        self.assertEqual(self.uids(self.client.get(self.url(pk=self.fisica.pk))), {self.pendiente.pk})
+
+    def test_renombrar_laboratorio_y_borrar(self):
+        self.client.get(self.url('docente', self.docente.pk))
+        self.quimica.nombre = 'Química orgánica'
+        self.quimica.save()
+        self.assertIn('LOCATION:Química orgánica', self.client.get(self.url('docente', self.docente.pk)).content.decode())
+        self.pendiente.delete()
+        self.assertEqual(self.uids(self.client.get(self.url('docente', self.docente.pk))), {self.aprobada.pk})
+
+    def test_borrado_atendido_por_otro_worker(self):
+        hoy = timezone.localdate()
+        calendario._actualizar('laboratorio', self.quimica.pk, hoy)
+        # El otro worker no comparte esta caché: solo se entera por la base
+        pk = self.pendiente.pk
+        with mock.patch.object(caches, 'invalidar'):
+            self.pendiente.delete()
+        cuerpo = calendario._actualizar('laboratorio', self.quimica.pk, hoy)['cuerpo'].decode()
+        self.assertNotIn(f"UID:reserva-{pk}@", cuerpo)
+        self.assertIn(f"UID:reserva-{self.aprobada.pk}@", cuerpo)
+
+    def test_plegado_de_lineas(self):
+        linea = calendario._plegar('SUMMARY:' + 'ñ' * 60)
+        partes = linea.split('\r\n')
+        self.assertTrue(all(len(p.encode()) <= 75 for p in partes))
+        self.assertEqual(''.join(p[1:] if i else p for i, p in enumerate(partes)), 'SUMMARY:' + 'ñ' * 60)
+
+
+class ArchivoTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='clave-segura-123')
+        cls.docente = User.objects.create_user('docente1')
+        cls.lab = Laboratorio.objects.create(nombre='Química')
+        cls.antiguas = [
+            crear_reserva(cls.docente, cls.lab, (8 + i, 0), (9 + i, 0), fecha=datetime.date(2024, 5, 6), estado=estado)
+            for i, estado in enumerate(['Aprobada', 'Aprobada', 'Rechazada'])
+        ]
+        cls.vigente = crear_reserva(cls.docente, cls.lab, (8, 0), (9, 0), fecha=datetime.date(2026, 3, 2))
+
+    def resumen(self):
+        return set(EstadisticaDiaria.objects.filter(total__gt=0).values_list('fecha', 'estado', 'total'))
+
+    def test_archivar_por_lotes(self):
+        antes = self.resumen()
+        version = VersionDatos.actual(VERSION_RESERVAS)
+        movidas = archivo.archivar(datetime.date(2025, 1, 1), lote=2)
+        self.assertEqual(movidas, 3)
+        # Una versión nueva por lote: las listas no siguen sirviendo lo ya movido
+        self.assertEqual(VersionDatos.actual(VERSION_RESERVAS), version + 2)
+        self.assertEqual(list(Reserva.objects.values_list('pk', flat=True)), [self.vigente.pk])
+        self.assertEqual(
+            sorted(ReservaArchivada.objects.values_list('pk', flat=True)), sorted(r.pk for r in self.antiguas),
+        )
+        self.assertFalse(IndiceBusqueda.objects.filter(reserva_id__in=[r.pk for r in self.antiguas]).exists())
+        # El resumen diario sigue contando las archivadas, también al reconstruirlo
+        self.assertEqual(self.resumen(), antes)
+        reconstruir()
+        self.assertEqual(self.resumen(), antes)
+
+    def test_exportacion_incluye_historial(self):
+        archivo.archivar(datetime.date(2025, 1, 1))
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('camila:admin_export_csv'), {'estado': 'Aprobada', 'q': 'práctica'})
+        contenido = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(contenido.strip().splitlines()), 1 + 2)
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('archivar_reservas', '--antes-de', '2025-01-01', '--simular', stdout=salida)
+        self.assertIn('Se archivarían 3 reservas', salida.getvalue())
+        call_command('archivar_reservas', '--meses', '12', stdout=salida)
+        self.assertEqual(ReservaArchivada.objects.count(), 3)
+        self.assertEqual(archivo.corte_por_meses(12, hoy=datetime.date(2026, 1, 15)), datetime.date(2025, 1, 1))
+
+
+class ImportacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', password='clave-segura-123')
+        cls.ana = User.objects.create_user('amartinez')
+        cls.luis = User.objects.create_user('lperez')
+        cls.quimica = Laboratorio.objects.create(nombre='Química')
+
+    def importar(self, texto, **kwargs):
+        return importaciones.importar(StringIO(texto), **kwargs)
+
+    def campos(self, qs):
+        return sorted(qs.values_list(
+            'docente__username', 'laboratorio__nombre', 'fecha', 'hora_inicio', 'hora_fin', 'estado', 'motivo',
+        ))
+
+    def test_laboratorios_nuevos_invalidan_la_cache(self):
+        cache.clear()
+        self.assertEqual([lab.nombre for lab in caches.laboratorios()], ['Química'])
+        self.importar("Docente,Laboratorio,Fecha,Hora Inicio,Hora Fin,Motivo\namartinez,Lab Nuevo,2026-03-02,08:00,09:00,Práctica\n")
+        self.assertEqual([lab.nombre for lab in caches.laboratorios()], ['Lab Nuevo', 'Química'])
+
+    def test_ida_y_vuelta_con_la_exportacion(self):
+        crear_reserva(self.ana, self.quimica, (8, 0), (9, 0), estado='Aprobada')
+        crear_reserva(self.luis, self.quimica, (9, 0), (10, 30))
+        cancelada = crear_reserva(self.luis, self.quimica, (8, 30), (9, 30), estado='Cancelada')
+        cancelada.motivo = 'Práctica, con "comillas"\ny salto de línea'
+        cancelada.save()
+        self.client.force_login(self.admin)
+        csv_exportado = b''.join(self.client.get(reverse('camila:admin_export_csv')).streaming_content).decode()
+        originales = self.campos(Reserva.objects.all())
+
+        # Sobre los mismos datos, todas las activas se solapan
+        resultado = self.importar(csv_exportado)
+        self.assertEqual((resultado.creadas, resultado.total_errores), (1, 2))
+
+        Reserva.objects.all().delete()
+        resultado = self.importar(csv_exportado)
+        self.assertEqual((resultado.creadas, resultado.total_errores), (3, 0))
+        self.assertEqual(self.campos(Reserva.objects.all()), originales)
+        # Quedan en el resumen diario y en el índice de búsqueda
+        self.assertEqual(EstadisticaDiaria.objects.filter(total__gt=0).count(), 3)
+        self.assertEqual(IndiceBusqueda.objects.count(), 3)
+
+    def test_errores_por_linea_y_laboratorios_nuevos(self):
+        crear_reserva(self.ana, self.quimica, (8, 0), (10, 0), estado='Aprobada')
+        texto = (
+            'Docente,Laboratorio,Fecha,Hora Inicio,Hora Fin,Estado,Motivo\n'
+            'amartinez,Física,2026-03-02,08:00,09:00,,Óptica\n'
+            'lperez,Física,2026-03-02,08:30,09:30,,Solapa con la línea 2\n'
+            'nadie,Física,2026-03-03,08:00,09:00,,Docente inexistente\n'
+            'lperez,Química,2026-03-02,09:00,11:00,Aprobada,Solapa con la existente\n'
+            'lperez,Química,2026-03-02,11:00,10:00,,Horas invertidas\n'
+            'lperez,Química,2026-03-02,11:00,12:00,Borrador,Estado desconocido\n'
+            'lperez,Química,2026/03/02,11:00,12:00,,Fecha inválida\n'
+            'lperez,Química,2026-03-02,10:00,11:00,Pendiente,Válida\n'
+        )
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = self.importar(texto, lote=3)
+        self.assertEqual(resultado.creadas, 2)
+        self.assertEqual(resultado.laboratorios_creados, 1)
+        self.assertEqual([linea for linea, _ in resultado.errores], [3, 4, 5, 6, 7, 8])
+        self.assertIn("'nadie' no existe", dict(resultado.errores)[4])
+        fisica = Laboratorio.objects.get(nombre='Física')
+        self.assertEqual(Reserva.objects.get(laboratorio=fisica).estado, 'Aprobada')
+        # Una sola consulta de usuarios para todo el archivo
+        self.assertEqual(sum('FROM "auth_user"' in q['sql'] for q in consultas.captured_queries), 1)
+
+    def test_simular_no_escribe(self):
+        texto = (
+            'Docente,Laboratorio,Fecha,Hora Inicio,Hora Fin,Motivo\n'
+            'amartinez,Física,2026-03-02,08:00,09:00,Óptica\n'
+            'lperez,Física,2026-03-02,08:30,09:30,Solapa\n'
+        )
+        resultado = self.importar(texto, simular=True, lote=1)
+        self.assertEqual((resultado.creadas, resultado.total_errores, resultado.laboratorios_creados), (1, 1, 1))
+        self.assertFalse(Laboratorio.objects.filter(nombre='Física').exists())
+        self.assertFalse(Reserva.objects.exists())
+
+    def test_columnas_faltantes(self):
+        with self.assertRaises(importaciones.ArchivoInvalido):
+            self.importar('Docente,Fecha\namartinez,2026-03-02\n')
+
+    def test_carga_desde_la_administracion(self):
+        self.client.force_login(self.admin)
+        archivo = SimpleUploadedFile('reservas.csv', (
+            '\ufeffDocente,Laboratorio,Fecha,Hora Inicio,Hora Fin,Motivo\n'
+            'amartinez,Química,2026-03-02,08:00,09:00,Titulación\n'
+        ).encode('utf-8'), content_type='text/csv')
+        response = self.client.post(reverse('camila:admin_importar_csv'), {'archivo': archivo})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['resultado'].creadas, 1)
+        self.assertEqual(Reserva.objects.get().motivo, 'Titulación')
+
+        self.client.force_login(self.ana)
+        self.assertEqual(self.client.get(reverse('camila:admin_importar_csv')).status_code, 403)
+
+
+class BaseDatosTests(TestCase):
+
+    def configurar(self, entorno, servidor='asgi', pool=True):
+        with mock.patch.dict('os.environ', entorno), mock.patch.object(basedatos, 'hay_pool', return_value=pool):
+            return basedatos.configurar('sqlite:///:memory:', servidor)
+
+    def test_sqlite_aplica_pragmas_al_conectar(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 10000)
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 2)  # FULL: sin WAL por defecto
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_sqlite_wal_solo_si_se_pide(self):
+        self.assertNotIn('journal_mode', self.configurar({})['OPTIONS']['init_command'])
+        comando = self.configurar({'SQLITE_WAL': 'True'})['OPTIONS']['init_command']
+        self.assertIn('PRAGMA journal_mode=WAL', comando)
+        self.assertIn('PRAGMA synchronous=NORMAL', comando)
+
+    def test_postgresql_con_pool_repartido_entre_workers(self):
+        ajustes = self.configurar({
+            'DATABASE_URL': 'postgres://u:p@servidor/camila', 'WEB_CONCURRENCY': '4', 'DB_MAX_CONEXIONES': '40',
+        })
+        self.assertEqual(ajustes['OPTIONS']['pool'], {'min_size': 1, 'max_size': 10, 'timeout': 10.0})
+        self.assertEqual(ajustes['CONN_MAX_AGE'], 0)
+        self.assertTrue(ajustes['CONN_HEALTH_CHECKS'])
+
+    def test_postgresql_sin_psycopg3_usa_conexiones_persistentes(self):
+        ajustes = self.configurar({'DATABASE_URL': 'postgres://u:p@servidor/camila'}, servidor='wsgi', pool=False)
+        self.assertNotIn('pool', ajustes['OPTIONS'])
+        self.assertEqual(ajustes['CONN_MAX_AGE'], 600)
+        self.assertTrue(ajustes['CONN_HEALTH_CHECKS'])
+
+    def test_replicas_de_database_replica_urls(self):
+        with mock.patch.dict('os.environ', {
+            'DATABASE_REPLICA_URLS': 'postgres://u:p@replica1/camila, sqlite:////tmp/replica.sqlite3',
+        }), mock.patch.object(basedatos, 'hay_pool', return_value=True):
+            replicas = basedatos.replicas('asgi')
+        self.assertEqual(list(replicas), ['replica_1', 'replica_2'])
+        self.assertEqual(replicas['replica_1']['HOST'], 'replica1')
+        self.assertIn('pool', replicas['replica_1']['OPTIONS'])
+        self.assertIn('busy_timeout', replicas['replica_2']['OPTIONS']['init_command'])
+        self.assertEqual(replicas['replica_2']['TEST'], {'MIRROR': 'default'})
+        with mock.patch.dict('os.environ', {'DATABASE_REPLICA_URLS': ''}):
+            self.assertEqual(basedatos.replicas('asgi'), {})
+
+
+class FragmentosYCompresionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Física')
+        cls.reserva = crear_reserva(cls.docente, cls.lab, (8, 0), (9, 0))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lista_responde_304_sin_consultar_la_pagina(self):
+        self.client.force_login(self.docente)
+        url = reverse('camila:docente_reserva_list')
+        etag = self.client.get(url)['ETag']
+
+        # Sesión, usuario y versiones; ni la página ni los laboratorios
+        with self.assertNumQueries(3):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Una escritura en otro worker no pasa por esta caché: se ve en la base
+        VersionDatos.incrementar(VERSION_RESERVAS)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        crear_reserva(self.docente, self.lab, (10, 0), (11, 0))
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['reservas']), 2)
+
+    def test_filas_en_cache_se_invalidan_al_cambiar_una_reserva(self):
+        self.client.force_login(self.admin)
+        url = reverse('camila:admin_reserva_list')
+        self.assertContains(self.client.get(url), 'bg-yellow-200')
+
+        # El selector de laboratorio ya está en caché: no se vuelve a consultar
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        cambiar_estado_masivo(Reserva.objects.filter(pk=self.reserva.pk), 'Aprobada')
+        response = self.client.get(url)
+        self.assertContains(response, 'bg-green-200')
+        self.assertNotContains(response, 'bg-yellow-200')
+
+    def test_html_comprimido_con_etag_debil(self):
+        self.client.force_login(self.admin)
+        url = reverse('camila:admin_reserva_list')
+        for codificacion in ('gzip', 'br'):
+            response = self.client.get(url, HTTP_ACCEPT_ENCODING=f'{codificacion}, deflate')
+            self.assertEqual(response['Content-Encoding'], codificacion)
+            self.assertTrue(response['ETag'].startswith('W/"'))
+            self.assertIn('Accept-Encoding', response['Vary'])
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_brotli_con_relleno_aleatorio(self):
+        import brotli
+
+        self.client.force_login(self.admin)
+        url = reverse('camila:admin_reserva_list')
+        cuerpos = [
+            brotli.decompress(self.client.get(url, HTTP_ACCEPT_ENCODING='br').content) for _ in range(5)
+        ]
+        self.assertTrue(all(cuerpo.endswith(b' -->') for cuerpo in cuerpos))
+        # Longitud variable aunque la página sea la misma
+        self.assertGreater(len({len(cuerpo) for cuerpo in cuerpos}), 1)
+
+
+class OcupacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.quimica = Laboratorio.objects.create(nombre='Química')
+        cls.fisica = Laboratorio.objects.create(nombre='Física')
+        # Dos lunes en Química; las pendientes y canceladas no cuentan
+        crear_reserva(cls.docente, cls.quimica, (8, 0), (10, 0), fecha=datetime.date(2026, 3, 2), estado='Aprobada')
+        crear_reserva(cls.docente, cls.quimica, (8, 15), (9, 0), fecha=datetime.date(2026, 3, 9), estado='Aprobada')
+        crear_reserva(cls.docente, cls.quimica, (14, 0), (16, 0), fecha=datetime.date(2026, 3, 9))
+        crear_reserva(cls.docente, cls.quimica, (16, 0), (18, 0), fecha=datetime.date(2026, 3, 9), estado='Cancelada')
+        # Un martes en Física, ya archivado
+        crear_reserva(cls.docente, cls.fisica, (20, 0), (22, 0), fecha=datetime.date(2024, 3, 5), estado='Aprobada')
+        archivo.archivar(datetime.date(2025, 1, 1))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matriz_por_dia_y_franja(self):
+        datos = ocupacion.calcular(datetime.date(2026, 3, 2), datetime.date(2026, 3, 15))
+        fisica, quimica = datos['laboratorios']
+        self.assertEqual(datos['franjas'][:3], ['07:00', '07:30', '08:00'])
+        lunes = quimica['matriz'][0]
+        # 08:00 a 08:30: 30 + 15 minutos de 2 lunes x 30 minutos
+        self.assertEqual(lunes[2:6], [0.75, 1.0, 0.5, 0.5])
+        self.assertEqual(sum(map(sum, quimica['matriz'][1:])), 0)
+        self.assertEqual(quimica['horas_ocupadas'], 2.75)
+        self.assertEqual(quimica['utilizacion'], round(165 / (14 * 14 * 60), 4))
+        self.assertEqual(datos['semana'][0][3], 0.5)
+        self.assertEqual(fisica['horas_ocupadas'], 0)
+
+    def test_incluye_archivadas_y_recorta_a_la_jornada(self):
+        self.assertEqual(ocupacion.semestre('2024-1'), (datetime.date(2024, 1, 1), datetime.date(2024, 6, 30)))
+        datos = ocupacion.calcular(*ocupacion.semestre('2024-1'))
+        fisica = datos['laboratorios'][0]
+        # Solo de 20:00 a 21:00, un martes de los 26 del semestre
+        self.assertEqual(fisica['horas_ocupadas'], 1.0)
+        self.assertEqual(fisica['matriz'][1][-2:], [round(1 / 26, 4)] * 2)
+
+    def test_json_con_etag_y_pagina(self):
+        self.client.force_login(self.admin)
+        url = reverse('camila:admin_ocupacion_json')
+        response = self.client.get(url, {'semestre': '2026-1'})
+        self.assertEqual(response.json()['laboratorios'][1]['horas_ocupadas'], 2.75)
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, {'semestre': '2026-1'}, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        crear_reserva(self.docente, self.fisica, (9, 0), (10, 0), fecha=datetime.date(2026, 3, 3), estado='Aprobada')
+        response = self.client.get(url, {'semestre': '2026-1'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['laboratorios'][0]['horas_ocupadas'], 1.0)
+
+        # Sin parámetros: el semestre en curso, que cambia el 1 de julio
+        with mock.patch('django.utils.timezone.localdate', return_value=datetime.date(2026, 6, 30)):
+            etag = self.client.get(url)['ETag']
+        with mock.patch('django.utils.timezone.localdate', return_value=datetime.date(2026, 7, 1)):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['desde'], '2026-07-01')
+
+        self.assertEqual(self.client.get(url, {'semestre': '2026-3'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'desde': '2026-01-01', 'hasta': '2027-06-30'}).status_code, 400)
+
+        response = self.client.get(reverse('camila:admin_ocupacion'), {
+            'desde': '2026-03-02', 'hasta': '2026-03-15', 'laboratorio': self.quimica.pk,
+        })
+        self.assertEqual(response.context['laboratorio']['nombre'], 'Química')
+        self.assertEqual(response.context['filas'][0][1][2:6], [75, 100, 50, 50])
+
+
+class NotificacionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user(
+            'docente', password='clave-segura-123', email='docente@example.com', first_name='Ana',
+        )
+        cls.sin_correo = User.objects.create_user('otro')
+        cls.lab = Laboratorio.objects.create(nombre='Química')
+        cls.reservas = [crear_reserva(cls.docente, cls.lab, (8 + 2 * i, 0), (9 + 2 * i, 0)) for i in range(3)]
+
+    def test_cambios_de_estado_encolan_sin_enviar(self):
+        self.client.force_login(self.admin)
+        self.client.post(
+            reverse('camila:admin_cambiar_estado', args=[self.reservas[0].pk]), {'accion': 'aprobar'},
+        )
+        self.client.post(reverse('camila:admin_cambiar_estado_lote'), {
+            'accion': 'rechazar', 'reservas': [self.reservas[1].pk],
+        })
+        self.client.force_login(self.docente)
+        self.client.post(reverse('camila:docente_reserva_cancelar', args=[self.reservas[2].pk]))
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            list(Notificacion.objects.order_by('pk').values_list('reserva_id', 'evento', 'estado')),
+            [(self.reservas[0].pk, 'Aprobada', 'Pendiente'), (self.reservas[1].pk, 'Rechazada', 'Pendiente'),
+             (self.reservas[2].pk, 'Cancelada', 'Pendiente')],
+        )
+        self.assertEqual(Notificacion.objects.first().datos['laboratorio'], 'Química')
+
+    def test_sin_cambio_confirmado_no_hay_notificacion(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            services.cambiar_estado_lote([self.reservas[0].pk], 'aprobar')
+            raise RuntimeError
+        self.assertFalse(Notificacion.objects.exists())
+
+    def test_worker_agrupa_por_docente(self):
+        services.cambiar_estado_lote([r.pk for r in self.reservas[:2]], 'aprobar')
+        services.cancelar_reserva(self.reservas[2])
+        ajena = crear_reserva(self.sin_correo, self.lab, (15, 0), (16, 0))
+        services.cambiar_estado_lote([ajena.pk], 'rechazar')
+
+        salida = StringIO()
+        call_command('procesar_notificaciones', '--una-vez', stdout=salida)
+        self.assertIn('3 notificaciones en 1 correos', salida.getvalue())
+        self.assertEqual(len(mail.outbox), 1)
+        correo = mail.outbox[0]
+        self.assertEqual(correo.to, ['docente@example.com'])
+        self.assertEqual(correo.subject, '3 cambios en tus reservas de laboratorio')
+        self.assertEqual(len([l for l in correo.body.splitlines() if l.startswith('- ')]), 3)
+        self.assertEqual(
+            dict(Notificacion.objects.values_list('reserva_id', 'estado')),
+            {**{r.pk: 'Enviada' for r in self.reservas}, ajena.pk: 'Omitida'},
+        )
+
+    def test_reintentos_con_espera_exponencial(self):
+        services.cambiar_estado_lote([self.reservas[0].pk], 'aprobar')
+        conexion = mock.Mock()
+        conexion.send_messages.side_effect = OSError('Servidor no disponible')
+        ahora = timezone.now()
+        with mock.patch.object(notificaciones, 'get_connection', return_value=conexion), \
+                mock.patch.object(notificaciones.random, 'uniform', return_value=1.0):
+            for intento in range(1, notificaciones.MAX_INTENTOS + 1):
+                lote = notificaciones.reclamar(ahora=ahora)
+                self.assertEqual(len(lote), 1)
+                notificaciones.enviar(lote)
+                notificacion = Notificacion.objects.get()
+                self.assertEqual(notificacion.intentos, intento)
+                if intento < notificaciones.MAX_INTENTOS:
+                    self.assertEqual(notificacion.estado, 'Pendiente')
+                    espera = notificacion.proximo_intento - timezone.now()
+                    self.assertAlmostEqual(
+                        espera.total_seconds(), notificaciones.ESPERA_BASE * 2 ** (intento - 1), delta=5,
+                    )
+                    # Todavía no vence
+                    self.assertEqual(notificaciones.reclamar(), [])
+                    ahora = notificacion.proximo_intento
+        self.assertEqual(notificacion.estado, 'Fallida')
+        self.assertIn('Servidor no disponible', notificacion.error)
+
+    def test_reclamo_vencido_vuelve_a_la_cola(self):
+        services.cambiar_estado_lote([self.reservas[0].pk], 'aprobar')
+        self.assertEqual(len(notificaciones.reclamar()), 1)
+        self.assertEqual(notificaciones.reclamar(), [])
+        despues = timezone.now() + datetime.timedelta(seconds=notificaciones.DURACION_RECLAMO + 1)
+        self.assertEqual(len(notificaciones.reclamar(ahora=despues)), 1)
+
+
+# Segunda base SQLite, como la definiría DATABASE_REPLICA_URLS pero sin
+# espejo: el runner crea su base de prueba al ver que ReplicasTests la usa
+REPLICA = 'replica_prueba'
+connections.settings.setdefault(REPLICA, {
+    **copy.deepcopy(connections.settings['default']), 'NAME': str(settings.BASE_DIR / 'replica.sqlite3'), 'TEST': {
+        'NAME': None, 'CHARSET': None, 'COLLATION': None, 'MIGRATE': True, 'MIRROR': None,
+    },
+})
+
+
+@override_settings(
+    DATABASE_REPLICAS=[REPLICA], DATABASE_ROUTERS=['CAMILA_JESUS.replicas.Enrutador'],
+    # La sesión no depende de la base: la réplica de prueba no se replica
+    SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+)
+class ReplicasTests(TransactionTestCase):
+    """
+    Dos bases SQLite con el mismo esquema, una como primario y otra como
+    réplica. No hay replicación entre ellas: lo escrito en el primario es
+    justo lo que una réplica atrasada aún no tiene.
+    """
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        cache.clear()
+        self.docente = User.objects.create_user('docente', password='clave-segura-123')
+        self.lab = Laboratorio.objects.create(nombre='Química')
+        # Lo que ya se replicó
+        self.docente.save(using=REPLICA)
+        self.lab.save(using=REPLICA)
+        cache.clear()
+
+    def test_lecturas_a_la_replica_y_escrituras_al_primario(self):
+        Laboratorio.objects.create(nombre='Física')
+        self.assertEqual(list(Laboratorio.objects.values_list('nombre', flat=True)), ['Química'])
+        self.assertEqual(
+            list(Laboratorio.objects.using('default').order_by('nombre').values_list('nombre', flat=True)),
+            ['Física', 'Química'],
+        )
+        with replicas.primario():
+            self.assertEqual(Laboratorio.objects.count(), 2)
+
+    def test_verificacion_de_solapamiento_en_el_primario(self):
+        crear_reserva(self.docente, self.lab, (8, 0), (10, 0))
+        self.assertFalse(Reserva.objects.exists())
+        nueva = Reserva(
+            docente=self.docente, laboratorio=self.lab, fecha=datetime.date(2026, 3, 2),
+            hora_inicio=datetime.time(9, 0), hora_fin=datetime.time(11, 0), motivo='Práctica',
+        )
+        with self.assertRaises(ValidationError):
+            nueva.full_clean()
+        with self.assertRaises(ValidationError):
+            services.crear_reserva(nueva, self.docente)
+
+    def test_despues_de_escribir_se_lee_del_primario(self):
+        self.client.force_login(self.docente)
+        response = self.client.post(reverse('camila:docente_reserva_create'), {
+            'laboratorio': self.lab.pk, 'fecha': '2026-03-02', 'hora_inicio': '08:00', 'hora_fin': '09:00',
+            'motivo': 'Práctica',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response.cookies[replicas.COOKIE]['max-age'], settings.DATABASE_REPLICA_RETRASO)
+
+        url = reverse('camila:disponibilidad') + f'?laboratorio={self.lab.pk}&desde=2026-03-02'
+        ocupado = self.client.get(url).json()['laboratorios'][0]['dias'][0]['ocupado']
+        self.assertEqual(len(ocupado), 1)
+
+        # Otro navegador (sin la cookie) lee de la réplica, que aún no la tiene
+        del self.client.cookies[replicas.COOKIE]
+        ocupado = self.client.get(url).json()['laboratorios'][0]['dias'][0]['ocupado']
+        self.assertEqual(ocupado, [])
+
+        # Lo que se guarda en caché justo después de la escritura sale del primario
+        self.assertEqual(caches.estadisticas_docente(self.docente.pk)['total'], 1)
+
+    def test_formulario_invalido_no_fija_el_primario(self):
+        crear_reserva(self.docente, self.lab, (8, 0), (10, 0))
+        self.client.force_login(self.docente)
+        response = self.client.post(reverse('camila:docente_reserva_create'), {
+            'laboratorio': self.lab.pk, 'fecha': '2026-03-02', 'hora_inicio': '09:00', 'hora_fin': '11:00',
+            'motivo': 'Práctica',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Reserva.objects.using('default').count(), 1)
+        self.assertNotIn(replicas.COOKIE, response.cookies)
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', password='clave-segura-123', is_staff=True)
+        cls.docente = User.objects.create_user('docente', password='clave-segura-123')
+        cls.otro = User.objects.create_user('otro', password='clave-segura-123')
+        cls.lab = Laboratorio.objects.create(nombre='Química')
+        cls.propias = [
+            crear_reserva(cls.docente, cls.lab, (8 + i, 0), (9 + i, 0), fecha=datetime.date(2026, 3, 2 + i % 2))
+            for i in range(5)
+        ]
+        cls.ajena = crear_reserva(cls.otro, cls.lab, (16, 0), (17, 0))
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('camila:api_reserva_list')
+
+    def test_campos_y_paginacion_por_cursor(self):
+        self.client.force_login(self.docente)
+        ids, despues = [], ''
+        while True:
+            datos = self.client.get(self.url, {'campos': 'id,laboratorio,hora_inicio', 'limite': 2, 'despues': despues}).json()
+            self.assertLessEqual(len(datos['resultados']), 2)
+            ids += [r['id'] for r in datos['resultados']]
+            despues = datos['siguiente']
+            if not despues:
+                break
+        esperados = Reserva.objects.filter(docente=self.docente).order_by('-fecha', '-hora_inicio', '-pk')
+        self.assertEqual(ids, [r.pk for r in esperados])
+        self.assertEqual(datos['resultados'][-1], {'id': ids[-1], 'laboratorio': 'Química', 'hora_inicio': '08:00:00'})
+
+        datos = self.client.get(self.url, {'estado': 'Pendiente', 'fecha': '2026-03-03'}).json()
+        self.assertEqual(set(datos['resultados'][0]), set(api.CAMPOS_POR_DEFECTO))
+        self.assertEqual(len(datos['resultados']), 2)
+
+        for parametros in ({'campos': 'id,clave'}, {'limite': '0'}, {'despues': 'basura'}, {'fecha': 'ayer'}):
+            self.assertEqual(self.client.get(self.url, parametros).status_code, 400)
+
+    def test_administrador_ve_todas(self):
+        self.client.force_login(self.admin)
+        datos = self.client.get(self.url, {'campos': 'docente', 'docente': 'otro'}).json()
+        self.assertEqual(datos['resultados'], [{'docente': 'otro'}])
+        self.assertEqual(len(self.client.get(self.url).json()['resultados']), 6)
+
+    def test_peticiones_condicionales(self):
+        VersionDatos.objects.update(modificado=timezone.now() - datetime.timedelta(minutes=1))
+        self.client.force_login(self.docente)
+        response = self.client.get(self.url)
+        etag, modificado = response['ETag'], response['Last-Modified']
+        with self.assertNumQueries(3):
+            # La sesión, el usuario y los contadores VersionDatos
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=modificado).status_code, 304)
+
+        # Otro worker, sin pasar por la caché de este proceso
+        VersionDatos.objects.filter(nombre=VERSION_RESERVAS).update(
+            version=F('version') + 1, modificado=timezone.now() - datetime.timedelta(seconds=30),
+        )
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=modificado).status_code, 200)
+
+        crear_reserva(self.docente, self.lab, (18, 0), (19, 0), fecha=datetime.date(2026, 3, 9))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['resultados']), 6)
+        # Cambió en este mismo segundo: sin Last-Modified hasta el siguiente
+        self.assertNotIn('Last-Modified', response)
+
+    def test_crear_por_lote_con_las_reglas_de_solapamiento(self):
+        self.client.force_login(self.docente)
+        base = {'laboratorio': self.lab.pk, 'fecha': '2026-03-10', 'motivo': 'Práctica'}
+        response = self.client.post(self.url, {'reservas': [
+            {**base, 'hora_inicio': '08:00', 'hora_fin': '10:00'},
+            # Se solapa con la anterior del mismo lote
+            {**base, 'hora_inicio': '09:00', 'hora_fin': '11:00'},
+            # Se solapa con una existente
+            {**base, 'fecha': '2026-03-02', 'hora_inicio': '08:30', 'hora_fin': '09:30'},
+            {**base, 'laboratorio': 999, 'hora_inicio': '12:00', 'hora_fin': '13:00'},
+            {**base, 'hora_inicio': '14:00', 'hora_fin': '13:00'},
+            {**base, 'hora_inicio': '10:00', 'hora_fin': '11:00'},
+        ]}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        datos = response.json()
+        self.assertEqual([c['indice'] for c in datos['creadas']], [0, 5])
+        self.assertEqual([e['indice'] for e in datos['errores']], [1, 2, 3, 4])
+        self.assertIn('se solapa', datos['errores'][0]['error'])
+        creadas = Reserva.objects.filter(pk__in=[c['id'] for c in datos['creadas']])
+        self.assertEqual({(r.docente, r.estado) for r in creadas}, {(self.docente, 'Pendiente')})
+        self.assertEqual(caches.estadisticas_docente(self.docente.pk)['pendientes'], 7)
+
+        response = self.client.post(self.url, {'reservas': [{**base, 'hora_inicio': '08:00', 'hora_fin': '09:00'}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'no es json', content_type='application/json').status_code, 400)
+        self.assertEqual(self.client.post(self.url, {'reservas': []}, content_type='application/json').status_code, 400)
+
+    def test_cambio_de_estado_por_lote(self):
+        url = reverse('camila:api_reserva_estado')
+        primera, segunda = self.propias[:2]
+        self.assertEqual(self.client.post(url, {}, content_type='application/json').status_code, 401)
+        self.client.force_login(self.docente)
+        self.assertEqual(self.client.post(url, {}, content_type='application/json').status_code, 403)
+
+        self.client.force_login(self.admin)
+        response = self.client.post(url, {'accion': 'aprobar', 'reservas': [primera.pk, segunda.pk, 999]},
+                                    content_type='application/json')
+        self.assertEqual(response.json(), {
+            'actualizadas': [primera.pk, segunda.pk],
+            'errores': [{'id': 999, 'error': services.NO_EXISTE}],
+        })
+        self.assertEqual(Notificacion.objects.count(), 2)
+        response = self.client.post(url, {'accion': 'archivar', 'reservas': [primera.pk]}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(url, {'accion': 'aprobar', 'reservas': ['1']}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_laboratorios(self):
+        self.client.force_login(self.docente)
+        url = reverse('camila:api_laboratorio_list')
+        response = self.client.get(url)
+        self.assertEqual(response.json(), {'resultados': [{'id': self.lab.pk, 'nombre': 'Química'}]})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        Laboratorio.objects.create(nombre='Física')
+        self.assertEqual(len(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).json()['resultados']), 2)
@@ -14,15 +14,34 @@ urlpatterns = [
     path('docente/', views.DocenteDashboardView.as_view(), name='docente_dashboard'),
     path('docente/reservas/', views.DocenteReservaListView.as_view(), name='docente_reserva_list'),
     path('docente/reservas/nueva/', views.DocenteReservaCreateView.as_view(), name='docente_reserva_create'),
+    path('docente/reservas/recurrente/', views.DocenteReservaRecurrenteView.as_view(), name='docente_reserva_recurrente'),
     path('docente/reservas/<int:pk>/', views.DocenteReservaDetailView.as_view(), name='docente_reserva_detail'),
     path('docente/reservas/<int:pk>/editar/', views.DocenteReservaUpdateView.as_view(), name='docente_reserva_update'),
     path('docente/reservas/<int:pk>/cancelar/', views.DocenteReservaCancelarView.as_view(), name='docente_reserva_cancelar'),
+    path('disponibilidad/', views.DisponibilidadView.as_view(), name='disponibilidad'),
+
+    # ==================== FEEDS ICALENDAR (URL FIRMADA, SIN SESIÓN) ====================
+    path('calendario/laboratorio/<int:pk>/<str:token>.ics', views.CalendarioView.as_view(tipo='laboratorio'), name='calendario_laboratorio'),
+    path('calendario/docente/<int:pk>/<str:token>.ics', views.CalendarioView.as_view(tipo='docente'), name='calendario_docente'),
 
     # ==================== RUTAS PARA ADMINISTRADORES ====================
     path('administrador/', views.AdminDashboardView.as_view(), name='admin_dashboard'),
     path('administrador/reservas/', views.AdminReservaListView.as_view(), name='admin_reserva_list'),
     path('administrador/reservas/<int:pk>/', views.AdminReservaDetailView.as_view(), name='admin_reserva_detail'),
     path('administrador/reservas/<int:pk>/cambiar-estado/', views.AdminCambiarEstadoView.as_view(), name='admin_cambiar_estado'),
+    path('administrador/reservas/cambiar-estado/', views.AdminCambiarEstadoLoteView.as_view(), name='admin_cambiar_estado_lote'),
     path('administrador/estadisticas/', views.AdminEstadisticasView.as_view(), name='admin_estadisticas'),
+    path('administrador/estadisticas/ocupacion/', views.AdminOcupacionView.as_view(), name='admin_ocupacion'),
+    path('administrador/estadisticas/ocupacion.json', views.AdminOcupacionJSONView.as_view(), name='admin_ocupacion_json'),
     path('administrador/exportar-csv/', views.AdminExportCSVView.as_view(), name='admin_export_csv'),
+    path('administrador/importar-csv/', views.AdminImportarCSVView.as_view(), name='admin_importar_csv'),
+    path('administrador/exportaciones/', views.AdminExportacionListView.as_view(), name='admin_exportacion_list'),
+    path('administrador/exportaciones/nueva/', views.AdminExportacionCrearView.as_view(), name='admin_exportacion_crear'),
+    path('administrador/exportaciones/<int:pk>/descargar/', views.AdminExportacionDescargarView.as_view(), name='admin_exportacion_descargar'),
+    path('metrics', views.MetricasView.as_view(), name='metricas'),
+
+    # ==================== API JSON ====================
+    path('api/reservas/', views.ApiReservaListView.as_view(), name='api_reserva_list'),
+    path('api/reservas/estado/', views.ApiReservaEstadoView.as_view(), name='api_reserva_estado'),
+    path('api/laboratorios/', views.ApiLaboratorioListView.as_view(), name='api_laboratorio_list'),
 ]
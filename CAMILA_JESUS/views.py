@@ -1,14 +1,32 @@
 # CAMILA_JESUS/views.py
-from django.views.generic import ListView, CreateView, UpdateView, DetailView, View, TemplateView
+from django.conf import settings
+from django.views.generic import ListView, CreateView, UpdateView, DetailView, View, TemplateView, FormView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.shortcuts import get_object_or_404, redirect
+from django.http import FileResponse, Http404, HttpResponse
 from django.contrib import messages
-from .models import Reserva, Laboratorio
-from .forms import ReservaForm
-from django.http import HttpResponse
+from .models import Reserva, EstadisticaDiaria, Exportacion, VersionDatos, VERSION_RESERVAS, VERSION_LABORATORIOS
+from .forms import ImportarCSVForm, ReservaForm, ReservaRecurrenteForm
+from .paginacion import KeysetPaginationMixin, PaginaKeyset
+from . import (
+    api, archivo, busqueda, caches, calendario, disponibilidad, exportaciones, importaciones, metricas, ocupacion, replicas,
+    services,
+)
+from django.http import StreamingHttpResponse, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.contrib.auth.views import redirect_to_login
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.middleware.csrf import get_token
+from asgiref.sync import sync_to_async
+import asyncio
+import datetime
+import hashlib
 import csv
-from django.db.models import Count
+import io
+import time
+from django.db.models import Sum
 from django.utils import timezone
 
 # ==================== UTILIDADES ====================
@@ -17,34 +35,215 @@ def is_admin(user):
     return user.is_staff or user.is_superuser
 
 
-# ==================== VISTAS PARA DOCENTES ====================
-
-class DocenteDashboardView(LoginRequiredMixin, TemplateView):
-    """Dashboard principal para docentes - muestra sus reservas"""
-    template_name = 'camila/docente/dashboard.html'
+ESTADOS_FILTRO = ['Pendiente', 'Aprobada', 'Rechazada', 'Cancelada']
+
+
+async def alistar(qs):
+    """Evalúa un queryset con el ORM async"""
+    return [obj async for obj in qs]
+
+
+class AsyncAccesoMixin:
+    """
+    Para vistas async: equivalente a LoginRequiredMixin (y a is_admin si
+    solo_admin). El usuario se carga con request.auser() y queda en
+    request.user para las plantillas, sin volver a consultarlo.
+    """
+    solo_admin = False
+
+    async def dispatch(self, request, *args, **kwargs):
+        request.user = await request.auser()
+        if not request.user.is_authenticated:
+            return self.sin_sesion(request)
+        if self.solo_admin and not is_admin(request.user):
+            raise PermissionDenied
+        return await super().dispatch(request, *args, **kwargs)
+
+    def sin_sesion(self, request):
+        return redirect_to_login(request.get_full_path())
+
+
+class AsyncReservaListMixin(AsyncAccesoMixin, KeysetPaginationMixin):
+    """
+    Para ListView async de reservas: la página y el conteo, si se pide, se
+    cargan a la vez.
+
+    Las filas y el selector de laboratorio se cachean como fragmentos de
+    plantilla bajo las versiones de las reservas y de los laboratorios en
+    la base de datos (VersionDatos), que ven todos los workers cualquiera
+    sea el backend de caché. Las mismas versiones forman el ETag: si no
+    cambiaron se responde 304 sin consultar la página ni renderizar. El
+    ETag no puede salir del contenido porque el token CSRF enmascarado
+    cambia en cada respuesta.
+
+    Cada vista define grupo_filas(): el grupo de caches.py que invalida
+    toda escritura visible en su lista.
+    """
+
+    def _estado_cache(self):
+        version_filas, version_laboratorios = VersionDatos.versiones(VERSION_RESERVAS, VERSION_LABORATORIOS)
+        return (
+            version_filas,
+            version_laboratorios,
+            # len() no consume los mensajes (iterarlos sí)
+            len(messages.get_messages(self.request)),
+            caches.reciente(self.grupo_filas()) or caches.reciente(caches.GRUPO_LABORATORIOS),
+        )
+
+    def etag(self, version_filas, version_laboratorios):
+        request = self.request
+        # El token CSRF de la página guardada por el navegador debe seguir
+        # siendo válido: su secreto cambia al iniciar sesión. get_token() lo
+        # crea si aún no hay cookie (y la respuesta la envía).
+        get_token(request)
+        firma = hashlib.sha1('|'.join((
+            request.GET.urlencode(), str(request.user.pk), request.user.username, request.META['CSRF_COOKIE'],
+        )).encode()).hexdigest()[:16]
+        return quote_etag(f"{version_filas}-{version_laboratorios}-{firma}")
+
+    async def get(self, request, *args, **kwargs):
+        version_filas, version_laboratorios, mensajes, reciente = await sync_to_async(self._estado_cache)()
+        etag = self.etag(version_filas, version_laboratorios)
+        # Con mensajes pendientes hay que renderizar para mostrarlos
+        if not mensajes:
+            no_modificado = get_conditional_response(request, etag=etag)
+            if no_modificado is not None:
+                return no_modificado
+
+        # Las filas se guardan como fragmentos bajo la versión actual (ver replicas.py)
+        with replicas.primario(reciente):
+            self.object_list = self.get_queryset()
+            await self.apaginate_queryset(self.object_list, self.paginate_by)
+            response = self.render_to_response(self.get_context_data(
+                # Sin llamar: solo se consulta si el fragmento del selector no está en caché
+                laboratorios=caches.laboratorios,
+                estados=ESTADOS_FILTRO,
+                version_filas=version_filas,
+                version_laboratorios=version_laboratorios,
+                # Los fragmentos no duran más que el resto de la caché
+                timeout_fragmentos=settings.CACHES['default'].get('TIMEOUT', 300),
+            ))
+        response['ETag'] = etag
+        # Siempre revalidar: la página cambia con cualquier escritura
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Solo las reservas del docente actual
-        mis_reservas = Reserva.objects.filter(docente=self.request.user).select_related('laboratorio')
-
-        context.update({
-            'total_reservas': mis_reservas.count(),
-            'pendientes': mis_reservas.filter(estado='Pendiente').count(),
-            'aprobadas': mis_reservas.filter(estado='Aprobada').count(),
-            'rechazadas': mis_reservas.filter(estado='Rechazada').count(),
-            'reservas_recientes': mis_reservas[:5],
-        })
+        # Clave del fragmento de filas: las mismas reservas bajo la misma versión
+        context['ids_pagina'] = ','.join(str(r.pk) for r in context['object_list'])
         return context
 
 
-class DocenteReservaListView(LoginRequiredMixin, ListView):
-    """Lista de reservas del docente con filtros"""
+class ReservaPropiaMixin(UserPassesTestMixin):
+    """
+    Para vistas sobre una reserva del docente actual: la carga una sola vez
+    (con sus relaciones) filtrando por dueño en SQL, y la reutiliza en
+    test_func, get_object y el manejador. Si no existe o es de otro docente
+    responde 404; con `solo_pendientes`, una propia en otro estado va a
+    handle_no_permission.
+    """
+    solo_pendientes = False
+
+    def get_queryset(self):
+        return Reserva.objects.select_related('docente', 'laboratorio').filter(docente=self.request.user)
+
+    def get_object(self, queryset=None):
+        if not hasattr(self, '_reserva'):
+            self._reserva = (queryset if queryset is not None else self.get_queryset()).filter(pk=self.kwargs['pk']).first()
+        if self._reserva is None:
+            raise Http404("La reserva no existe.")
+        return self._reserva
+
+    def test_func(self):
+        return not self.solo_pendientes or self.get_object().estado == 'Pendiente'
+
+
+def filtrar_reservas_admin(qs, params):
+    """
+    Filtros de la lista de administración (fecha, laboratorio, estado,
+    docente) y búsqueda de texto `q`, que además ordena por relevancia.
+    """
+    fecha = params.get('fecha')
+    lab_id = params.get('laboratorio')
+    estado = params.get('estado')
+    docente = params.get('docente')
+    texto = (params.get('q') or '').strip()
+
+    if fecha:
+        qs = qs.filter(fecha=fecha)
+    if lab_id:
+        qs = qs.filter(laboratorio_id=lab_id)
+    if estado:
+        qs = qs.filter(estado=estado)
+    if docente:
+        qs = qs.filter(docente__username__icontains=docente)
+    if texto:
+        qs = busqueda.buscar(qs, texto)
+    return qs
+
+
+class Echo:
+    """Pseudo-buffer para csv.writer: devuelve cada línea en lugar de guardarla"""
+    def write(self, value):
+        return value
+
+
+CSV_ENCABEZADO = ['ID', 'Docente', 'Laboratorio', 'Fecha', 'Hora Inicio', 'Hora Fin', 'Estado', 'Motivo', 'Fecha Creación']
+CSV_CAMPOS = ('pk', 'docente__username', 'laboratorio__nombre', 'fecha', 'hora_inicio', 'hora_fin', 'estado', 'motivo', 'fecha_creacion')
+CSV_CHUNK_SIZE = 2000
+
+
+def filas_csv(*querysets):
+    """
+    Genera el CSV línea por línea leyendo tuplas por bloques, sin instanciar
+    modelos. Con varios querysets (vigentes y archivadas) los escribe seguidos.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_ENCABEZADO)
+    for qs in querysets:
+        for pk, docente, laboratorio, fecha, hora_inicio, hora_fin, estado, motivo, creacion in (
+            qs.values_list(*CSV_CAMPOS).iterator(chunk_size=CSV_CHUNK_SIZE)
+        ):
+            yield writer.writerow([
+                pk, docente, laboratorio, fecha, hora_inicio, hora_fin, estado, motivo,
+                creacion.strftime('%Y-%m-%d %H:%M:%S'),
+            ])
+
+
+# ==================== VISTAS PARA DOCENTES ====================
+
+class DocenteDashboardView(AsyncAccesoMixin, TemplateView):
+    """Dashboard principal para docentes - muestra sus reservas"""
+    template_name = 'camila/docente/dashboard.html'
+
+    async def get(self, request, *args, **kwargs):
+        # Solo las reservas del docente actual
+        mis_reservas = Reserva.objects.filter(docente=request.user)
+        stats, recientes = await asyncio.gather(
+            sync_to_async(caches.estadisticas_docente)(request.user.pk),
+            alistar(mis_reservas.select_related('laboratorio')[:5]),
+        )
+        return self.render_to_response(self.get_context_data(
+            total_reservas=stats['total'],
+            pendientes=stats['pendientes'],
+            aprobadas=stats['aprobadas'],
+            rechazadas=stats['rechazadas'],
+            reservas_recientes=recientes,
+            url_calendario=request.build_absolute_uri(calendario.url('docente', request.user.pk)),
+        ))
+
+
+class DocenteReservaListView(AsyncReservaListMixin, ListView):
+    """Lista de reservas del docente con filtros (paginada por cursor)"""
     model = Reserva
     template_name = 'camila/docente/reserva_list.html'
     context_object_name = 'reservas'
     paginate_by = 20
 
+    def grupo_filas(self):
+        return caches.grupo_docente(self.request.user.pk)
+
     def get_queryset(self):
         # Solo las reservas del docente actual
         qs = Reserva.objects.filter(docente=self.request.user).select_related('laboratorio')
@@ -61,13 +260,8 @@ class DocenteReservaListView(LoginRequiredMixin, ListView):
         if estado:
             qs = qs.filter(estado=estado)
 
-        return qs.order_by('-fecha', '-hora_inicio')
+        return qs.order_by('-fecha', '-hora_inicio', '-id')
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['laboratorios'] = Laboratorio.objects.all().order_by('nombre')
-        context['estados'] = ['Pendiente', 'Aprobada', 'Rechazada', 'Cancelada']
-        return context
 
 
 class DocenteReservaCreateView(LoginRequiredMixin, CreateView):
@@ -79,12 +273,9 @@ class DocenteReservaCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         reserva = form.save(commit=False)
-        reserva.docente = self.request.user
-        reserva.estado = 'Pendiente'
 
         try:
-            reserva.full_clean()  # Valida conflictos de horarios
-            reserva.save()
+            services.crear_reserva(reserva, self.request.user)  # Valida conflictos de horarios bajo bloqueo
             messages.success(self.request, "Reserva creada exitosamente. Estado: Pendiente de aprobación.")
             return redirect(self.success_url)
         except Exception as e:
@@ -92,27 +283,49 @@ class DocenteReservaCreateView(LoginRequiredMixin, CreateView):
             return self.form_invalid(form)
 
 
-class DocenteReservaUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+class DocenteReservaRecurrenteView(LoginRequiredMixin, FormView):
+    """Crear reservas semanales o quincenales en un rango de fechas"""
+    form_class = ReservaRecurrenteForm
+    template_name = 'camila/docente/reserva_recurrente_form.html'
+
+    def form_valid(self, form):
+        datos = form.cleaned_data
+        fechas = services.generar_fechas(datos['fecha_inicio'], datos['fecha_fin'], datos['frecuencia'])
+        creadas, conflictos = services.crear_reservas_recurrentes(
+            self.request.user, datos['laboratorio'], fechas,
+            datos['hora_inicio'], datos['hora_fin'], datos['motivo'],
+        )
+
+        if creadas:
+            messages.success(self.request, f"Se crearon {len(creadas)} reservas en estado Pendiente.")
+        if conflictos:
+            messages.warning(self.request, f"{len(conflictos)} fechas no se reservaron por conflictos de horario.")
+
+        fechas_conflicto = dict(conflictos)
+        resultado = [
+            {'fecha': fecha, 'creada': fecha not in fechas_conflicto, 'motivo': fechas_conflicto.get(fecha, '')}
+            for fecha in fechas
+        ]
+        return self.render_to_response(self.get_context_data(form=form, resultado=resultado))
+
+
+class DocenteReservaUpdateView(LoginRequiredMixin, ReservaPropiaMixin, UpdateView):
     """Editar reserva - solo el docente dueño y si está pendiente"""
     model = Reserva
     form_class = ReservaForm
     template_name = 'camila/docente/reserva_form.html'
     success_url = reverse_lazy('camila:docente_reserva_list')
-
-    def test_func(self):
-        reserva = self.get_object()
-        # Solo el docente dueño puede editar y solo si está pendiente
-        return reserva.docente == self.request.user and reserva.estado == 'Pendiente'
+    # Solo el docente dueño puede editar y solo si está pendiente
+    solo_pendientes = True
 
     def handle_no_permission(self):
-        messages.error(self.request, "No tienes permiso para editar esta reserva o ya no está en estado Pendiente.")
+        messages.error(self.request, "Solo puedes editar tus reservas en estado Pendiente.")
         return redirect('camila:docente_reserva_list')
 
     def form_valid(self, form):
         reserva = form.save(commit=False)
         try:
-            reserva.full_clean()  # Valida conflictos de horarios
-            reserva.save()
+            services.guardar_reserva(reserva)  # Valida conflictos de horarios bajo bloqueo
             messages.success(self.request, "Reserva actualizada correctamente.")
             return redirect(self.success_url)
         except Exception as e:
@@ -120,108 +333,159 @@ class DocenteReservaUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateVi
             return self.form_invalid(form)
 
 
-class DocenteReservaCancelarView(LoginRequiredMixin, UserPassesTestMixin, View):
+class DocenteReservaCancelarView(LoginRequiredMixin, ReservaPropiaMixin, View):
     """Cancelar reserva - solo el docente dueño y si está pendiente"""
+    solo_pendientes = True
 
-    def test_func(self):
-        reserva = get_object_or_404(Reserva, pk=self.kwargs['pk'])
-        return reserva.docente == self.request.user and reserva.estado == 'Pendiente'
+    def handle_no_permission(self):
+        messages.error(self.request, "Solo puedes cancelar tus reservas en estado Pendiente.")
+        return redirect('camila:docente_reserva_list')
 
     def post(self, request, pk):
-        reserva = get_object_or_404(Reserva, pk=pk)
-
-        if reserva.docente != request.user:
-            messages.error(request, "No tienes permiso para cancelar esta reserva.")
-            return redirect('camila:docente_reserva_list')
-
-        if reserva.estado != 'Pendiente':
-            messages.error(request, "Solo puedes cancelar reservas en estado Pendiente.")
-            return redirect('camila:docente_reserva_list')
-
-        reserva.estado = 'Cancelada'
-        reserva.save()
+        services.cancelar_reserva(self.get_object())
         messages.success(request, "Reserva cancelada correctamente.")
         return redirect('camila:docente_reserva_list')
 
 
-class DocenteReservaDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
+class DocenteReservaDetailView(LoginRequiredMixin, ReservaPropiaMixin, DetailView):
     """Ver detalle de reserva - solo el docente dueño"""
     model = Reserva
     template_name = 'camila/docente/reserva_detail.html'
     context_object_name = 'reserva'
 
-    def test_func(self):
-        reserva = self.get_object()
-        return reserva.docente == self.request.user
 
-    def handle_no_permission(self):
-        messages.error(self.request, "No tienes permiso para ver esta reserva.")
-        return redirect('camila:docente_reserva_list')
+def etag_disponibilidad(desde, hasta, laboratorio_ids):
+    """
+    Cambia solo cuando cambian reservas/laboratorios o la consulta. Se firma
+    el rango ya resuelto: sin parámetros, "hoy" cambia cada día.
+    """
+    firma = VersionDatos.firma(VERSION_RESERVAS, VERSION_LABORATORIOS)
+    consulta = f"{desde}|{hasta}|{','.join(sorted(laboratorio_ids))}"
+    return f"{firma}-{hashlib.sha1(consulta.encode()).hexdigest()[:12]}"
 
 
-# ==================== VISTAS PARA ADMINISTRADORES ====================
+class DisponibilidadView(AsyncAccesoMixin, View):
+    """
+    JSON con intervalos libres y ocupados por laboratorio y día.
+    Parámetros: desde, hasta (AAAA-MM-DD) y laboratorio (repetible).
+    Responde 304 si el ETag (versión de los datos + consulta) no cambió.
+    """
 
-class AdminDashboardView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
-    """Dashboard principal para administradores"""
-    template_name = 'camila/admin/dashboard.html'
+    async def get(self, request):
+        try:
+            desde = datetime.date.fromisoformat(request.GET.get('desde') or timezone.localdate().isoformat())
+            hasta = datetime.date.fromisoformat(request.GET.get('hasta') or desde.isoformat())
+        except ValueError:
+            return JsonResponse({'error': 'Fechas inválidas, use el formato AAAA-MM-DD.'}, status=400)
+
+        if hasta < desde:
+            return JsonResponse({'error': 'La fecha final debe ser posterior a la inicial.'}, status=400)
+        if (hasta - desde).days >= disponibilidad.MAX_DIAS:
+            return JsonResponse({'error': f'El rango máximo es de {disponibilidad.MAX_DIAS} días.'}, status=400)
+
+        etag = quote_etag(await sync_to_async(etag_disponibilidad)(desde, hasta, request.GET.getlist('laboratorio')))
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            return no_modificado
+
+        laboratorios = await disponibilidad.alaboratorios_solicitados(request.GET.getlist('laboratorio'))
+        response = JsonResponse(await disponibilidad.aserializar(laboratorios, desde, hasta))
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=60)
+        return response
 
-    def test_func(self):
-        return is_admin(self.request.user)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        todas_reservas = Reserva.objects.all()
-
-        context.update({
-            'total_reservas': todas_reservas.count(),
-            'pendientes': todas_reservas.filter(estado='Pendiente').count(),
-            'aprobadas': todas_reservas.filter(estado='Aprobada').count(),
-            'rechazadas': todas_reservas.filter(estado='Rechazada').count(),
-            'reservas_pendientes': todas_reservas.filter(estado='Pendiente').select_related('docente', 'laboratorio')[:10],
-        })
-        return context
+class CalendarioView(View):
+    """
+    Feed iCalendar de un laboratorio o de un docente (ver calendario.py).
+    Sin sesión: lo autoriza el token firmado de la URL. Responde 304 si no
+    cambió (ETag / Last-Modified).
+    """
+    tipo = None
+
+    async def get(self, request, pk, token):
+        if not calendario.token_valido(self.tipo, pk, token):
+            raise Http404
+        feed = await sync_to_async(calendario.feed)(self.tipo, pk)
+        modificado = int(feed['modificado'].timestamp())
+        no_modificado = get_conditional_response(request, etag=feed['etag'], last_modified=modificado)
+        if no_modificado is not None:
+            return no_modificado
+
+        response = HttpResponse(feed['cuerpo'], content_type='text/calendar; charset=utf-8')
+        response['ETag'] = feed['etag']
+        response['Last-Modified'] = http_date(modificado)
+        patch_cache_control(response, private=True, max_age=300)
+        return response
 
 
-class AdminReservaListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
-    """Lista de todas las reservas con filtros - solo admin"""
+# ==================== VISTAS PARA ADMINISTRADORES ====================
+
+class AdminDashboardView(AsyncAccesoMixin, TemplateView):
+    """Dashboard principal para administradores"""
+    template_name = 'camila/admin/dashboard.html'
+    solo_admin = True
+
+    async def get(self, request, *args, **kwargs):
+        pendientes = Reserva.objects.filter(estado='Pendiente').select_related('docente', 'laboratorio')
+        stats, reservas_pendientes = await asyncio.gather(
+            sync_to_async(caches.estadisticas_admin)(),
+            alistar(pendientes[:10]),
+        )
+        return self.render_to_response(self.get_context_data(
+            total_reservas=stats['total'],
+            pendientes=stats['pendientes'],
+            aprobadas=stats['aprobadas'],
+            rechazadas=stats['rechazadas'],
+            reservas_pendientes=reservas_pendientes,
+        ))
+
+
+class AdminReservaListView(AsyncReservaListMixin, ListView):
+    """Lista de todas las reservas con filtros - solo admin (paginada por cursor)"""
     model = Reserva
     template_name = 'camila/admin/reserva_list.html'
     context_object_name = 'reservas'
     paginate_by = 20
-
-    def test_func(self):
-        return is_admin(self.request.user)
+    solo_admin = True
+    extra_context = {'max_resultados': busqueda.MAX_RESULTADOS}
 
     def get_queryset(self):
         qs = Reserva.objects.all().select_related('docente', 'laboratorio')
 
         # Filtros
-        fecha = self.request.GET.get('fecha')
-        lab_id = self.request.GET.get('laboratorio')
-        estado = self.request.GET.get('estado')
-        docente = self.request.GET.get('docente')
+        qs = filtrar_reservas_admin(qs, self.request.GET)
 
-        if fecha:
-            qs = qs.filter(fecha=fecha)
-        if lab_id:
-            qs = qs.filter(laboratorio_id=lab_id)
-        if estado:
-            qs = qs.filter(estado=estado)
-        if docente:
-            qs = qs.filter(docente__username__icontains=docente)
+        if self.buscando():
+            return qs
+        return qs.order_by('-fecha', '-hora_inicio', '-id')
+
+    def grupo_filas(self):
+        return caches.GRUPO_ADMIN
 
-        return qs.order_by('-fecha', '-hora_inicio')
+    def buscando(self):
+        return bool(self.request.GET.get('q', '').strip())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['laboratorios'] = Laboratorio.objects.all().order_by('nombre')
-        context['estados'] = ['Pendiente', 'Aprobada', 'Rechazada', 'Cancelada']
+        # Filtrando por laboratorio se ofrece su feed iCalendar
+        laboratorio = self.request.GET.get('laboratorio', '')
+        if laboratorio.isdigit():
+            context['url_calendario'] = self.request.build_absolute_uri(calendario.url('laboratorio', int(laboratorio)))
         return context
 
+    async def apaginate_queryset(self, queryset, page_size):
+        if not self.buscando():
+            return await super().apaginate_queryset(queryset, page_size)
+        # Por relevancia no hay cursor: una sola página con los mejores resultados
+        filas = await alistar(queryset[:busqueda.MAX_RESULTADOS])
+        self.pagina_cargada = self._completar(PaginaKeyset(filas, False, False))
+        return self.pagina_cargada
+
 
 class AdminReservaDetailView(LoginRequiredMixin, UserPassesTestMixin, DetailView):
     """Ver detalle de cualquier reserva - solo admin"""
-    model = Reserva
+    queryset = Reserva.objects.select_related('docente', 'laboratorio')
     template_name = 'camila/admin/reserva_detail.html'
     context_object_name = 'reserva'
 
@@ -236,60 +500,163 @@ class AdminCambiarEstadoView(LoginRequiredMixin, UserPassesTestMixin, View):
         return is_admin(self.request.user)
 
     def post(self, request, pk):
-        reserva = get_object_or_404(Reserva, pk=pk)
         accion = request.POST.get('accion')
 
-        if accion == 'aprobar':
-            if reserva.estado == 'Pendiente':
-                reserva.estado = 'Aprobada'
-                reserva.save()
-                messages.success(request, f"Reserva #{reserva.pk} aprobada correctamente.")
-            else:
-                messages.warning(request, "Solo se pueden aprobar reservas en estado Pendiente.")
-
-        elif accion == 'rechazar':
-            if reserva.estado == 'Pendiente':
-                reserva.estado = 'Rechazada'
-                reserva.save()
-                messages.success(request, f"Reserva #{reserva.pk} rechazada correctamente.")
-            else:
-                messages.warning(request, "Solo se pueden rechazar reservas en estado Pendiente.")
-
-        else:
+        if accion not in services.TRANSICIONES:
             messages.error(request, "Acción no válida.")
+            return redirect('camila:admin_reserva_detail', pk=pk)
+
+        # El servicio carga la reserva; no hace falta leerla antes aquí
+        actualizadas, errores = services.cambiar_estado_lote([pk], accion)
+        if actualizadas:
+            participio = 'aprobada' if accion == 'aprobar' else 'rechazada'
+            messages.success(request, f"Reserva #{pk} {participio} correctamente.")
+        elif errores[pk] == services.NO_EXISTE:
+            raise Http404(errores[pk])
+        else:
+            messages.warning(request, errores[pk])
 
         return redirect('camila:admin_reserva_detail', pk=pk)
 
 
-class AdminEstadisticasView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
-    """Estadísticas de uso - solo admin"""
-    template_name = 'camila/admin/estadisticas.html'
+class AdminCambiarEstadoLoteView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Aprobar o rechazar varias reservas seleccionadas a la vez - solo admin"""
 
     def test_func(self):
         return is_admin(self.request.user)
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    def post(self, request):
+        accion = request.POST.get('accion')
+        pks = [pk for pk in request.POST.getlist('reservas') if pk.isdigit()]
+        siguiente = request.POST.get('siguiente', '')
+        destino = reverse('camila:admin_reserva_list') + (siguiente if siguiente.startswith('?') else '')
 
-        # Estadísticas generales
-        total = Reserva.objects.count()
-        por_estado = Reserva.objects.values('estado').annotate(total=Count('estado')).order_by('-total')
-        por_laboratorio = Reserva.objects.values('laboratorio__nombre').annotate(
-            total=Count('id')
-        ).order_by('-total')[:10]
-
-        # Docentes más activos
-        docentes_activos = Reserva.objects.values('docente__username').annotate(
-            total=Count('id')
-        ).order_by('-total')[:10]
-
-        context.update({
-            'total': total,
-            'por_estado': por_estado,
-            'por_laboratorio': por_laboratorio,
-            'docentes_activos': docentes_activos,
-        })
-        return context
+        if accion not in services.TRANSICIONES:
+            messages.error(request, "Acción no válida.")
+            return redirect(destino)
+        if not pks:
+            messages.warning(request, "No seleccionaste ninguna reserva.")
+            return redirect(destino)
+
+        actualizadas, errores = services.cambiar_estado_lote([int(pk) for pk in pks], accion)
+        if actualizadas:
+            messages.success(request, f"{len(actualizadas)} reservas actualizadas correctamente.")
+        for pk, motivo in sorted(errores.items()):
+            messages.warning(request, f"Reserva #{pk}: {motivo}")
+        return redirect(destino)
+
+
+class AdminEstadisticasView(AsyncAccesoMixin, TemplateView):
+    """Estadísticas de uso - solo admin"""
+    template_name = 'camila/admin/estadisticas.html'
+    solo_admin = True
+
+    async def get(self, request, *args, **kwargs):
+        # Se lee del resumen diario precalculado, no de la tabla de reservas
+        resumen = EstadisticaDiaria.objects.filter(total__gt=0)
+
+        # Agregados independientes, pedidos a la vez
+        total, por_estado, por_laboratorio, docentes_activos = await asyncio.gather(
+            resumen.aaggregate(total=Sum('total')),
+            alistar(resumen.values('estado').annotate(total=Sum('total')).order_by('-total')),
+            alistar(resumen.values('laboratorio__nombre').annotate(total=Sum('total')).order_by('-total')[:10]),
+            # Docentes más activos
+            alistar(resumen.values('docente__username').annotate(total=Sum('total')).order_by('-total')[:10]),
+        )
+        return self.render_to_response(self.get_context_data(
+            total=total['total'] or 0,
+            por_estado=por_estado,
+            por_laboratorio=por_laboratorio,
+            docentes_activos=docentes_activos,
+        ))
+
+
+def rango_ocupacion(params):
+    """
+    (desde, hasta) de los parámetros: semestre (AAAA-1 | AAAA-2) o desde y
+    hasta (AAAA-MM-DD); por defecto el semestre en curso. Lanza ValueError
+    con el mensaje para el usuario.
+    """
+    if params.get('desde') or params.get('hasta'):
+        try:
+            desde = datetime.date.fromisoformat(params.get('desde', ''))
+            hasta = datetime.date.fromisoformat(params.get('hasta', ''))
+        except ValueError:
+            raise ValueError('Fechas inválidas, use el formato AAAA-MM-DD.')
+        if hasta < desde:
+            raise ValueError('La fecha final debe ser posterior a la inicial.')
+        if (hasta - desde).days >= ocupacion.MAX_DIAS:
+            raise ValueError(f'El rango máximo es de {ocupacion.MAX_DIAS} días.')
+        return desde, hasta
+    try:
+        return ocupacion.semestre(params.get('semestre'))
+    except ValueError:
+        raise ValueError('Semestre inválido, use el formato AAAA-1 o AAAA-2.')
+
+
+def etag_ocupacion(desde, hasta):
+    """
+    Versiones de caché de las reservas y los laboratorios + rango ya
+    resuelto (sin parámetros es el semestre en curso): sin consultas.
+    """
+    return quote_etag(
+        f"{caches.version(caches.GRUPO_ADMIN)}-{caches.version(caches.GRUPO_LABORATORIOS)}-{desde}-{hasta}"
+    )
+
+
+class AdminOcupacionView(AsyncAccesoMixin, TemplateView):
+    """Utilización de los laboratorios por día de la semana y franja - solo admin"""
+    template_name = 'camila/admin/ocupacion.html'
+    solo_admin = True
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            desde, hasta = rango_ocupacion(request.GET)
+        except ValueError as e:
+            messages.error(request, str(e))
+            desde, hasta = ocupacion.semestre()
+        datos = await sync_to_async(ocupacion.obtener)(desde, hasta)
+
+        laboratorio = next(
+            (lab for lab in datos['laboratorios'] if str(lab['id']) == request.GET.get('laboratorio')), None,
+        )
+        matriz = laboratorio['matriz'] if laboratorio else datos['semana']
+        actual = ocupacion.nombre_semestre(desde)
+        anio = int(actual[:4])
+        return self.render_to_response(self.get_context_data(
+            datos=datos,
+            laboratorio=laboratorio,
+            filas=[
+                (dia, [round(valor * 100) for valor in valores])
+                for dia, valores in zip(datos['dias'], matriz)
+            ],
+            laboratorios_por_uso=sorted(datos['laboratorios'], key=lambda lab: -lab['utilizacion']),
+            semestre=actual if not request.GET.get('desde') else '',
+            semestres=[f"{a}-{m}" for a in range(anio + 1, anio - 3, -1) for m in (2, 1)],
+        ))
+
+
+class AdminOcupacionJSONView(AsyncAccesoMixin, View):
+    """
+    JSON de AdminOcupacionView (ver ocupacion.calcular). Parámetros:
+    semestre o desde y hasta. Responde 304 si el ETag no cambió.
+    """
+    solo_admin = True
+
+    async def get(self, request):
+        try:
+            desde, hasta = rango_ocupacion(request.GET)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        etag = await sync_to_async(etag_ocupacion)(desde, hasta)
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            return no_modificado
+
+        response = JsonResponse(await sync_to_async(ocupacion.obtener)(desde, hasta))
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
 
 
 class AdminExportCSVView(LoginRequiredMixin, UserPassesTestMixin, View):
@@ -299,42 +666,231 @@ class AdminExportCSVView(LoginRequiredMixin, UserPassesTestMixin, View):
         return is_admin(self.request.user)
 
     def get(self, request):
-        qs = Reserva.objects.all().select_related('docente', 'laboratorio')
-
-        # Aplicar filtros si vienen
-        fecha = request.GET.get('fecha')
-        lab_id = request.GET.get('laboratorio')
-        estado = request.GET.get('estado')
-
-        if fecha:
-            qs = qs.filter(fecha=fecha)
-        if lab_id:
-            qs = qs.filter(laboratorio_id=lab_id)
-        if estado:
-            qs = qs.filter(estado=estado)
+        # Mismos filtros que la lista de administración, también sobre las archivadas
+        querysets = archivo.con_historial(lambda qs: filtrar_reservas_admin(qs, request.GET))
 
-        # Construir CSV
-        response = HttpResponse(content_type='text/csv; charset=utf-8')
+        # El CSV se envía por partes: la memoria no crece con el número de filas
+        response = StreamingHttpResponse(filas_csv(*querysets), content_type='text/csv; charset=utf-8')
         filename = f"reservas_{timezone.now().strftime('%Y%m%d_%H%M%S')}.csv"
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
 
-        writer = csv.writer(response)
-        writer.writerow(['ID', 'Docente', 'Laboratorio', 'Fecha', 'Hora Inicio', 'Hora Fin', 'Estado', 'Motivo', 'Fecha Creación'])
-
-        for r in qs:
-            writer.writerow([
-                r.pk,
-                r.docente.username,
-                r.laboratorio.nombre,
-                r.fecha,
-                r.hora_inicio,
-                r.hora_fin,
-                r.estado,
-                r.motivo,
-                r.fecha_creacion.strftime('%Y-%m-%d %H:%M:%S')
-            ])
 
-        return response
+class AdminExportacionListView(LoginRequiredMixin, UserPassesTestMixin, ListView):
+    """Exportaciones en segundo plano - solo admin"""
+    model = Exportacion
+    template_name = 'camila/admin/exportacion_list.html'
+    context_object_name = 'exportaciones'
+    paginate_by = 20
+
+    def test_func(self):
+        return is_admin(self.request.user)
+
+    def get_queryset(self):
+        return Exportacion.objects.select_related('solicitada_por')
+
+
+class AdminImportarCSVView(LoginRequiredMixin, UserPassesTestMixin, FormView):
+    """Importar reservas (y laboratorios nuevos) desde un CSV - solo admin"""
+    template_name = 'camila/admin/importar.html'
+    form_class = ImportarCSVForm
+
+    def test_func(self):
+        return is_admin(self.request.user)
+
+    def form_valid(self, form):
+        # Se lee el archivo subido por partes, sin cargarlo entero
+        texto = io.TextIOWrapper(form.cleaned_data['archivo'].file, encoding='utf-8-sig', newline='')
+        try:
+            resultado = importaciones.importar(texto, simular=form.cleaned_data['simular'])
+        except (importaciones.ArchivoInvalido, UnicodeDecodeError, csv.Error) as e:
+            form.add_error('archivo', f"No se pudo leer el archivo: {e}")
+            return self.form_invalid(form)
+        finally:
+            texto.detach()
+
+        if form.cleaned_data['simular']:
+            messages.info(self.request, f"Validación: se importarían {resultado.creadas} reservas.")
+        elif resultado.creadas:
+            messages.success(self.request, f"{resultado.creadas} reservas importadas.")
+        return self.render_to_response(self.get_context_data(form=form, resultado=resultado))
+
+
+class AdminExportacionCrearView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Solicitar una exportación en segundo plano con los filtros actuales - solo admin"""
+
+    def test_func(self):
+        return is_admin(self.request.user)
+
+    def post(self, request):
+        exportacion, reutilizada = exportaciones.solicitar(request.user, request.POST)
+        if reutilizada:
+            messages.info(request, f"Ya existe la exportación #{exportacion.pk} con estos filtros y está vigente.")
+        else:
+            messages.success(request, f"Exportación #{exportacion.pk} en cola. Podrás descargarla cuando esté completada.")
+        return redirect('camila:admin_exportacion_list')
+
+
+class AdminExportacionDescargarView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Descargar el archivo de una exportación completada - solo admin"""
+
+    def test_func(self):
+        return is_admin(self.request.user)
+
+    def get(self, request, pk):
+        exportacion = get_object_or_404(Exportacion, pk=pk, estado='Completada')
+        try:
+            archivo = open(exportacion.archivo, 'rb')
+        except OSError:
+            raise Http404("El archivo de la exportación ya no existe.")
+        return FileResponse(
+            archivo, as_attachment=True,
+            filename=f"reservas_{exportacion.pk}.csv.gz", content_type='application/gzip',
+        )
+
+
+# ==================== API JSON ====================
+
+class ApiAccesoMixin(AsyncAccesoMixin):
+    """Como AsyncAccesoMixin, pero sin sesión responde 401 en lugar de redirigir al login"""
+
+    def sin_sesion(self, request):
+        return JsonResponse({'error': 'Se requiere iniciar sesión.'}, status=401)
+
+
+def estado_api(request, *nombres):
+    """
+    (ETag, Last-Modified) de una respuesta de la API a partir de los
+    contadores VersionDatos `nombres`, compartidos por todos los procesos,
+    el usuario y los parámetros: una consulta. Last-Modified (timestamp) es
+    None si el último cambio es del segundo en curso: con resolución de
+    segundos, otra escritura en ese mismo segundo no lo movería.
+    """
+    versiones, modificado = VersionDatos.cambios(*nombres)
+    parametros = hashlib.sha1(f"{request.user.pk}|{request.GET.urlencode()}".encode()).hexdigest()[:12]
+    etag = quote_etag('-'.join([*map(str, versiones), parametros]))
+    if modificado is None or int(modificado.timestamp()) >= int(time.time()):
+        return etag, None
+    return etag, int(modificado.timestamp())
+
+
+def respuesta_api(datos, etag, modificado):
+    response = JsonResponse(datos)
+    response['ETag'] = etag
+    if modificado is not None:
+        response['Last-Modified'] = http_date(modificado)
+    # Siempre revalidar: cambia con cualquier escritura
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+class ApiReservaListView(ApiAccesoMixin, View):
+    """
+    GET: reservas en JSON (ver api.pagina): las propias o, para un
+    administrador, todas. Parámetros: campos, limite, despues y los filtros
+    de las listas (fecha, laboratorio, estado; docente solo administradores).
+    Responde 304 si no cambiaron (ETag / Last-Modified).
+
+    POST: crea reservas Pendientes a partir de {"reservas": [{"laboratorio",
+    "fecha", "hora_inicio", "hora_fin", "motivo"}, ...]} (ver api.crear).
+    """
+
+    def grupo(self):
+        if is_admin(self.request.user):
+            return caches.GRUPO_ADMIN
+        return caches.grupo_docente(self.request.user.pk)
+
+    def get_queryset(self):
+        params = self.request.GET.copy()
+        # Por relevancia no hay cursor
+        params.pop('q', None)
+        qs = Reserva.objects.all()
+        if not is_admin(self.request.user):
+            params.pop('docente', None)
+            qs = qs.filter(docente=self.request.user)
+        return filtrar_reservas_admin(qs, params)
+
+    async def get(self, request):
+        grupo = self.grupo()
+        etag, modificado = await sync_to_async(estado_api)(request, VERSION_RESERVAS, VERSION_LABORATORIOS)
+        no_modificado = get_conditional_response(request, etag=etag, last_modified=modificado)
+        if no_modificado is not None:
+            return no_modificado
+
+        reciente = await sync_to_async(caches.reciente)(grupo)
+        try:
+            campos = api.leer_campos(request.GET.get('campos'))
+            limite = api.leer_limite(request.GET.get('limite'))
+            qs = self.get_queryset()
+            with replicas.primario(reciente):
+                datos = await sync_to_async(api.pagina)(qs, campos, limite, request.GET.get('despues'))
+        except ValidationError as e:
+            return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        # Cookie CSRF para los POST del mismo cliente
+        get_token(request)
+        return respuesta_api(datos, etag, modificado)
+
+    async def post(self, request):
+        try:
+            lote = api.leer_lote(api.leer_json(request.body), 'reservas')
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        creadas, errores = await sync_to_async(api.crear)(request.user, lote)
+        return JsonResponse({'creadas': creadas, 'errores': errores}, status=201 if creadas else 400)
+
+
+class ApiReservaEstadoView(ApiAccesoMixin, View):
+    """
+    Aprobar o rechazar varias reservas - solo admin. Cuerpo: {"accion":
+    "aprobar" | "rechazar", "reservas": [id, ...]} (ver
+    services.cambiar_estado_lote).
+    """
+    solo_admin = True
+
+    async def post(self, request):
+        try:
+            datos = api.leer_json(request.body)
+            pks = api.leer_ids(api.leer_lote(datos, 'reservas'))
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        accion = datos.get('accion')
+        if accion not in services.TRANSICIONES:
+            return JsonResponse({'error': f"Acción no válida, use {' o '.join(services.TRANSICIONES)}."}, status=400)
+
+        actualizadas, errores = await sync_to_async(services.cambiar_estado_lote)(pks, accion)
+        return JsonResponse({
+            'actualizadas': actualizadas,
+            'errores': [{'id': pk, 'error': motivo} for pk, motivo in sorted(errores.items())],
+        })
+
+
+class ApiLaboratorioListView(ApiAccesoMixin, View):
+    """Laboratorios en JSON (id y nombre), desde la caché. Responde 304 si no cambiaron."""
+
+    async def get(self, request):
+        etag, modificado = await sync_to_async(estado_api)(request, VERSION_LABORATORIOS)
+        no_modificado = get_conditional_response(request, etag=etag, last_modified=modificado)
+        if no_modificado is not None:
+            return no_modificado
+        laboratorios = await sync_to_async(caches.laboratorios)()
+        return respuesta_api(
+            {'resultados': [{'id': lab.pk, 'nombre': lab.nombre} for lab in laboratorios]}, etag, modificado,
+        )
+
+
+class MetricasView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """Métricas de rendimiento en formato de texto de Prometheus - solo admin"""
+    raise_exception = True
+
+    def test_func(self):
+        return is_admin(self.request.user)
+
+    def get(self, request):
+        return HttpResponse(metricas.exportar_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
 # ==================== VISTAS DE INICIO ====================
@@ -0,0 +1,114 @@
+"""
+Configuración de la conexión a la base de datos (la usa settings.py).
+
+PostgreSQL (DATABASE_URL en Render):
+- Con psycopg 3 y psycopg_pool instalados se usa el pool de conexiones de
+  Django, uno por proceso. Bajo ASGI cada petición corre en su propio hilo
+  y las conexiones persistentes no se reutilizaban: cada petición abría
+  una conexión nueva. Con el pool se toman al empezar y se devuelven al
+  terminar. Como cada worker de gunicorn tiene su pool, el máximo por
+  defecto reparte DB_MAX_CONEXIONES entre los WEB_CONCURRENCY workers.
+- Sin pool (psycopg2 o DB_POOL=False) se mantiene CONN_MAX_AGE como antes.
+- En ambos casos CONN_HEALTH_CHECKS: una conexión caída (reinicio o
+  mantenimiento del servidor) se descarta antes de usarla, en lugar de
+  hacer fallar la petición.
+- Réplicas de lectura opcionales en DATABASE_REPLICA_URLS, con los mismos
+  ajustes; el enrutador está en CAMILA_JESUS/replicas.py.
+
+SQLite (desarrollo o una sola instancia con disco):
+- journal_mode=WAL solo con SQLITE_WAL=True (una instancia con disco): los
+  lectores no bloquean al escritor ni al revés. El modo queda guardado en
+  la cabecera del archivo, y db.sqlite3 está en el repositorio: activarlo
+  por defecto lo modificaría con cualquier conexión (shell, runserver).
+- synchronous=NORMAL con WAL: no corrompe la base ante una caída del
+  proceso; solo una caída del sistema puede perder la última transacción.
+  Sin WAL, FULL (lo seguro con el journal de rollback).
+- busy_timeout: un escritor espera al otro en lugar de fallar con
+  "database is locked".
+- mmap_size: lecturas sin copiar páginas al espacio del proceso.
+- transaction_mode=IMMEDIATE: las transacciones toman el bloqueo de
+  escritura al empezar. Una transacción diferida que lee y después
+  escribe falla de inmediato, sin esperar el busy_timeout, si otro
+  escritor se le adelantó.
+"""
+import importlib.util
+
+import dj_database_url
+from decouple import Csv, config
+
+
+def hay_pool():
+    """psycopg 3 con psycopg_pool: requisito del pool de conexiones de Django"""
+    return importlib.util.find_spec('psycopg') is not None and importlib.util.find_spec('psycopg_pool') is not None
+
+
+def workers():
+    """Workers de gunicorn (gunicorn.conf.py lee la misma variable)"""
+    return config('WEB_CONCURRENCY', default=2, cast=int)
+
+
+def opciones_sqlite(wal=None):
+    if wal is None:
+        wal = config('SQLITE_WAL', default=False, cast=bool)
+    pragmas = [
+        *(['PRAGMA journal_mode=WAL'] if wal else []),
+        f"PRAGMA synchronous={config('SQLITE_SYNCHRONOUS', default='NORMAL' if wal else 'FULL')}",
+        # Milisegundos
+        f"PRAGMA busy_timeout={config('SQLITE_BUSY_TIMEOUT', default=10000, cast=int)}",
+        f"PRAGMA mmap_size={config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)}",
+    ]
+    return {
+        'init_command': ';'.join(pragmas),
+        'transaction_mode': config('SQLITE_TRANSACTION_MODE', default='IMMEDIATE'),
+    }
+
+
+def opciones_pool():
+    maximo = config('DB_POOL_MAX', default=0, cast=int) or max(
+        config('DB_MAX_CONEXIONES', default=20, cast=int) // workers(), 2,
+    )
+    return {
+        'min_size': min(config('DB_POOL_MIN', default=1, cast=int), maximo),
+        'max_size': maximo,
+        # Segundos que una petición espera por una conexión libre
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+
+
+def _ajustar(base, servidor):
+    base.setdefault('OPTIONS', {})
+    motor = base['ENGINE']
+
+    if motor.endswith('sqlite3'):
+        base['OPTIONS'].update(opciones_sqlite())
+        # Abrir un archivo SQLite es barato; bajo ASGI cada petición usa su
+        # propio hilo y una conexión persistente no se reutilizaría
+        base['CONN_MAX_AGE'] = 0 if servidor == 'asgi' else 600
+    elif motor.endswith('postgresql') and config('DB_POOL', default=True, cast=bool) and hay_pool():
+        base['OPTIONS']['pool'] = opciones_pool()
+        # El pool no admite conexiones persistentes
+        base['CONN_MAX_AGE'] = 0
+        base['CONN_HEALTH_CHECKS'] = True
+    else:
+        base['CONN_MAX_AGE'] = 0 if servidor == 'asgi' else config('DB_CONN_MAX_AGE', default=600, cast=int)
+        base['CONN_HEALTH_CHECKS'] = True
+    return base
+
+
+def configurar(url_por_defecto, servidor):
+    """Diccionario DATABASES['default'] según DATABASE_URL y el servidor (asgi/wsgi)"""
+    return _ajustar(dj_database_url.config(default=url_por_defecto, ssl_require=False), servidor)
+
+
+def replicas(servidor):
+    """
+    {'replica_1': {...}, ...} a partir de DATABASE_REPLICA_URLS (URLs
+    separadas por comas), con los mismos ajustes que 'default'. En los
+    tests cada réplica es un espejo de la base de prueba de 'default'.
+    """
+    resultado = {}
+    for i, url in enumerate(config('DATABASE_REPLICA_URLS', default='', cast=Csv()), 1):
+        base = _ajustar(dj_database_url.parse(url, ssl_require=False), servidor)
+        base['TEST'] = {'MIRROR': 'default'}
+        resultado[f'replica_{i}'] = base
+    return resultado
@@ -6,9 +6,10 @@ Configuración adaptada para despliegue en Render.
 
 from pathlib import Path
 import os
-import dj_database_url
 from decouple import config
 
+from . import basedatos
+
 # ===========================
 # BASE Y RUTAS
 # ===========================
@@ -50,9 +51,13 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ===========================
 MIDDLEWARE = [
+    'CAMILA_JESUS.middleware.MetricasMiddleware',  # primero: mide la petición completa
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # ✅ necesario para Render
+    'CAMILA_JESUS.middleware.CompresionMiddleware',  # gzip/brotli de HTML y JSON (los estáticos ya van comprimidos)
+    'CAMILA_JESUS.middleware.ReplicasMiddleware',  # antes de la sesión: también se lee de la base
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.http.ConditionalGetMiddleware',  # ETag y 304 si la vista no pone su propio ETag
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -69,8 +74,16 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],  # Plantillas globales
-        'APP_DIRS': True,
         'OPTIONS': {
+            # Plantillas compiladas una vez por proceso (runserver las recarga
+            # al cambiar). Explícito para que no dependa de los valores por
+            # defecto de Django ni de DEBUG.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -82,16 +95,43 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'PROYECTO_CAMILA_JESUS.wsgi.application'
+ASGI_APPLICATION = 'PROYECTO_CAMILA_JESUS.asgi.application'
 
 # ===========================
 # BASE DE DATOS
 # ===========================
+# Servidor de aplicaciones (gunicorn.conf.py): 'wsgi' (por defecto) o 'asgi'
+SERVIDOR = config('SERVIDOR', default='wsgi')
+
+# Pool de conexiones (PostgreSQL) y pragmas (SQLite): ver basedatos.py.
+# Variables: DB_POOL, DB_POOL_MIN, DB_POOL_MAX, DB_POOL_TIMEOUT,
+# DB_MAX_CONEXIONES, WEB_CONCURRENCY, SQLITE_BUSY_TIMEOUT, SQLITE_MMAP_SIZE...
 DATABASES = {
-    'default': dj_database_url.config(
-        default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}",
-        conn_max_age=600,
-        ssl_require=False
-    )
+    'default': basedatos.configurar(f"sqlite:///{BASE_DIR / 'db.sqlite3'}", SERVIDOR),
+    # replica_1, replica_2... de DATABASE_REPLICA_URLS
+    **basedatos.replicas(SERVIDOR),
+}
+
+# Lecturas a las réplicas, escrituras al primario (ver CAMILA_JESUS/replicas.py)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['CAMILA_JESUS.replicas.Enrutador'] if DATABASE_REPLICAS else []
+# Segundos que un navegador lee del primario después de escribir: más que
+# el retraso habitual de las réplicas
+DATABASE_REPLICA_RETRASO = config('DATABASE_REPLICA_RETRASO', default=5, cast=int)
+
+# ===========================
+# CACHÉ
+# ===========================
+# Por defecto en archivos: la comparten todos los workers de gunicorn del
+# servidor, así una escritura invalida las versiones de caches.py en todos
+# (con LocMemCache cada proceso tendría su propio contador). Para varios
+# servidores, un backend en red (CACHE_BACKEND=...RedisCache, CACHE_LOCATION).
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': config('CACHE_LOCATION', default=str(BASE_DIR / 'cache')),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=300, cast=int),
+    }
 }
 
 # ===========================
@@ -121,6 +161,53 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 # WhiteNoise optimizado
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# ===========================
+# EXPORTACIONES EN SEGUNDO PLANO
+# ===========================
+EXPORTACIONES_DIR = config('EXPORTACIONES_DIR', default=str(BASE_DIR / 'exportaciones'))
+
+# ===========================
+# CORREO (notificaciones a los docentes)
+# ===========================
+# Lo envía el worker `manage.py procesar_notificaciones`, nunca la petición.
+# Sin configurar, los correos se escriben en la consola.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Reservas de laboratorios <no-responder@localhost>')
+
+# ===========================
+# ARCHIVO DE RESERVAS ANTIGUAS
+# ===========================
+# `manage.py archivar_reservas` mueve a ReservaArchivada las reservas con
+# fecha anterior a hace este número de meses
+ARCHIVO_MESES = config('ARCHIVO_MESES', default=12, cast=int)
+
+# ===========================
+# MÉTRICAS (/metrics)
+# ===========================
+# Archivo SQLite compartido por todos los workers
+METRICAS_DB = config('METRICAS_DB', default=str(BASE_DIR / 'metricas.sqlite3'))
+# Cada cuántos segundos vuelca cada proceso sus contadores
+METRICAS_INTERVALO = config('METRICAS_INTERVALO', default=5, cast=float)
+# Peticiones más lentas que esto (segundos) se registran con su SQL
+METRICAS_UMBRAL_LENTO = config('METRICAS_UMBRAL_LENTO', default=1.0, cast=float)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'camila.lentas': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
+
 # ===========================
 # AUTENTICACIÓN
 # ===========================
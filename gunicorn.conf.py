@@ -0,0 +1,28 @@
+# Configuración de gunicorn (la carga sola desde el directorio del proyecto).
+#
+# SERVIDOR=wsgi (por defecto): workers sync clásicos sobre wsgi.py, con
+# conexiones persistentes a la base. Es lo que más peticiones por segundo
+# dio en `manage.py bench_asgi_wsgi`.
+# SERVIDOR=asgi: workers de uvicorn sobre asgi.py; las vistas async
+# (dashboards, listas, disponibilidad, estadísticas) no ocupan un hilo
+# mientras esperan a la base de datos, pero sin pool (PostgreSQL con
+# psycopg 3) cada petición abre su conexión. Medir antes de activarlo.
+# Ojo: cada nombre global se interpreta como ajuste; `config` es uno de ellos
+import decouple
+
+SERVIDOR = decouple.config('SERVIDOR', default='wsgi')
+
+if SERVIDOR == 'asgi':
+    wsgi_app = 'PROYECTO_CAMILA_JESUS.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'PROYECTO_CAMILA_JESUS.wsgi:application'
+    worker_class = 'sync'
+
+# Render define WEB_CONCURRENCY según la instancia; gunicorn también lo lee.
+# basedatos.py lo usa para repartir DB_MAX_CONEXIONES entre los pools
+workers = decouple.config('WEB_CONCURRENCY', default=2, cast=int)
+timeout = decouple.config('GUNICORN_TIMEOUT', default=30, cast=int)
+# Reinicia cada worker tras N peticiones para acotar fugas de memoria
+max_requests = 1000
+max_requests_jitter = 100